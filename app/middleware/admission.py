@@ -0,0 +1,202 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import re
+
+from starlette.responses import JSONResponse
+
+from config import settings
+from app.services.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUED, ADMISSION_REJECTED
+
+logger = logging.getLogger(__name__)
+
+# (sınıf, öncelik, method, path regex) - küçük öncelik önce kabul edilir
+ROUTE_CLASSES = [
+    ("exam", 0, None, re.compile(r"^/(start-exam|submit-exam|exam-time)/")),
+    ("exam", 0, "GET", re.compile(r"^/exams/\d+$")),
+    # Kayıt açıldığında gelen yığılma: yazma yoğun, ayrı ve uzun kuyruk
+    ("registration", 1, "POST", re.compile(r"^/exams/\d+/register$")),
+    ("admin", 2, None, re.compile(r"^/admin/")),
+]
+DEFAULT_CLASS = ("default", 1)
+
+# DB'ye dokunmayan yollar sınırlamaya girmez
+EXEMPT_PATHS = re.compile(r"^/(metrics|static/|docs|redoc|openapi\.json)")
+
+
+def classify(method: str, path: str):
+    for name, priority, route_method, pattern in ROUTE_CLASSES:
+        if (route_method is None or route_method == method) and pattern.match(path):
+            return name, priority
+    return DEFAULT_CLASS
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class AdmissionController:
+    """
+    Eşzamanlı istek sayısını DB bağlantı havuzu kapasitesinde tutar.
+
+    - Toplam kapasite (max_concurrency) ve sınıf başına limitler birlikte uygulanır
+    - Kapasite doluysa istek sınıfının sınırlı bekleme kuyruğuna girer; kuyruk doluysa 429
+    - Bekleme süresi dolarsa 503
+    - Boşalan yer önce yüksek öncelikli sınıfa (exam) verilir
+    """
+
+    def __init__(self, max_concurrency: int, limits: dict, queue_limits: dict, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.limits = limits
+        self.queue_limits = queue_limits
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.active_by_class = {}
+        self.queued_by_class = {}
+        self._waiters = []
+        self._counter = itertools.count()
+
+    def _can_admit(self, name: str) -> bool:
+        limit = self.limits.get(name, self.max_concurrency)
+        return self.active < self.max_concurrency and self.active_by_class.get(name, 0) < limit
+
+    def _admit(self, name: str):
+        self.active += 1
+        self.active_by_class[name] = self.active_by_class.get(name, 0) + 1
+        ADMISSION_IN_FLIGHT.labels(route_class=name).inc()
+
+    async def acquire(self, name: str, priority: int):
+        # Önde bekleyen yoksa doğrudan kabul
+        if self._can_admit(name) and not self._has_waiters(name, priority):
+            self._admit(name)
+            return
+
+        queued = self.queued_by_class.get(name, 0)
+        if queued >= self.queue_limits.get(name, 0):
+            ADMISSION_REJECTED.labels(route_class=name, reason="queue_full").inc()
+            raise AdmissionRejected(429, "Sunucu şu anda yoğun, lütfen biraz sonra tekrar deneyin")
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._counter), name, future]
+        heapq.heappush(self._waiters, entry)
+        self.queued_by_class[name] = queued + 1
+        ADMISSION_QUEUED.labels(route_class=name).inc()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Zaman aşımı ile aynı anda yer verildi; kabul edilmiş say
+                return
+            future.cancel()
+            ADMISSION_REJECTED.labels(route_class=name, reason="timeout").inc()
+            raise AdmissionRejected(503, "Sunucu şu anda yoğun, lütfen biraz sonra tekrar deneyin")
+        except BaseException:
+            # İstemci bağlantıyı kapattı: verilen yeri geri bırak
+            if future.done() and not future.cancelled():
+                self.release(name)
+            future.cancel()
+            raise
+        finally:
+            self.queued_by_class[name] -= 1
+            ADMISSION_QUEUED.labels(route_class=name).dec()
+
+    def _has_waiters(self, name: str, priority: int) -> bool:
+        # Aynı veya daha yüksek öncelikli, hâlâ bekleyen ve kabul edilebilir istek var mı
+        return any(
+            not entry[3].done() and entry[0] <= priority and self._can_admit(entry[2])
+            for entry in self._waiters
+        )
+
+    def release(self, name: str):
+        self.active -= 1
+        self.active_by_class[name] -= 1
+        ADMISSION_IN_FLIGHT.labels(route_class=name).dec()
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        skipped = []
+        while self._waiters and self.active < self.max_concurrency:
+            entry = heapq.heappop(self._waiters)
+            future = entry[3]
+            if future.done():
+                continue
+            if not self._can_admit(entry[2]):
+                # Sınıf limiti dolu; sıradaki sınıflara bak
+                skipped.append(entry)
+                continue
+            self._admit(entry[2])
+            future.set_result(True)
+        for entry in skipped:
+            heapq.heappush(self._waiters, entry)
+
+    def snapshot(self) -> dict:
+        return {
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            "active_by_class": dict(self.active_by_class),
+            "queued_by_class": dict(self.queued_by_class),
+        }
+
+
+admission_controller = AdmissionController(
+    max_concurrency=settings.ADMISSION_MAX_CONCURRENCY or settings.db_max_connections,
+    limits=settings.ADMISSION_ROUTE_LIMITS,
+    queue_limits=settings.ADMISSION_QUEUE_LIMITS,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT
+)
+
+
+def overloaded_response(status_code: int, detail: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={"detail": detail},
+        headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER)}
+    )
+
+
+class AdmissionControlMiddleware:
+    """
+    Route sınıfına göre eşzamanlılık sınırı uygular; aşımda Retry-After ile 429/503 döner
+    """
+
+    def __init__(self, app, controller: AdmissionController = None):
+        self.app = app
+        self.controller = controller or admission_controller
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not settings.ADMISSION_CONTROL_ENABLED
+            or scope["method"] == "OPTIONS"
+            or EXEMPT_PATHS.match(scope["path"])
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        name, priority = classify(scope["method"], scope["path"])
+        try:
+            await self.controller.acquire(name, priority)
+        except AdmissionRejected as e:
+            logger.warning(
+                f"Request rejected by admission control ({e.status_code})",
+                extra={"route_class": name, "path": scope["path"]}
+            )
+            await overloaded_response(e.status_code, e.detail)(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(name)
+
+
+async def pool_timeout_handler(request, exc):
+    """
+    Bağlantı havuzundan zamanında bağlantı alınamazsa genel 500 yerine 503 döner
+    """
+    logger.error(f"Database pool timeout: {exc}", extra={"path": request.url.path})
+    return overloaded_response(503, "Sunucu şu anda yoğun, lütfen biraz sonra tekrar deneyin")
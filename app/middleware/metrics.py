@@ -0,0 +1,34 @@
+import time
+
+from app.services.metrics import REQUEST_LATENCY, route_label
+
+
+class MetricsMiddleware:
+    """
+    Route bazında istek süresi histogramı
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_LATENCY.labels(
+                method=scope["method"],
+                route=route_label(scope),
+                status=status["code"]
+            ).observe(time.perf_counter() - started)
@@ -0,0 +1,78 @@
+import threading
+
+from starlette.datastructures import MutableHeaders
+
+from config import settings
+from database import QueryStats, current_query_stats
+from app.services.metrics import observe_request_db
+
+
+class RouteQueryMetrics:
+    """
+    Route bazında toplam istek, SQL sayısı ve DB süresi
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def observe(self, stats: QueryStats):
+        with self._lock:
+            route = self._routes.setdefault(stats.route_name, {
+                "requests": 0,
+                "queries": 0,
+                "db_time": 0.0,
+                "max_queries": 0
+            })
+            route["requests"] += 1
+            route["queries"] += stats.count
+            route["db_time"] += stats.total_time
+            route["max_queries"] = max(route["max_queries"], stats.count)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    "requests": route["requests"],
+                    "total_queries": route["queries"],
+                    "avg_queries": round(route["queries"] / route["requests"], 2),
+                    "max_queries": route["max_queries"],
+                    "avg_db_time_ms": round(route["db_time"] / route["requests"] * 1000, 2)
+                }
+                for name, route in self._routes.items()
+            }
+
+
+route_query_metrics = RouteQueryMetrics()
+
+
+class QueryStatsMiddleware:
+    """
+    Her HTTP isteği için SQL sayısını ve DB süresini toplar.
+    DEBUG modunda değerleri response header'larına yazar.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(scope)
+        token = current_query_stats.set(stats)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and settings.DEBUG:
+                headers = MutableHeaders(scope=message)
+                headers.append("X-DB-Query-Count", str(stats.count))
+                headers.append("X-DB-Time-Ms", f"{stats.total_time * 1000:.1f}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            current_query_stats.reset(token)
+            route_query_metrics.observe(stats)
+            observe_request_db(stats)
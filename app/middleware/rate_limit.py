@@ -0,0 +1,73 @@
+import logging
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from config import settings
+from database import current_subject
+from app.services.metrics import RATE_LIMITED
+from app.services.rate_limit import create_rate_limiter, load_rules
+
+logger = logging.getLogger(__name__)
+
+
+def client_ip(scope, headers: Headers) -> str:
+    """
+    İstemci IP'si. Proxy arkasında X-Forwarded-For'un soldaki değerleri istemcinin kendisi
+    tarafından yazılabilir; güvenilen proxy'lerin eklediği sağdan TRUSTED_PROXY_HOPS'uncu değer alınır
+    """
+    if settings.TRUST_PROXY_HEADERS:
+        hops = max(settings.TRUSTED_PROXY_HOPS, 1)
+        forwarded = [value.strip() for value in headers.get("x-forwarded-for", "").split(",") if value.strip()]
+        if len(forwarded) >= hops:
+            return forwarded[-hops]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    """
+    RATE_LIMITS ayarındaki path'ler için IP ve kullanıcı (token sub) bazlı limit uygular.
+    Limit aşılırsa Retry-After ile 429 döner.
+    """
+
+    def __init__(self, app, limiter=None, rules=None):
+        self.app = app
+        self.limiter = limiter or create_rate_limiter()
+        self.rules = load_rules() if rules is None else rules
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        rule = next((rule for rule in self.rules if rule.matches(scope["path"])), None)
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        identities = {"ip": client_ip(scope, headers)}
+        if "user" in rule.limits:
+            identities["user"] = current_subject.get()  # RequestContextMiddleware ayarlar
+
+        for limit_scope, (limit, window) in rule.limits.items():
+            identity = identities.get(limit_scope)
+            if identity is None:
+                continue
+            allowed, retry_after, _ = self.limiter.hit(f"{rule.prefix}:{limit_scope}:{identity}", limit, window)
+            if not allowed:
+                RATE_LIMITED.labels(route=rule.prefix, scope=limit_scope).inc()
+                logger.warning(
+                    "Rate limit exceeded",
+                    extra={"path": scope["path"], "limit_scope": limit_scope, "retry_after": retry_after}
+                )
+                response = JSONResponse(
+                    status_code=429,
+                    content={"detail": "Çok fazla istek gönderildi, lütfen biraz sonra tekrar deneyin"},
+                    headers={"Retry-After": str(retry_after)}
+                )
+                await response(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
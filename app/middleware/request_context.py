@@ -0,0 +1,39 @@
+from uuid import uuid4
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from database import current_subject
+from app.services.auth_service import authorization_subject
+from app.services.log import request_id_var
+
+
+class RequestContextMiddleware:
+    """
+    Her isteğe bir request id atar (gelen X-Request-ID varsa onu kullanır),
+    log kayıtlarına ve response header'ına ekler. Token'daki kullanıcıyı da
+    read-your-writes yönlendirmesi için current_subject'e yazar.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        request_id = headers.get("x-request-id") or uuid4().hex
+        token = request_id_var.set(request_id)
+        subject_token = current_subject.set(authorization_subject(headers.get("authorization")))
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Request-ID", request_id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            current_subject.reset(subject_token)
+            request_id_var.reset(token)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime,Text
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime,Text, Float, Index, UniqueConstraint, LargeBinary, JSON
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime,timedelta
@@ -7,15 +7,22 @@ import pytz
 class Exam(Base):
     __tablename__ = "exams"
     id = Column(Integer, primary_key=True, index=True)
-    title = Column(String, nullable=False)
+    title = Column(String(255), nullable=False)
     is_published = Column(Boolean, default=False)
     requires_registration = Column(Boolean, default=True)
     registration_start_date = Column(DateTime(timezone=True), nullable=True)
     registration_end_date = Column(DateTime(timezone=True), nullable=True)
-    exam_start_date = Column(DateTime(timezone=True), nullable=True)
-    exam_end_date = Column(DateTime(timezone=True), nullable=True)
+    exam_start_date = Column(DateTime(timezone=True), nullable=True, index=True)
+    exam_end_date = Column(DateTime(timezone=True), nullable=True, index=True)
     duration_minutes = Column(Integer, default=60)  # Kullanıcının sınavı çözmek için kullandığı süre
     status = Column(String(50), default="registration_pending")
+    # Soru ve şık sırası öğrenci başına (exam_id, user_id) ile belirlenir; bkz. app/services/shuffle.py
+    shuffle_questions = Column(Boolean, default=False, server_default="0")
+    # Kontenjan (None: sınırsız). Sayaçlar okunmadan, koşullu UPDATE ile değişir; COUNT(*)
+    # gerektirmez (bkz. app/services/seats.py). registration_count kesin kayıtları sayar.
+    capacity = Column(Integer, nullable=True)
+    registration_count = Column(Integer, default=0, server_default="0", nullable=False)
+    waitlist_count = Column(Integer, default=0, server_default="0", nullable=False)
 
     questions = relationship("Question", back_populates="exam")
     exam_results = relationship("ExamResult", back_populates="exam")
@@ -29,14 +36,12 @@ class Question(Base):
     exam_id = Column(Integer, ForeignKey("exams.id"))
     text = Column(Text)  # String yerine Text kullanın - sınırsız uzunluk için
     image = Column(String(500), nullable=True)  # URL için yeterli uzunluk
-    option_1 = Column(String(500))  # Seçenekler için de uzunlukları artırabilirsiniz
-    option_2 = Column(String(500))
-    option_3 = Column(String(500))
-    option_4 = Column(String(500))
-    option_5 = Column(String(500))
+    # Şıklar sıralı JSON dizi olarak tek kolonda; şık sayısı soruya göre değişebilir
+    # (eski option_1..option_5 kolonları migrate.py ile buraya taşınır)
+    options = Column(JSON, nullable=True)
 
-    # Doğru cevabın ID'si
-    correct_option_id = Column(Integer, nullable=False)  # 1, 2, 3, 4, 5
+    # Doğru cevabın ID'si (1-based: 1 = ilk şık)
+    correct_option_id = Column(Integer, nullable=False)
 
     exam = relationship("Exam", back_populates="questions")
     answers = relationship("Answer", back_populates="question")
@@ -55,6 +60,10 @@ class ExamResult(Base):
     # DateTime kolonlarını açıkça tanımlayalım
     start_time = Column(DateTime(timezone=True), nullable=False)
     end_time = Column(DateTime(timezone=True), nullable=False)
+    completed_at = Column(DateTime(timezone=True), nullable=True)  # Sıralamada eşitlik bozucu
+    # Paketlenmiş cevaplar (ANSWER_STORAGE_MODE); biçim app/services/answer_storage.py'de
+    answer_data = Column(LargeBinary, nullable=True)
+    correct_bitmap = Column(LargeBinary, nullable=True)
 
     user = relationship("UserDB", back_populates="exam_results")
     exam = relationship("Exam", back_populates="exam_results")
@@ -74,10 +83,11 @@ class Answer(Base):
     __tablename__ = "answers"
 
     id = Column(Integer, primary_key=True, index=True)
-    exam_result_id = Column(Integer, ForeignKey("exam_results.id"))
+    exam_result_id = Column(Integer, ForeignKey("exam_results.id"), index=True)
     question_id = Column(Integer, ForeignKey("questions.id"))
     selected_option = Column(Integer)
     is_correct = Column(Boolean, default=False)
+    change_count = Column(Integer, default=0, server_default="0")  # Öğrencinin cevabı kaç kez değiştirdiği
 
     # İlişkiler
     exam_result = relationship("ExamResult", back_populates="answers")
@@ -86,12 +96,88 @@ class Answer(Base):
 
 class ExamRegistration(Base):
     __tablename__ = "exam_registrations"
+    __table_args__ = (
+        # Sınav listesi id üzerinden sayfalanır (exam_id = ? AND id > ? ORDER BY id)
+        Index("ix_exam_registrations_exam_id_id", "exam_id", "id"),
+        # Eşzamanlı çift kayda karşı; var olan tablolara migrate.py ile eklenir
+        Index("uq_exam_registrations_user_exam", "user_id", "exam_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     exam_id = Column(Integer, ForeignKey("exams.id"))
     registration_date = Column(DateTime, default=datetime.utcnow)
-    user_name = Column(String(100))  # Yeni kolon ekleyin
+    # registered | waitlisted (kontenjan dolunca yedek liste; sınava sadece registered girer)
+    status = Column(String(20), default="registered", server_default="registered", nullable=False)
+    # Kayıt anındaki kullanıcı bilgileri; sınav listesi users tablosuna join gerektirmez
+    user_name = Column(String(100))
+    user_email = Column(String(100))
+    school_name = Column(String(100))
+    branch = Column(String(50))
 
     user = relationship("UserDB", back_populates="exam_registrations")
-    exam = relationship("Exam", back_populates="registrations")
\ No newline at end of file
+    exam = relationship("Exam", back_populates="registrations")
+
+
+class UserExamSummary(Base):
+    """
+    Kullanıcının sınav geçmişi için sonuç özeti; sonuç kesinleşince yazılır,
+    sıra (rank) sınav tamamlandığında doldurulur
+    """
+    __tablename__ = "user_exam_summaries"
+    __table_args__ = (
+        UniqueConstraint("user_id", "exam_id", name="uq_user_exam_summaries_user_exam"),
+        Index("ix_user_exam_summaries_user_completed", "user_id", "completed_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    exam_id = Column(Integer, ForeignKey("exams.id"), nullable=False, index=True)
+    exam_title = Column(String(255))
+    correct_answers = Column(Integer, default=0)
+    incorrect_answers = Column(Integer, default=0)
+    total_questions = Column(Integer, default=0)
+    score_percentage = Column(Float, default=0)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    rank = Column(Integer, nullable=True)
+    participants = Column(Integer, nullable=True)
+
+
+class ExamResultSnapshot(Base):
+    """
+    Kesinleşmiş sonucun hazır (gzip'li JSON) sonuç kağıdı; get_exam_result bunu doğrudan döner
+    """
+    __tablename__ = "exam_result_snapshots"
+    __table_args__ = (
+        UniqueConstraint("exam_id", "user_id", name="uq_exam_result_snapshots_exam_user"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    exam_result_id = Column(Integer, ForeignKey("exam_results.id"), nullable=False, unique=True)
+    exam_id = Column(Integer, ForeignKey("exams.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # MySQL'de MEDIUMBLOB; çok sorulu sınavlar BLOB (64KB) sınırını aşabilir
+    payload = Column(LargeBinary(length=2 ** 24), nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class RescoreJob(Base):
+    """
+    Cevap anahtarı düzeltmesi sonrası yeniden puanlama işi; ilerleme ve kaldığı yer burada tutulur
+    """
+    __tablename__ = "rescore_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    exam_id = Column(Integer, ForeignKey("exams.id"), nullable=False, index=True)
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=True)  # None: sınavın tüm soruları
+    status = Column(String(20), nullable=False, default="pending")  # pending, running, completed, failed
+    phase = Column(String(20), nullable=False, default="answers")  # answers, results, derived
+    total_results = Column(Integer, default=0)
+    processed_results = Column(Integer, default=0)
+    last_result_id = Column(Integer, default=0)  # Sonuç parçalarında kaldığı yer
+    error = Column(Text, nullable=True)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -1,13 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, get_read_db
 from app.models.exam import Exam, Question, ExamResult, Answer
 from app.models.user import UserDB
 from app.routers.auth import get_current_user
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 from app.services.schedular import scheduler, debug_scheduler
+from app.services.serialization import fast_response, exam_result_row, legacy_option_fields
+from app.services.item_analysis import item_analysis
+from app.services.results import rebuild_snapshots
+from app.services.answer_storage import load_answers
+from app.services.roster import roster_page, roster_row, iter_roster_csv
+from app.services.user_search import user_search
+from app.middleware.query_stats import route_query_metrics
 from datetime import datetime
+from config import settings
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -29,7 +39,7 @@ class ExamResultWithUser(BaseModel):
 
 
 class AnswerDetail(BaseModel):
-    id: int
+    id: Optional[int] = None  # Paketlenmiş cevaplarda satır id'si yok
     question_id: int
     selected_option: int
     is_correct: bool
@@ -39,10 +49,37 @@ class AnswerDetail(BaseModel):
         from_attributes = True
 
 
+def _exam_result_rows(db: Session):
+    """
+    Sonuç listeleri için sadece gereken kolonları tek sorguda getirir
+    (ORM nesnesi ve lazy user/exam yüklemesi olmadan)
+    """
+    return (
+        db.query(
+            ExamResult.id,
+            ExamResult.user_id,
+            ExamResult.exam_id,
+            ExamResult.correct_answers,
+            ExamResult.incorrect_answers,
+            ExamResult.completed,
+            ExamResult.start_time,
+            ExamResult.end_time,
+            UserDB.full_name,
+            UserDB.email,
+            UserDB.school_name,
+            UserDB.branch,
+            UserDB.role,
+            Exam.title.label("exam_title")
+        )
+        .join(UserDB, ExamResult.user_id == UserDB.id)
+        .join(Exam, ExamResult.exam_id == Exam.id)
+    )
+
+
 @router.get("/exam-results", response_model=List[ExamResultWithUser])
 async def get_all_exam_results(
         current_user: UserDB = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_read_db)
 ):
     """Tüm sınav sonuçlarını getir (sadece admin)"""
     if current_user.role != "admin":
@@ -50,45 +87,9 @@ async def get_all_exam_results(
 
     try:
         # Tüm sınav sonuçlarını kullanıcı ve sınav bilgileriyle birlikte getir
-        results = (
-            db.query(ExamResult)
-            .join(UserDB, ExamResult.user_id == UserDB.id)
-            .join(Exam, ExamResult.exam_id == Exam.id)
-            .all()
-        )
-
-        exam_results = []
-        for result in results:
-            # Kullanıcı bilgilerini hazırla
-            user_data = {
-                "id": result.user.id,
-                "full_name": result.user.full_name,
-                "email": result.user.email,
-                "school_name": result.user.school_name,
-                "branch": result.user.branch,
-                "role": result.user.role
-            }
-
-            # Sınav bilgilerini hazırla
-            exam_data = {
-                "id": result.exam.id,
-                "title": result.exam.title
-            }
-
-            exam_results.append(ExamResultWithUser(
-                id=result.id,
-                user_id=result.user_id,
-                exam_id=result.exam_id,
-                correct_answers=result.correct_answers,
-                incorrect_answers=result.incorrect_answers,
-                completed=result.completed,
-                start_time=result.start_time.isoformat(),
-                end_time=result.end_time.isoformat(),
-                user=user_data,
-                exam=exam_data
-            ))
+        rows = _exam_result_rows(db).all()
 
-        return exam_results
+        return fast_response([exam_result_row(row) for row in rows])
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Veri getirilirken hata oluştu: {str(e)}")
@@ -98,7 +99,7 @@ async def get_all_exam_results(
 async def get_exam_result_answers(
         exam_result_id: int,
         current_user: UserDB = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_read_db)
 ):
     """Belirli bir sınav sonucunun cevap detaylarını getir (sadece admin)"""
     if current_user.role != "admin":
@@ -110,26 +111,24 @@ async def get_exam_result_answers(
         if not exam_result:
             raise HTTPException(status_code=404, detail="Sınav sonucu bulunamadı")
 
-        # Cevap detaylarını soru bilgileriyle birlikte getir
-        answers = (
-            db.query(Answer)
-            .join(Question, Answer.question_id == Question.id)
-            .filter(Answer.exam_result_id == exam_result_id)
-            .all()
-        )
+        # Cevap detaylarını soru bilgileriyle birlikte getir (satır veya paketlenmiş biçimden)
+        questions = {
+            question.id: question
+            for question in db.query(Question).filter(Question.exam_id == exam_result.exam_id)
+        }
+        answers = load_answers(db, [exam_result], sorted(questions))[exam_result.id]
 
         answer_details = []
         for answer in answers:
+            question = questions.get(answer.question_id)
+            if question is None:
+                continue
             # Soru bilgilerini hazırla
             question_data = {
-                "id": answer.question.id,
-                "text": answer.question.text,
-                "option_1": answer.question.option_1,
-                "option_2": answer.question.option_2,
-                "option_3": answer.question.option_3,
-                "option_4": answer.question.option_4,
-                "option_5": answer.question.option_5,
-                "correct_option_id": answer.question.correct_option_id + 1  # 1-based index için +1
+                "id": question.id,
+                "text": question.text,
+                **legacy_option_fields(question),
+                "correct_option_id": question.correct_option_id + 1  # 1-based index için +1
             }
 
             answer_details.append(AnswerDetail(
@@ -146,11 +145,119 @@ async def get_exam_result_answers(
         raise HTTPException(status_code=500, detail=f"Cevap detayları getirilirken hata oluştu: {str(e)}")
 
 
+@router.get("/exams/{exam_id}/item-analysis")
+def get_item_analysis(
+        exam_id: int,
+        current_user: UserDB = Depends(get_current_user),
+        db: Session = Depends(get_read_db)
+):
+    """Soru bazında şık dağılımı, zorluk (p), ayırt edicilik ve cevap değiştirme istatistikleri (sadece admin)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Yetkiniz yok")
+
+    if not db.query(Exam.id).filter(Exam.id == exam_id).first():
+        raise HTTPException(status_code=404, detail="Sınav bulunamadı")
+
+    return fast_response(item_analysis.get(exam_id))
+
+
+@router.post("/exams/{exam_id}/result-snapshots/rebuild")
+def rebuild_result_snapshots(
+        exam_id: int,
+        current_user: UserDB = Depends(get_current_user),
+        db: Session = Depends(get_db)
+):
+    """Sınavın hazır sonuç kağıtlarını yeniden üretir; soru düzeltmelerinden sonra çalıştırılır (sadece admin)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Yetkiniz yok")
+
+    if not db.query(Exam.id).filter(Exam.id == exam_id).first():
+        raise HTTPException(status_code=404, detail="Sınav bulunamadı")
+
+    return {"exam_id": exam_id, "rebuilt": rebuild_snapshots(exam_id)}
+
+
+@router.get("/exams/registration-counts")
+def get_registration_counts(
+        current_user: UserDB = Depends(get_current_user),
+        db: Session = Depends(get_read_db)
+):
+    """Sınav başına kayıt sayıları; sayaç kolonundan okunur (sadece admin)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Yetkiniz yok")
+
+    rows = db.query(Exam.id, Exam.title, Exam.status, Exam.exam_start_date, Exam.capacity,
+                    Exam.registration_count, Exam.waitlist_count).order_by(Exam.id).all()
+    return fast_response([
+        {
+            "exam_id": row.id,
+            "title": row.title,
+            "status": row.status,
+            "exam_start_date": row.exam_start_date.isoformat() if row.exam_start_date else None,
+            "capacity": row.capacity,
+            "registration_count": row.registration_count,
+            "waitlist_count": row.waitlist_count,
+        }
+        for row in rows
+    ])
+
+
+@router.get("/exams/{exam_id}/registrations")
+def get_exam_registrations(
+        exam_id: int,
+        after_id: int = Query(0, ge=0),
+        limit: int = Query(100, ge=1, le=1000),
+        status: Optional[str] = Query(None, pattern="^(registered|waitlisted)$"),
+        current_user: UserDB = Depends(get_current_user),
+        db: Session = Depends(get_read_db)
+):
+    """
+    Sınava kayıtlı öğrenciler, kayıt id'sine göre sayfalı (sadece admin).
+    Sonraki sayfa için dönen next_after_id, after_id olarak gönderilir; None ise liste bitmiştir.
+    status ile sadece kesin kayıtlar veya yedek liste alınabilir.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Yetkiniz yok")
+
+    counts = db.query(Exam.registration_count, Exam.waitlist_count).filter(Exam.id == exam_id).first()
+    if counts is None:
+        raise HTTPException(status_code=404, detail="Sınav bulunamadı")
+
+    rows = roster_page(db, exam_id, after_id, limit, status)
+    return fast_response({
+        "exam_id": exam_id,
+        "registration_count": counts.registration_count,
+        "waitlist_count": counts.waitlist_count,
+        "items": [roster_row(row) for row in rows],
+        "next_after_id": rows[-1].id if len(rows) == limit else None,
+    })
+
+
+@router.get("/exams/{exam_id}/registrations.csv")
+def export_exam_registrations(
+        exam_id: int,
+        current_user: UserDB = Depends(get_current_user),
+        db: Session = Depends(get_read_db)
+):
+    """Sınavın kayıt listesini CSV olarak akış halinde indirir (sadece admin)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Yetkiniz yok")
+
+    if not db.query(Exam.id).filter(Exam.id == exam_id).first():
+        raise HTTPException(status_code=404, detail="Sınav bulunamadı")
+
+    return StreamingResponse(
+        iter_roster_csv(exam_id),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="exam_{exam_id}_registrations.csv"'}
+    )
+
+
 @router.get("/exam-results/grade/{grade}")
 async def get_exam_results_by_grade(
         grade: str,
         current_user: UserDB = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_read_db)
 ):
     """Belirli bir sınıfın sınav sonuçlarını getir (sadece admin)"""
     if current_user.role != "admin":
@@ -158,44 +265,13 @@ async def get_exam_results_by_grade(
 
     try:
         # Belirli sınıftaki öğrencilerin sınav sonuçlarını getir
-        results = (
-            db.query(ExamResult)
-            .join(UserDB, ExamResult.user_id == UserDB.id)
-            .join(Exam, ExamResult.exam_id == Exam.id)
+        rows = (
+            _exam_result_rows(db)
             .filter(UserDB.branch == grade)
             .all()
         )
 
-        exam_results = []
-        for result in results:
-            user_data = {
-                "id": result.user.id,
-                "full_name": result.user.full_name,
-                "email": result.user.email,
-                "school_name": result.user.school_name,
-                "branch": result.user.branch,
-                "role": result.user.role
-            }
-
-            exam_data = {
-                "id": result.exam.id,
-                "title": result.exam.title
-            }
-
-            exam_results.append(ExamResultWithUser(
-                id=result.id,
-                user_id=result.user_id,
-                exam_id=result.exam_id,
-                correct_answers=result.correct_answers,
-                incorrect_answers=result.incorrect_answers,
-                completed=result.completed,
-                start_time=result.start_time.isoformat(),
-                end_time=result.end_time.isoformat(),
-                user=user_data,
-                exam=exam_data
-            ))
-
-        return exam_results
+        return fast_response([exam_result_row(row) for row in rows])
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Sınıf sonuçları getirilirken hata oluştu: {str(e)}")
@@ -205,7 +281,7 @@ async def get_exam_results_by_grade(
 async def get_exam_results_by_exam(
         exam_id: int,
         current_user: UserDB = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_read_db)
 ):
     """Belirli bir sınavın sonuçlarını getir (sadece admin)"""
     if current_user.role != "admin":
@@ -213,104 +289,95 @@ async def get_exam_results_by_exam(
 
     try:
         # Belirli sınavın sonuçlarını getir
-        results = (
-            db.query(ExamResult)
-            .join(UserDB, ExamResult.user_id == UserDB.id)
-            .join(Exam, ExamResult.exam_id == Exam.id)
+        rows = (
+            _exam_result_rows(db)
             .filter(ExamResult.exam_id == exam_id)
             .all()
         )
 
-        exam_results = []
-        for result in results:
-            user_data = {
-                "id": result.user.id,
-                "full_name": result.user.full_name,
-                "email": result.user.email,
-                "school_name": result.user.school_name,
-                "branch": result.user.branch,
-                "role": result.user.role
-            }
-
-            exam_data = {
-                "id": result.exam.id,
-                "title": result.exam.title
-            }
-
-            exam_results.append(ExamResultWithUser(
-                id=result.id,
-                user_id=result.user_id,
-                exam_id=result.exam_id,
-                correct_answers=result.correct_answers,
-                incorrect_answers=result.incorrect_answers,
-                completed=result.completed,
-                start_time=result.start_time.isoformat(),
-                end_time=result.end_time.isoformat(),
-                user=user_data,
-                exam=exam_data
-            ))
-
-        return exam_results
+        return fast_response([exam_result_row(row) for row in rows])
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Sınav sonuçları getirilirken hata oluştu: {str(e)}")
 
 
-@router.get("/exam-results/search/{search_term}")
-async def search_exam_results(
-        search_term: str,
+# Sonucu olan kullanıcıları ayıklarken tek sorguda bakılan aday sayısı
+SEARCH_SCAN_CHUNK = 1000
+
+
+def _search_page(db: Session, query: str, page: int, page_size: int) -> dict:
+    """
+    İndeksten puan sırasıyla gelen kullanıcılardan sonucu olanlar sayfalanır;
+    sayfadaki kullanıcıların tüm sonuçları kullanıcı sırasıyla döner
+    """
+    offset = (page - 1) * page_size
+    # Sonraki sayfa var mı diye bir kullanıcı fazlası aranır
+    needed = offset + page_size + 1
+    limit = needed
+    while True:
+        # İndeksten sadece ilk `limit` kullanıcı sıralanır; sonucu olmayanlar elenince yetmezse büyütülür
+        total, ranked = user_search.search(query, limit)
+        with_results = []
+        for start in range(0, len(ranked), SEARCH_SCAN_CHUNK):
+            chunk = ranked[start:start + SEARCH_SCAN_CHUNK]
+            has_results = set(db.execute(
+                select(ExamResult.user_id).where(ExamResult.user_id.in_(chunk)).distinct()
+            ).scalars().all())
+            with_results.extend(user_id for user_id in chunk if user_id in has_results)
+            if len(with_results) >= needed:
+                break
+        if len(with_results) >= needed or len(ranked) >= total:
+            break
+        limit *= 4
+
+    page_users = with_results[offset:offset + page_size]
+    rows = _exam_result_rows(db).filter(ExamResult.user_id.in_(page_users)).all() if page_users else []
+    positions = {user_id: position for position, user_id in enumerate(page_users)}
+    rows.sort(key=lambda row: (positions[row.user_id], row.id))
+    return {
+        "query": query,
+        "page": page,
+        "page_size": page_size,
+        "matched_users": total,
+        "has_more": len(with_results) > offset + page_size,
+        "items": [exam_result_row(row) for row in rows],
+    }
+
+
+@router.get("/exam-results/search")
+def search_exam_results(
+        q: str = Query(..., min_length=1, max_length=100),
+        page: int = Query(1, ge=1),
+        page_size: int = Query(20, ge=1, le=settings.SEARCH_MAX_PAGE_SIZE),
         current_user: UserDB = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_read_db)
 ):
-    """Öğrenci adı, email veya okul adına göre sınav sonuçlarını ara (sadece admin)"""
+    """
+    Öğrenci adı, email veya okul adına göre sınav sonuçlarını ara (sadece admin).
+    Türkçe karakterlere duyarsız, kelime başı ve kelime içi eşleşir; en iyi eşleşen öğrenciler önce gelir.
+    Sayfalama öğrenci bazındadır: sayfadaki her öğrencinin tüm sonuçları döner.
+    """
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Yetkiniz yok")
 
     try:
-        # Arama terimine göre sonuçları getir
-        results = (
-            db.query(ExamResult)
-            .join(UserDB, ExamResult.user_id == UserDB.id)
-            .join(Exam, ExamResult.exam_id == Exam.id)
-            .filter(
-                (UserDB.full_name.ilike(f"%{search_term}%")) |
-                (UserDB.email.ilike(f"%{search_term}%")) |
-                (UserDB.school_name.ilike(f"%{search_term}%"))
-            )
-            .all()
-        )
-
-        exam_results = []
-        for result in results:
-            user_data = {
-                "id": result.user.id,
-                "full_name": result.user.full_name,
-                "email": result.user.email,
-                "school_name": result.user.school_name,
-                "branch": result.user.branch,
-                "role": result.user.role
-            }
-
-            exam_data = {
-                "id": result.exam.id,
-                "title": result.exam.title
-            }
+        return fast_response(_search_page(db, q, page, page_size))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Arama sonuçları getirilirken hata oluştu: {str(e)}")
 
-            exam_results.append(ExamResultWithUser(
-                id=result.id,
-                user_id=result.user_id,
-                exam_id=result.exam_id,
-                correct_answers=result.correct_answers,
-                incorrect_answers=result.incorrect_answers,
-                completed=result.completed,
-                start_time=result.start_time.isoformat(),
-                end_time=result.end_time.isoformat(),
-                user=user_data,
-                exam=exam_data
-            ))
 
-        return exam_results
+@router.get("/exam-results/search/{search_term}", deprecated=True)
+def search_exam_results_by_path(
+        search_term: str,
+        current_user: UserDB = Depends(get_current_user),
+        db: Session = Depends(get_read_db)
+):
+    """Eski arama yolu; GET /admin/exam-results/search?q= kullanın. En iyi eşleşen öğrencilerin ilk sayfası"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Yetkiniz yok")
 
+    try:
+        return fast_response(_search_page(db, search_term, 1, settings.SEARCH_MAX_PAGE_SIZE)["items"])
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Arama sonuçları getirilirken hata oluştu: {str(e)}")
 
@@ -318,7 +385,7 @@ async def search_exam_results(
 @router.get("/exam-results/stats/summary")
 async def get_exam_results_summary(
         current_user: UserDB = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_read_db)
 ):
     """Sınav sonuçları özet istatistiklerini getir (sadece admin)"""
     if current_user.role != "admin":
@@ -377,6 +444,15 @@ def debug_scheduler_endpoint(
     
     try:
         debug_scheduler()
-        return {"message": "Debug bilgileri konsola yazdırıldı"}
+        return {"message": "Debug bilgileri loglara yazdırıldı"}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Debug hatası: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Debug hatası: {str(e)}")
+
+
+@router.get("/query-stats")
+def get_query_stats(current_user: UserDB = Depends(get_current_user)):
+    """Route bazında SQL sayısı ve DB süresi istatistikleri (sadece admin)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Yetkiniz yok")
+
+    return route_query_metrics.snapshot()
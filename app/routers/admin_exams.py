@@ -1,24 +1,33 @@
 from fastapi import APIRouter, Depends, HTTPException,Form
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from app.schemas.exam_schemas import ExamCreateRequest, ExamSCH, QuestionSCH
 from database import get_db
-from app.models.exam import Exam, Question, ExamResult
+from app.models.exam import Exam, Question, ExamResult, RescoreJob
 from app.routers.auth import get_current_user
 from app.models.user import UserDB
 from fastapi import File, UploadFile
 import os
 from app.services.storage import S3Service
+from app.services.registry import get_s3_service
 import pytz
 from datetime import datetime
-from pydantic import BaseModel
-from app.services.schedular import schedule_exam_events
+from pydantic import BaseModel, Field
+from app.services.schedular import schedule_exam_events, schedule_rescore_job
+from app.services.rescoring import create_rescore_job, job_progress
+from app.services.seats import promote_waitlist
+from app.services.cache import public_exams_cache
+from app.services.serialization import question_options
+from app.services.projections import student_questions, invalidate_student_questions
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 
 
 # Normal router yerine admin prefix'li router kullanalım
 router = APIRouter(prefix="/admin", tags=["admin"])
-s3_service = S3Service()
 
 
 class ExamCreateRequest(BaseModel):
@@ -29,6 +38,8 @@ class ExamCreateRequest(BaseModel):
     exam_start_date: datetime
     exam_end_date: datetime | None = None
     duration_minutes: int = 60  # Kullanıcının sınavı çözmek için kullandığı süre (dakika)
+    shuffle_questions: bool = False  # Soru/şık sırası öğrenci başına karıştırılsın mı
+    capacity: int | None = Field(None, ge=1)  # Kontenjan; None: sınırsız
 
 @router.post("/create-exam")
 def create_exam(
@@ -50,6 +61,8 @@ def create_exam(
                 exam_start_date=request.exam_start_date.replace(tzinfo=pytz.UTC),
                 exam_end_date=request.exam_end_date.replace(tzinfo=pytz.UTC) if request.exam_end_date else None,
                 duration_minutes=request.duration_minutes,
+                shuffle_questions=request.shuffle_questions,
+                capacity=request.capacity,
                 status='registration_pending'
             )
         else:
@@ -62,12 +75,14 @@ def create_exam(
                 exam_start_date=request.exam_start_date.replace(tzinfo=pytz.UTC),
                 exam_end_date=request.exam_end_date.replace(tzinfo=pytz.UTC) if request.exam_end_date else None,
                 duration_minutes=request.duration_minutes,
+                shuffle_questions=request.shuffle_questions,
                 status='registration_pending'
             )
 
         db.add(exam)
         db.commit()
         db.refresh(exam)
+        public_exams_cache.invalidate()
 
         # Sınav için scheduler job'larını ekle
         try:
@@ -78,9 +93,9 @@ def create_exam(
                 exam_start=exam.exam_start_date,
                 exam_end=exam.exam_end_date
             )
-            print(f"Yeni sınav {exam.id} için scheduler job'ları eklendi")
+            logger.info(f"Yeni sınav {exam.id} için scheduler job'ları eklendi")
         except Exception as e:
-            print(f"Scheduler job'ları eklenirken hata: {e}")
+            logger.error(f"Scheduler job'ları eklenirken hata: {e}")
 
         return {
             "message": "Sınav oluşturuldu",
@@ -105,7 +120,8 @@ async def add_question(
     correct_option_index: int = Form(...),
     image: UploadFile = File(None),
     db: Session = Depends(get_db),
-    current_user: UserDB = Depends(get_current_user)
+    current_user: UserDB = Depends(get_current_user),
+    s3_service: S3Service = Depends(get_s3_service)
 ):
     try:
         if current_user.role != "admin":
@@ -115,6 +131,12 @@ async def add_question(
         if not exam:
             raise HTTPException(status_code=404, detail="Sınav bulunamadı")
 
+        # Şık sayısı soruya göre değişebilir; doğru cevap 1-based
+        if len(options) < 2:
+            raise HTTPException(status_code=400, detail="Soru en az 2 şık içermeli")
+        if not 1 <= correct_option_index <= len(options):
+            raise HTTPException(status_code=400, detail=f"Doğru cevap 1 ile {len(options)} arasında olmalı")
+
         # Fotoğraf yükleme işlemi
         image_url = None
         if image:
@@ -129,17 +151,14 @@ async def add_question(
             exam_id=exam_id,
             text=text,
             image=image_url,  # Artık tam URL
-            option_1=options[0],
-            option_2=options[1],
-            option_3=options[2],
-            option_4=options[3],
-            option_5=options[4],
+            options=options,
             correct_option_id=correct_option_index
         )
 
         db.add(question)
         db.commit()
         db.refresh(question)
+        invalidate_student_questions(exam_id)
 
         return {
             "message": "Soru ve seçenekler başarıyla eklendi",
@@ -147,10 +166,144 @@ async def add_question(
             "image_url": image_url
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Hata: {str(e)}")
+        logger.error(f"Add question error: {str(e)}", extra={"exam_id": exam_id})
         raise HTTPException(status_code=500, detail=str(e))
 
+class CorrectOptionUpdate(BaseModel):
+    correct_option_id: int  # 1, 2, 3, 4, 5
+
+
+@router.put("/questions/{question_id}/correct-option", status_code=202)
+def update_correct_option(
+    question_id: int,
+    request: CorrectOptionUpdate,
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user)
+):
+    """Cevap anahtarını düzeltir ve soru için yeniden puanlama işini başlatır"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Yetkiniz yok")
+
+    question = db.query(Question).filter(Question.id == question_id).first()
+    if not question:
+        raise HTTPException(status_code=404, detail="Soru bulunamadı")
+
+    option_count = len(question_options(question))
+    if not 1 <= request.correct_option_id <= option_count:
+        raise HTTPException(status_code=400, detail=f"Doğru cevap 1 ile {option_count} arasında olmalı")
+
+    question.correct_option_id = request.correct_option_id
+    job = create_rescore_job(db, question.exam_id, question_id=question.id, created_by=current_user.id)
+    db.commit()
+    schedule_rescore_job(job.id)
+
+    return job_progress(job)
+
+
+class CapacityUpdate(BaseModel):
+    capacity: int | None = Field(None, ge=1)  # None: sınırsız
+
+
+@router.put("/exams/{exam_id}/capacity")
+def update_capacity(
+    exam_id: int,
+    request: CapacityUpdate,
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user)
+):
+    """
+    Kontenjanı değiştirir; artan koltuklar yedek listeden kayıt sırasıyla doldurulur.
+    Kontenjan mevcut kayıtların altına indirilirse kimse çıkarılmaz, yeni kayıtlar yedek listeye düşer.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Yetkiniz yok")
+
+    updated = db.execute(
+        update(Exam).where(Exam.id == exam_id).values(capacity=request.capacity)
+    ).rowcount
+    if not updated:
+        raise HTTPException(status_code=404, detail="Sınav bulunamadı")
+    promoted = promote_waitlist(db, exam_id)
+    db.commit()
+
+    counts = db.query(Exam.capacity, Exam.registration_count, Exam.waitlist_count).filter(Exam.id == exam_id).one()
+    return {
+        "exam_id": exam_id,
+        "capacity": counts.capacity,
+        "registration_count": counts.registration_count,
+        "waitlist_count": counts.waitlist_count,
+        "promoted": promoted,
+    }
+
+
+@router.post("/exams/{exam_id}/rescore", status_code=202)
+def rescore_exam(
+    exam_id: int,
+    question_id: int | None = None,
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user)
+):
+    """Sınavın (veya tek bir sorusunun) sonuçlarını mevcut cevap anahtarına göre yeniden puanlar"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Yetkiniz yok")
+
+    if not db.query(Exam.id).filter(Exam.id == exam_id).first():
+        raise HTTPException(status_code=404, detail="Sınav bulunamadı")
+    if question_id is not None and not db.query(Question.id).filter(
+            Question.id == question_id, Question.exam_id == exam_id).first():
+        raise HTTPException(status_code=404, detail="Soru bulunamadı")
+
+    job = create_rescore_job(db, exam_id, question_id=question_id, created_by=current_user.id)
+    db.commit()
+    schedule_rescore_job(job.id)
+
+    return job_progress(job)
+
+
+@router.get("/rescore-jobs/{job_id}")
+def get_rescore_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user)
+):
+    """Yeniden puanlama işinin durumu ve ilerlemesi"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Yetkiniz yok")
+
+    job = db.query(RescoreJob).filter(RescoreJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="İş bulunamadı")
+    return job_progress(job)
+
+
+@router.post("/rescore-jobs/{job_id}/retry", status_code=202)
+def retry_rescore_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user)
+):
+    """Başarısız işi kaldığı fazdan yeniden kuyruğa alır"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Yetkiniz yok")
+
+    job = db.query(RescoreJob).filter(RescoreJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="İş bulunamadı")
+    if job.status != "failed":
+        raise HTTPException(status_code=400, detail="Sadece başarısız işler yeniden denenebilir")
+
+    job.status = "pending"
+    job.error = None
+    job.finished_at = None
+    db.commit()
+    schedule_rescore_job(job.id)
+
+    return job_progress(job)
+
+
 @router.get("/exams/{exam_id}/submission-status")
 def check_submission_status(exam_id: int, current_user: UserDB = Depends(get_current_user), db: Session = Depends(get_db)):
     exam_result = db.query(ExamResult).filter(
@@ -184,15 +337,9 @@ async def publish_exam(
     exam.is_published = bool(publish)
     db.commit()
     db.refresh(exam)
+    public_exams_cache.invalidate()
 
-    questions_with_options = []
-    for question in exam.questions:
-        options = [question.option_1, question.option_2, question.option_3, question.option_4, question.option_5]
-        questions_with_options.append(QuestionSCH(
-            id=question.id,
-            text=question.text,
-            options=options
-        ))
+    questions_with_options = [QuestionSCH(**question) for question in student_questions(db, exam_id)]
 
     return ExamSCH(
         id=exam.id,
@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database import get_db
+from app.models.exam import Exam
+from app.models.user import UserDB
+from app.routers.auth import get_current_user
+from app.services.user_import import import_users, parse_csv
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.post("/users/import")
+def import_students(
+        file: UploadFile = File(...),
+        exam_ids: list[int] = Form([]),
+        db: Session = Depends(get_db),
+        current_user: UserDB = Depends(get_current_user)
+):
+    """
+    CSV'den toplu öğrenci oluşturur ve verilen sınavlara kaydeder.
+    Hatalı satırlar atlanır ve satır numarasıyla raporlanır; email'ler arka planda gönderilir.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Yetkiniz yok")
+
+    exam_ids = list(dict.fromkeys(exam_ids))
+    if exam_ids:
+        found = set(db.execute(select(Exam.id).where(Exam.id.in_(exam_ids))).scalars().all())
+        missing = [exam_id for exam_id in exam_ids if exam_id not in found]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Sınav bulunamadı: {missing}")
+
+    try:
+        rows, errors = parse_csv(file.file.read())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        report = import_users(db, rows, exam_ids)
+    except Exception as e:
+        db.rollback()
+        logger.exception(f"User import failed: {e}")
+        raise HTTPException(status_code=500, detail="İçe aktarma sırasında bir hata oluştu")
+
+    report["errors"] = errors
+    return report
@@ -6,44 +6,26 @@ from app.services.auth_service import (
     verify_password,
     get_password_hash,
     create_access_token,
-    get_current_user
+    create_purpose_token,
+    get_current_user,
+    RESET_TOKEN,
+    VERIFY_TOKEN
 )
 from database import get_db
 import logging
 from app.schemas.auth_schemas import ForgotPasswordRequest, ResetPasswordRequest
-from app.services.email import send_reset_email, send_verification_email
+from app.services.email import send_reset_email, send_verification_email, send_message
+from app.services.registry import load_env
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
-from pathlib import Path
+from fastapi_mail import MessageSchema
 from config import settings
-# Logging ayarları
-import logging
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log'),
-        logging.StreamHandler()
-    ]
-)
 
+# Logging ayarları app.services.log.setup_logging içinde yapılır
 logger = logging.getLogger(__name__)
 
-# Kullanımı:
-logger.info("Bilgi mesajı")
-logger.error("Hata mesajı")
-
-
-current_dir = Path(__file__).parent.absolute()
-env_path = current_dir.parent.parent / '.env'
-print(f"Looking for .env at: {env_path}")
-print(f"File exists: {env_path.exists()}")
-load_dotenv(dotenv_path=env_path)  # env_path'i tanımladıktan hemen sonra yükleyin
 
 router = APIRouter()
 SECRET_KEY = os.getenv('SECRET_KEY')
@@ -60,8 +42,8 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
     hashed_password = get_password_hash(user.password)
 
     # Verification token oluşturma
-    verification_token = create_access_token(
-        data={"sub": user.email}  # expires_delta parametresini kaldırdık
+    verification_token = create_purpose_token(
+        user.email, VERIFY_TOKEN, timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     )
 
     # Yeni kullanıcı oluşturma
@@ -85,13 +67,15 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
     await send_verification_email(user.email, verification_token)
 
     return {"message": "Kayıt başarılı. Lütfen email adresinizi doğrulayın"}
+# bcrypt doğrulaması event loop'u bloklamasın diye senkron (threadpool'da çalışır)
 @router.post("/token", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     user = db.query(UserDB).filter(UserDB.email == form_data.username).first()
     if not user:
         raise HTTPException(status_code=400, detail="Email veya şifre hatalı")
 
-    if not verify_password(form_data.password, user.hashed_password):
+    # Toplu içe aktarılan öğrenciler şifre belirleyene kadar giriş yapamaz
+    if not user.hashed_password or not verify_password(form_data.password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Email veya şifre hatalı")
 
     if not user.is_verified:
@@ -131,11 +115,7 @@ async def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(
 
     try:
         # 3. Token oluştur
-        token_data = {
-            "sub": user.email,
-            "exp": datetime.utcnow() + timedelta(minutes=30)
-        }
-        reset_token = jwt.encode(token_data, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+        reset_token = create_purpose_token(user.email, RESET_TOKEN, timedelta(minutes=30))
 
         # 4. Email gönder
         await send_reset_email(user.email, reset_token)
@@ -162,6 +142,10 @@ async def reset_password(request: ResetPasswordRequest, db: Session = Depends(ge
             if not email:
                 logger.error("Token'da email bilgisi bulunamadı")
                 raise HTTPException(status_code=400, detail="Geçersiz token formatı")
+            # Oturum veya doğrulama token'ı şifre değiştiremez
+            if payload.get("typ") != RESET_TOKEN:
+                logger.warning("Şifre sıfırlama için olmayan token kullanıldı")
+                raise HTTPException(status_code=400, detail="Geçersiz token")
 
             logger.info(f"Token doğrulandı, email: {email}")
 
@@ -180,6 +164,9 @@ async def reset_password(request: ResetPasswordRequest, db: Session = Depends(ge
         try:
             hashed_password = get_password_hash(request.new_password)
             user.hashed_password = hashed_password
+            # Link email'e gittiği için sahiplik doğrulanmış olur (toplu içe aktarılan öğrenciler)
+            user.is_verified = True
+            user.verification_token = None
             db.commit()
             logger.info(f"Şifre başarıyla güncellendi: {email}")
         except Exception as e:
@@ -214,7 +201,8 @@ async def verify_email(token: str, db: Session = Depends(get_db)):
         )
         email: str = payload.get("sub")
 
-        if email is None:
+        # Şifre sıfırlama linki de email'i doğrular (reset_password); oturum token'ı doğrulamaz
+        if email is None or payload.get("typ") not in (VERIFY_TOKEN, RESET_TOKEN):
             raise HTTPException(
                 status_code=400,
                 detail="Geçersiz token"
@@ -239,6 +227,8 @@ async def verify_email(token: str, db: Session = Depends(get_db)):
 
         return {"message": "Email adresi başarıyla doğrulandı"}
 
+    except HTTPException:
+        raise
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=400,
@@ -255,29 +245,9 @@ async def verify_email(token: str, db: Session = Depends(get_db)):
             detail="Doğrulama işlemi sırasında bir hata oluştu"
         )
 
-# conf tanımlamasından önce ekleyin
-mail_settings = {
-    'MAIL_USERNAME': os.environ.get('MAIL_USERNAME', 'akbasalifuat@gmail.com'),
-    'MAIL_PASSWORD': os.environ.get('MAIL_PASSWORD', 'dbbomqqmapxzriwa'),
-    'MAIL_FROM': os.environ.get('MAIL_FROM', 'akbasalifuat@gmail.com'),
-    'MAIL_SERVER': os.environ.get('MAIL_SERVER', 'smtp.gmail.com'),
-    'ADMIN_EMAIL': os.environ.get('ADMIN_EMAIL', 'huseyin.yildiz@eolimpiyat.com')
-}
-
-# Email konfigürasyonu
-conf = ConnectionConfig(
-    MAIL_USERNAME=mail_settings['MAIL_USERNAME'],
-    MAIL_PASSWORD=mail_settings['MAIL_PASSWORD'],
-    MAIL_FROM=mail_settings['MAIL_FROM'],
-    MAIL_PORT=int(os.environ.get('MAIL_PORT', '587')),
-    MAIL_SERVER=mail_settings['MAIL_SERVER'],
-    MAIL_STARTTLS=True,
-    MAIL_SSL_TLS=False,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True
-)
-
-ADMIN_EMAILS = [mail_settings['ADMIN_EMAIL']]
+def admin_emails() -> list[str]:
+    load_env()
+    return [os.environ.get('ADMIN_EMAIL', 'huseyin.yildiz@eolimpiyat.com')]
 
 @router.post("/applications")
 async def create_application(
@@ -313,13 +283,12 @@ async def create_application(
         # Admin bildirimi gönder
         message = MessageSchema(
             subject="Yeni Başvuru Bildirimi - E-Olimpiyat",
-            recipients=ADMIN_EMAILS,
+            recipients=admin_emails(),
             body=html_content,
             subtype="html"
         )
 
-        fm = FastMail(conf)
-        await fm.send_message(message)
+        await send_message(message)
 
         # Başvuru sahibine teşekkür maili gönder
         thank_you_content = f"""
@@ -346,7 +315,7 @@ async def create_application(
             subtype="html"
         )
 
-        await fm.send_message(thank_you_message)
+        await send_message(thank_you_message)
 
         return {"message": "Başvuru başarıyla alındı"}
 
@@ -1,13 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from app.schemas.exam_schemas import ExamSubmission, ExamResultResponse, ExamWithResult, QuestionResultDetail, ExamListResponse
-from database import get_db
-from app.models.exam import Exam, Question, ExamResult, Answer, ExamRegistration
+from sqlalchemy.exc import IntegrityError
+from app.schemas.exam_schemas import ExamSubmission, ExamResultResponse, ExamWithResult, ExamListResponse
+from database import get_db, get_read_db, ReadSessionLocal
+from app.models.exam import Exam, Question, ExamResult, Answer, ExamRegistration, UserExamSummary, ExamResultSnapshot
 from app.routers.auth import get_current_user
 from app.models.user import UserDB
-from datetime import datetime, timedelta
+from app.services.cache import public_exams_cache
+from app.services.results import save_result_summary, save_result_snapshot, publish_finalized_result, result_sheet
+from app.services.serialization import fast_response, question_options
+from app.services.projections import exam_access_row, cached_student_questions
+from app.services.shuffle import shuffle_questions, original_option, is_shuffled_for
+from app.services.answer_storage import store_answers, load_answers
+from app.services.roster import registration_fields
+from app.services.seats import claim_seat, REGISTERED, WAITLISTED
+from app.services.schedular import schedule_rank_refresh
+from datetime import datetime, timedelta, timezone
 
 from typing import List
+import gzip
+import logging
+
+logger = logging.getLogger(__name__)
 router = APIRouter()
 User = UserDB
 
@@ -68,17 +82,21 @@ def get_exams(
                         "exam_duration": exam_duration,  # Sınav süresini ekle
                         "can_register": exam.status == 'registration_open' and not registration,
                         "status": exam.status,
-                        "is_registered": bool(registration),
-                        "registration_status": "Sınav başlama tarihi bekleniyor" if registration else "Kayıt ol"
+                        "is_registered": bool(registration) and registration.status == REGISTERED,
+                        "registration_status": (
+                            "Kayıt ol" if not registration
+                            else "Yedek listede" if registration.status == WAITLISTED
+                            else "Sınav başlama tarihi bekleniyor"
+                        )
                     }
                 exam_list.append(exam_data)
             except Exception as exam_error:
-                print(f"Error processing exam {exam.id}: {str(exam_error)}")
+                logger.error(f"Error processing exam {exam.id}: {str(exam_error)}")
                 continue
 
         return exam_list
     except Exception as e:
-        print(f"Error in get_exams: {str(e)}")
+        logger.error(f"Error in get_exams: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -88,7 +106,7 @@ def get_exam(
         current_user: UserDB = Depends(get_current_user),
         db: Session = Depends(get_db)
 ):
-    exam = db.query(Exam).filter(Exam.id == exam_id).first()
+    exam = exam_access_row(db, exam_id)
     if not exam:
         raise HTTPException(status_code=404, detail="Sınav bulunamadı")
 
@@ -97,9 +115,11 @@ def get_exam(
         # Başvurusuz sınavlar için özel kontrol
         if exam.requires_registration:
             # Başvuru kontrolü
-            registration = db.query(ExamRegistration).filter(
+            # Yedek listedekiler sınava giremez
+            registration = db.query(ExamRegistration.id).filter(
                 ExamRegistration.user_id == current_user.id,
-                ExamRegistration.exam_id == exam_id
+                ExamRegistration.exam_id == exam_id,
+                ExamRegistration.status == REGISTERED
             ).first()
 
             if not registration:
@@ -115,21 +135,10 @@ def get_exam(
                 detail="Sınav henüz başlamamış veya süresi dolmuş"
             )
 
-    questions = []
-    for question in exam.questions:
-        options = [
-            question.option_1,
-            question.option_2,
-            question.option_3,
-            question.option_4,
-            question.option_5
-        ]
-        questions.append({
-            "id": question.id,
-            "text": question.text,
-            "options": options,
-            "image": question.image
-        })
+    # Kolon projeksiyonu: cevap anahtarı okunmaz, ORM nesnesi oluşturulmaz; liste sınav başına önbelleklenir
+    questions = cached_student_questions(db, exam_id)
+    if is_shuffled_for(exam.shuffle_questions, current_user):
+        questions = shuffle_questions(questions, exam_id, current_user.id)
 
     return {
         "id": exam.id,
@@ -161,9 +170,10 @@ def start_exam(
 
         # Başvuru kontrolü - sadece başvurulu sınavlar için
         if exam.requires_registration:
-            registration = db.query(ExamRegistration).filter(
+            registration = db.query(ExamRegistration.id).filter(
                 ExamRegistration.user_id == current_user.id,
-                ExamRegistration.exam_id == exam_id
+                ExamRegistration.exam_id == exam_id,
+                ExamRegistration.status == REGISTERED
             ).first()
 
             if not registration and current_user.role != "admin":
@@ -225,7 +235,7 @@ def start_exam(
         }
 
     except Exception as e:
-        print(f"Start exam error: {str(e)}")
+        logger.error(f"Start exam error: {str(e)}", extra={"exam_id": exam_id, "user_id": current_user.id})
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Sınav başlatılırken bir hata oluştu: {str(e)}")
 
@@ -270,7 +280,7 @@ def get_exam_time_status(
             "message": "Sınav devam ediyor"
         }
     except Exception as e:
-        print(f"Error in get_exam_time_status: {str(e)}")
+        logger.error(f"Error in get_exam_time_status: {str(e)}", extra={"exam_id": exam_id, "user_id": current_user.id})
         raise HTTPException(
             status_code=500,
             detail="Sınav süresi kontrol edilirken bir hata oluştu"
@@ -302,6 +312,12 @@ def submit_exam(
         if existing_result.completed:
                 raise HTTPException(status_code=400, detail="Bu sınav zaten tamamlanmış")
 
+        exam_title, shuffle_enabled, exam_status = (
+            db.query(Exam.title, Exam.shuffle_questions, Exam.status).filter(Exam.id == exam_id).one()
+        )
+        # get_exam ile aynı kural: admin'e orijinal sıra gösterildi, cevabı çevrilmez
+        shuffled = is_shuffled_for(shuffle_enabled, current_user)
+
         # Sınavın tüm sorularını al
         exam_questions = db.query(Question).filter(Question.exam_id == exam_id).all()
         questions_dict = {q.id: q for q in exam_questions}
@@ -309,21 +325,25 @@ def submit_exam(
         correct_count = 0
         incorrect_count = 0
 
-        # Önce mevcut cevapları sil (eğer varsa)
-        db.query(Answer).filter(Answer.exam_result_id == existing_result.id).delete()
-
         # Öğrenci cevaplarını kaydet ve doğru/yanlış sayısını hesapla
         answers_to_add = []
         for answer in submission.answers:
             question = questions_dict.get(answer.question_id)
             if question:
-                is_correct = answer.selected_option_id == question.correct_option_id
+                selected_option = answer.selected_option_id
+                if shuffled:
+                    # Öğrenci şıkları kendi sırasıyla gördü; orijinal şık numarasına çevir
+                    selected_option = original_option(
+                        exam_id, current_user.id, question.id, len(question_options(question)), selected_option
+                    )
+                is_correct = selected_option == question.correct_option_id
 
                 student_answer = Answer(
                     exam_result_id=existing_result.id,
                     question_id=question.id,
-                    selected_option=answer.selected_option_id,
-                    is_correct=is_correct
+                    selected_option=selected_option,
+                    is_correct=is_correct,
+                    change_count=answer.change_count
                 )
                 answers_to_add.append(student_answer)
 
@@ -332,8 +352,8 @@ def submit_exam(
                 else:
                     incorrect_count += 1
 
-        # Toplu olarak cevapları ekle
-        db.bulk_save_objects(answers_to_add)
+        # Cevapları saklama moduna göre yaz (Answer satırları ve/veya paketlenmiş)
+        store_answers(db, existing_result, sorted(questions_dict), answers_to_add)
 
         total_questions = len(exam_questions)
         if total_questions == 0:
@@ -346,46 +366,45 @@ def submit_exam(
         existing_result.incorrect_answers = incorrect_count
         existing_result.completed = True  # Sınavı tamamlandı olarak işaretle
         existing_result.auto_completed = False
+        existing_result.completed_at = current_time
+
+        # Geçmiş ekranı için özet satırı aynı transaction içinde yazılır
+        save_result_summary(db, existing_result, exam_title, total_questions)
+        # Sonuç kağıdı bir kez üretilip sıkıştırılmış olarak saklanır
+        save_result_snapshot(db, existing_result, exam_questions, answers_to_add)
+
         # Soru detaylarını al
+        answers_by_question = {ans.question_id: ans for ans in answers_to_add}
         questions_with_answers = []
         for question in exam_questions:
-            student_answer = next(
-                (ans for ans in answers_to_add if ans.question_id == question.id),
-                None
-            )
+            student_answer = answers_by_question.get(question.id)
 
-            options = [
-                question.option_1,
-                question.option_2,
-                question.option_3,
-                question.option_4,
-                question.option_5
-            ]
-            # None değerleri listeden çıkar
-            options = [opt for opt in options if opt is not None]
-
-            questions_with_answers.append(QuestionResultDetail(
-                question_text=question.text,
-                question_image=question.image_url if hasattr(question, 'image_url') else None,
-                options=options,
-                correct_option=question.correct_option_id,
-                student_answer=student_answer.selected_option if student_answer else None,
-                is_correct=student_answer.is_correct if student_answer else False
-            ))
+            questions_with_answers.append({
+                "question_text": question.text,
+                "question_image": question.image_url if hasattr(question, 'image_url') else None,
+                "options": question_options(question),
+                "correct_option": question.correct_option_id,
+                "student_answer": student_answer.selected_option if student_answer else None,
+                "is_correct": student_answer.is_correct if student_answer else False
+            })
 
         # Değişiklikleri kaydet
         db.commit()
-
-        return ExamResultResponse(
-            correct_answers=correct_count,
-            incorrect_answers=incorrect_count,
-            total_questions=total_questions,
-            score_percentage=score_percentage,
-            questions=questions_with_answers
-        )
+        publish_finalized_result(existing_result, current_user, answers_to_add)
+        if exam_status == "completed":
+            # Sınav bitişinden sonra kendi süresi içinde teslim edildi; yazılmış sıralar eksik kaldı
+            schedule_rank_refresh(exam_id)
+
+        return fast_response({
+            "correct_answers": correct_count,
+            "incorrect_answers": incorrect_count,
+            "total_questions": total_questions,
+            "score_percentage": score_percentage,
+            "questions": questions_with_answers
+        })
 
     except Exception as e:
-        print(f"Hata detayı: {str(e)}")
+        logger.error(f"Submit exam error: {str(e)}", extra={"exam_id": exam_id, "user_id": current_user.id})
         db.rollback()
         raise HTTPException(
             status_code=500,
@@ -394,11 +413,27 @@ def submit_exam(
 
 
 @router.get("/exam-results/{exam_id}", response_model=ExamResultResponse)
-async def get_exam_result(
+def get_exam_result(
         exam_id: int,
+        request: Request,
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_read_db)
 ):
+    # Kesinleşmiş sonuçlar için hazır (gzip'li) sonuç kağıdı
+    payload = (
+        db.query(ExamResultSnapshot.payload)
+        .filter(ExamResultSnapshot.exam_id == exam_id, ExamResultSnapshot.user_id == current_user.id)
+        .scalar()
+    )
+    if payload is not None:
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            return Response(
+                content=payload,
+                media_type="application/json",
+                headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+            )
+        return Response(content=gzip.decompress(payload), media_type="application/json")
+
     result = (
         db.query(ExamResult)
         .filter(
@@ -414,75 +449,49 @@ async def get_exam_result(
             detail="Bu sınav için sonuç bulunamadı"
         )
 
+    # Snapshot'ı olmayan (devam eden veya henüz üretilmemiş) sonuçlar için anlık hesap
     exam_questions = (
         db.query(Question)
         .filter(Question.exam_id == exam_id)
         .all()
     )
 
-    student_answers = (
-        db.query(Answer)
-        .filter(Answer.exam_result_id == result.id)
-        .all()
-    )
-
-    questions_with_answers = []
-    for question in exam_questions:
-        student_answer = next(
-            (ans for ans in student_answers if ans.question_id == question.id),
-            None
-        )
-
-        options = [
-            question.option_1,
-            question.option_2,
-            question.option_3,
-            question.option_4,
-            question.option_5
-        ]
-        options = [opt for opt in options if opt is not None]
-
-        # Doğru cevap indeksi 0'dan başlıyor (0=1.şık, 1=2.şık, ...)
-        correct_option_index = question.correct_option_id - 1
-
-        questions_with_answers.append({
-            "question_text": question.text,
-            "question_image": question.image if hasattr(question, 'image') else None,
-            "options": options,
-            "correct_option": correct_option_index,  # 0-based index (0=1.şık, 1=2.şık, ...)
-            "student_answer": student_answer.selected_option - 1 if student_answer else None,  # Öğrencinin cevabını da 0-based yap
-            "is_correct": student_answer.is_correct if student_answer else False
-        })
-
-    total_questions = result.correct_answers + result.incorrect_answers
-    score_percentage = (result.correct_answers / total_questions * 100) if total_questions > 0 else 0
+    student_answers = load_answers(db, [result], sorted(question.id for question in exam_questions))[result.id]
 
-    return {
-        "correct_answers": result.correct_answers,
-        "incorrect_answers": result.incorrect_answers,
-        "total_questions": total_questions,
-        "score_percentage": round(score_percentage, 2),
-        "questions": questions_with_answers
-    }
+    return fast_response(result_sheet(result, exam_questions, student_answers))
 
 @router.get("/user/completed-exams", response_model=List[ExamWithResult])
-async def get_completed_exams(
+def get_completed_exams(
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_read_db)
 ):
-    # Kullanıcının sonuçları olan sınavları getir
-    completed_exams = (
-        db.query(Exam)
-        .join(ExamResult, Exam.id == ExamResult.exam_id)
-        .filter(ExamResult.user_id == current_user.id)
+    # Sonuç özetleri (user_id, completed_at) indeksiyle tek sorguda gelir
+    summaries = (
+        db.query(UserExamSummary)
+        .filter(UserExamSummary.user_id == current_user.id)
+        .order_by(UserExamSummary.completed_at.desc())
         .all()
     )
 
-    return completed_exams
+    return [
+        {
+            "id": summary.exam_id,
+            "title": summary.exam_title,
+            "has_been_taken": True,
+            "correct_answers": summary.correct_answers,
+            "incorrect_answers": summary.incorrect_answers,
+            "total_questions": summary.total_questions,
+            "score_percentage": summary.score_percentage,
+            "completion_date": summary.completed_at,
+            "rank": summary.rank,
+            "participants": summary.participants
+        }
+        for summary in summaries
+    ]
 
 
 @router.post("/exams/{exam_id}/register")
-async def register_for_exam(
+def register_for_exam(
         exam_id: int,
         current_user: UserDB = Depends(get_current_user),
         db: Session = Depends(get_db)
@@ -511,33 +520,49 @@ async def register_for_exam(
                 detail="Bu sınava zaten kayıt oldunuz"
             )
 
-        # Yeni kayıt
+        # Koltuk sayaç üzerinden koşullu UPDATE ile alınır; kontenjan doluysa yedek liste
+        status = claim_seat(db, exam_id)
         registration = ExamRegistration(
             user_id=current_user.id,
             exam_id=exam_id,
-            registration_date=datetime.utcnow()
+            registration_date=datetime.utcnow(),
+            status=status,
+            **registration_fields(current_user)
         )
 
         db.add(registration)
-        db.commit()
-
+        try:
+            db.commit()
+        except IntegrityError:
+            # Aynı kullanıcının eşzamanlı ikinci isteği; rollback sayacı da geri alır
+            db.rollback()
+            raise HTTPException(status_code=400, detail="Bu sınava zaten kayıt oldunuz")
+
+        if status == WAITLISTED:
+            return {
+                "message": "Sınav kontenjanı dolu, yedek listeye alındınız",
+                "status": status,
+                "exam_date": exam.exam_start_date.strftime("%d.%m.%Y %H:%M")
+            }
         return {
             "message": "Sınava başarıyla kayıt oldunuz",
+            "status": status,
             "exam_date": exam.exam_start_date.strftime("%d.%m.%Y %H:%M")
         }
 
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"Registration error: {str(e)}")
+        logger.error(f"Registration error: {str(e)}", extra={"exam_id": exam_id, "user_id": current_user.id})
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/public/exams", response_model=List[ExamListResponse])
-def get_public_exams(
-        db: Session = Depends(get_db)
-):
+def load_public_exams():
+    """
+    Public sınav kataloğunu veritabanından yükler (önbellek loader'ı)
+    """
+    db = ReadSessionLocal()
     try:
         current_time = datetime.utcnow()
 
@@ -556,10 +581,10 @@ def get_public_exams(
                 "id": exam.id,
                 "title": exam.title,
                 "requires_registration": exam.requires_registration,
-                "registration_start_date": exam.registration_start_date,
-                "registration_end_date": exam.registration_end_date,
-                "exam_start_date": exam.exam_start_date,
-                "exam_end_date": exam.exam_end_date,
+                "registration_start_date": _isoformat(exam.registration_start_date),
+                "registration_end_date": _isoformat(exam.registration_end_date),
+                "exam_start_date": _isoformat(exam.exam_start_date),
+                "exam_end_date": _isoformat(exam.exam_end_date),
                 "exam_duration": exam_duration,  # Sınav süresini ekle
                 "can_register": exam.status == 'registration_open',
                 "status": exam.status,
@@ -568,7 +593,31 @@ def get_public_exams(
             }
             exam_list.append(exam_data)
 
+        # İlk sınav başladığında katalog geçersiz olur
+        start_dates = [exam.exam_start_date for exam in exams if exam.exam_start_date]
+        expires_at = _timestamp(min(start_dates)) if start_dates else None
+        return exam_list, expires_at
+    finally:
+        db.close()
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _timestamp(value):
+    # Veritabanındaki naive tarihler UTC kabul edilir
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+@router.get("/public/exams", response_model=List[ExamListResponse])
+def get_public_exams(response: Response):
+    try:
+        exam_list, max_age = public_exams_cache.get(load_public_exams)
+        response.headers["Cache-Control"] = public_exams_cache.cache_control(max_age)
         return exam_list
     except Exception as e:
-        print(f"Error in get_public_exams: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        logger.error(f"Error in get_public_exams: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
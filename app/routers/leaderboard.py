@@ -0,0 +1,78 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import get_read_db
+from app.models.exam import Exam
+from app.models.user import UserDB
+from app.routers.auth import get_current_user
+from app.services.leaderboard import SCOPES, leaderboards
+from app.services.serialization import fast_response
+
+router = APIRouter(tags=["leaderboard"])
+
+
+def _check_visible(exam_id: int, current_user: UserDB, db: Session):
+    exam = db.query(Exam.id, Exam.status).filter(Exam.id == exam_id).first()
+    if not exam:
+        raise HTTPException(status_code=404, detail="Sınav bulunamadı")
+    # Öğrenciler sıralamayı sınav bittikten sonra görür
+    if current_user.role != "admin" and exam.status != "completed":
+        raise HTTPException(status_code=403, detail="Sıralama sınav tamamlandıktan sonra açıklanacak")
+
+
+def _entry(entry: dict) -> dict:
+    return {
+        "rank": entry["rank"],
+        "user_id": entry["user_id"],
+        "full_name": entry["full_name"],
+        "branch": entry["branch"],
+        "school": entry["school"],
+        "correct_answers": entry["correct_answers"],
+        "incorrect_answers": entry["incorrect_answers"],
+        "completed_at": entry["completed_at"].isoformat() if entry["completed_at"] else None,
+    }
+
+
+@router.get("/exams/{exam_id}/leaderboard")
+def get_leaderboard(
+        exam_id: int,
+        scope: str = Query("exam", description="exam | branch | school"),
+        value: Optional[str] = Query(None, description="Sınıf veya okul (sadece admin)"),
+        limit: int = Query(10, ge=1),
+        current_user: UserDB = Depends(get_current_user),
+        db: Session = Depends(get_read_db)
+):
+    """Sınav, sınıf veya okul bazında ilk N sonuç"""
+    if scope not in SCOPES:
+        raise HTTPException(status_code=400, detail=f"Geçersiz scope, şunlardan biri olmalı: {', '.join(SCOPES)}")
+    _check_visible(exam_id, current_user, db)
+
+    # Öğrenci kendi sınıfının / okulunun listesini görür
+    if current_user.role != "admin" or value is None:
+        value = {"exam": None, "branch": current_user.branch, "school": current_user.school_name}[scope]
+
+    entries = leaderboards.top(exam_id, min(limit, settings.LEADERBOARD_MAX_LIMIT), scope, value)
+    return fast_response({
+        "exam_id": exam_id,
+        "scope": scope,
+        "value": value,
+        "entries": [_entry(entry) for entry in entries]
+    })
+
+
+@router.get("/exams/{exam_id}/leaderboard/me")
+def get_my_rank(
+        exam_id: int,
+        current_user: UserDB = Depends(get_current_user),
+        db: Session = Depends(get_read_db)
+):
+    """Kullanıcının sınav geneli, sınıf ve okul sıralaması"""
+    _check_visible(exam_id, current_user, db)
+
+    ranks = leaderboards.rank(exam_id, current_user.id)
+    if not ranks:
+        raise HTTPException(status_code=404, detail="Bu sınav için tamamlanmış sonuç bulunamadı")
+    return {"exam_id": exam_id, **ranks}
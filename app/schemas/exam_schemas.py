@@ -30,6 +30,7 @@ class ExamListResponse(BaseModel):
 class QuestionAnswerSubmission(BaseModel):
     question_id: int
     selected_option_id: int
+    change_count: int = 0  # Frontend gönderirse: cevabın kaç kez değiştirildiği (madde analizi için)
 
 class ExamSubmission(BaseModel):
     answers: List[QuestionAnswerSubmission]
@@ -90,8 +91,11 @@ class ExamWithResult(BaseModel):
     has_been_taken: bool = True
     correct_answers: Optional[int] = None
     incorrect_answers: Optional[int] = None
+    total_questions: Optional[int] = None
     score_percentage: Optional[float] = None
     completion_date: Optional[datetime] = None
+    rank: Optional[int] = None
+    participants: Optional[int] = None
 
     class Config:
         from_attributes = True
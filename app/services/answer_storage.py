@@ -0,0 +1,184 @@
+"""
+Sonuç cevaplarının saklanması; ANSWER_STORAGE_MODE ile seçilir:
+
+- rows: soru başına bir Answer satırı (eski biçim)
+- packed: sonuç başına tek satır, ExamResult.answer_data + correct_bitmap
+- both: geçiş dönemi; ikisine de yazar, okurken paketlenmiş olan tercih edilir
+
+Paketlenmiş biçim:
+
+- Sorular sınav içinde Question.id sırasına göre konumlanır (i. soru = i. konum)
+- answer_data: konum başına 2 byte -> [seçilen şık (0: boş, 1-255), cevap değiştirme sayısı (255'te kesilir)]
+- correct_bitmap: konum başına 1 bit; i. konum = byte i // 8, bit i % 8
+
+Okuyan taraflar Answer satırı veya PackedAnswer alır; ikisi de aynı alanlara sahiptir.
+"""
+import logging
+from collections import namedtuple
+
+from sqlalchemy import select
+
+from config import settings
+from database import SessionLocal
+from app.models.exam import Answer, ExamResult, Question
+
+logger = logging.getLogger(__name__)
+
+PackedAnswer = namedtuple("PackedAnswer", "id exam_result_id question_id selected_option is_correct change_count")
+
+
+def writes_rows() -> bool:
+    return settings.ANSWER_STORAGE_MODE in ("rows", "both")
+
+
+def writes_packed() -> bool:
+    return settings.ANSWER_STORAGE_MODE in ("packed", "both")
+
+
+def exam_question_ids(db, exam_id: int) -> list:
+    return db.execute(
+        select(Question.id).where(Question.exam_id == exam_id).order_by(Question.id)
+    ).scalars().all()
+
+
+def pack_answers(question_ids: list, answers) -> tuple:
+    """
+    Cevapları (question_id, selected_option, is_correct, change_count alanları olan nesneler)
+    (answer_data, correct_bitmap) byte'larına çevirir
+    """
+    positions = {question_id: position for position, question_id in enumerate(question_ids)}
+    data = bytearray(2 * len(question_ids))
+    bitmap = bytearray((len(question_ids) + 7) // 8)
+    for answer in answers:
+        position = positions.get(answer.question_id)
+        if position is None or not answer.selected_option or not 0 < answer.selected_option < 256:
+            continue
+        data[2 * position] = answer.selected_option
+        data[2 * position + 1] = min(answer.change_count or 0, 255)
+        if answer.is_correct:
+            bitmap[position // 8] |= 1 << (position % 8)
+    return bytes(data), bytes(bitmap)
+
+
+def is_set(bitmap: bytes, position: int) -> bool:
+    byte = position // 8
+    return byte < len(bitmap) and bool(bitmap[byte] >> (position % 8) & 1)
+
+
+def count_correct(bitmap: bytes) -> int:
+    return sum(bin(byte).count("1") for byte in bitmap or b"")
+
+
+def unpack_answers(result_id: int, question_ids: list, answer_data: bytes, correct_bitmap: bytes) -> list:
+    """
+    Paketlenmiş cevapları PackedAnswer listesine açar; boş bırakılan sorular atlanır
+    """
+    answers = []
+    for position, question_id in enumerate(question_ids[:len(answer_data) // 2]):
+        selected_option = answer_data[2 * position]
+        if selected_option:
+            answers.append(PackedAnswer(
+                None, result_id, question_id, selected_option,
+                is_set(correct_bitmap, position), answer_data[2 * position + 1]
+            ))
+    return answers
+
+
+def regrade(question_ids: list, answer_data: bytes, correct_options: dict) -> bytes:
+    """
+    Paketlenmiş cevapları verilen cevap anahtarına ({question_id: correct_option_id}) göre yeniden işaretler
+    """
+    bitmap = bytearray((len(question_ids) + 7) // 8)
+    for position, question_id in enumerate(question_ids[:len(answer_data) // 2]):
+        selected_option = answer_data[2 * position]
+        if selected_option and selected_option == correct_options.get(question_id):
+            bitmap[position // 8] |= 1 << (position % 8)
+    return bytes(bitmap)
+
+
+def store_answers(db, result: ExamResult, question_ids: list, answers: list):
+    """
+    Sonucun cevaplarını moda göre yazar; önceki cevapların yerine geçer
+    """
+    if writes_rows():
+        db.query(Answer).filter(Answer.exam_result_id == result.id).delete()
+        db.bulk_save_objects(answers)
+    if writes_packed():
+        result.answer_data, result.correct_bitmap = pack_answers(question_ids, answers)
+    else:
+        result.answer_data = result.correct_bitmap = None
+
+
+def load_answers(db, results: list, question_ids: list) -> dict:
+    """
+    Aynı sınavın sonuçları için {result_id: [cevap]}; paketlenmiş sonuçlar satır sorgusu gerektirmez
+    """
+    answers = {}
+    row_result_ids = []
+    for result in results:
+        if result.answer_data is not None:
+            answers[result.id] = unpack_answers(result.id, question_ids, result.answer_data, result.correct_bitmap)
+        else:
+            answers[result.id] = []
+            row_result_ids.append(result.id)
+    if row_result_ids:
+        for answer in db.query(Answer).filter(Answer.exam_result_id.in_(row_result_ids)):
+            answers[answer.exam_result_id].append(answer)
+    return answers
+
+
+def convert_results(target: str, exam_id: int = None, keep_rows: bool = False, chunk_size: int = 500) -> int:
+    """
+    Mevcut sonuçları bir biçimden diğerine taşır (target: packed | rows); parça başına bir transaction.
+    keep_rows: packed'e geçerken Answer satırlarını silme (both modu için)
+    """
+    if target not in ("packed", "rows"):
+        raise ValueError("target packed veya rows olmalı")
+
+    db = SessionLocal()
+    converted = 0
+    try:
+        exam_query = select(ExamResult.exam_id).distinct()
+        if exam_id is not None:
+            exam_query = exam_query.where(ExamResult.exam_id == exam_id)
+        for current_exam_id in db.execute(exam_query).scalars().all():
+            question_ids = exam_question_ids(db, current_exam_id)
+            pending = ExamResult.answer_data.is_(None) if target == "packed" else ExamResult.answer_data.isnot(None)
+            last_id = 0
+            while True:
+                results = (
+                    db.query(ExamResult)
+                    .filter(ExamResult.exam_id == current_exam_id, pending, ExamResult.id > last_id)
+                    .order_by(ExamResult.id)
+                    .limit(chunk_size)
+                    .all()
+                )
+                if not results:
+                    break
+                answers = load_answers(db, results, question_ids)
+                result_ids = [result.id for result in results]
+                if target == "packed":
+                    for result in results:
+                        result.answer_data, result.correct_bitmap = pack_answers(question_ids, answers[result.id])
+                    if not keep_rows:
+                        db.query(Answer).filter(Answer.exam_result_id.in_(result_ids)).delete(synchronize_session=False)
+                else:
+                    db.query(Answer).filter(Answer.exam_result_id.in_(result_ids)).delete(synchronize_session=False)
+                    db.bulk_save_objects([
+                        Answer(exam_result_id=answer.exam_result_id, question_id=answer.question_id,
+                               selected_option=answer.selected_option, is_correct=answer.is_correct,
+                               change_count=answer.change_count)
+                        for result in results for answer in answers[result.id]
+                    ])
+                    for result in results:
+                        result.answer_data = result.correct_bitmap = None
+                db.commit()
+                converted += len(results)
+                last_id = result_ids[-1]
+            logger.info(f"Answers converted to {target} for exam {current_exam_id}", extra={"exam_id": current_exam_id})
+        return converted
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
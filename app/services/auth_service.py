@@ -3,6 +3,7 @@ from fastapi.security import OAuth2PasswordBearer
 from jwt import PyJWTError
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
+from typing import Optional
 from sqlalchemy.orm import Session
 import jwt
 from config import settings
@@ -12,6 +13,10 @@ from app.models.user import UserDB
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Email linklerindeki token'ların amacı ("typ" claim'i); bu claim'i taşıyan token oturum açmaz
+RESET_TOKEN = "reset"
+VERIFY_TOKEN = "verify"
+
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -29,13 +34,42 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def create_purpose_token(email: str, purpose: str, expires: timedelta) -> str:
+    """
+    Şifre sıfırlama / email doğrulama linki için token; sadece ilgili endpoint kabul eder
+    """
+    expire = datetime.utcnow() + expires
+    return jwt.encode({"sub": email, "typ": purpose, "exp": expire}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def token_subject(token: str) -> Optional[str]:
+    """
+    Oturum token'ı geçerliyse içindeki email'i (sub) döner, değilse None. DB'ye gitmez.
+    Email linki token'ları (typ claim'i olan) reddedilir.
+    """
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(status_code=401, detail="Geçersiz kimlik doğrulama")
     except PyJWTError:
+        return None
+    if payload.get("typ") is not None:
+        return None
+    return payload.get("sub")
+
+
+def authorization_subject(authorization: Optional[str]) -> Optional[str]:
+    """
+    "Bearer <token>" header değerinden kullanıcı email'ini döner (middleware'ler için)
+    """
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token_subject(token)
+
+
+# Senkron tanımlı: FastAPI threadpool'da çalıştırır, havuzdan bağlantı beklerken event loop bloklanmaz
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    email = token_subject(token)
+    if email is None:
         raise HTTPException(status_code=401, detail="Geçersiz kimlik doğrulama")
 
     user = db.query(UserDB).filter(UserDB.email == email).first()
@@ -0,0 +1,256 @@
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryBackend:
+    """
+    Süreç içi basit anahtar/değer deposu (varsayılan backend)
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key: str, ttl: Optional[int] = None) -> int:
+        """
+        Sayacı atomik olarak artırır; süre sadece anahtar ilk oluştuğunda ayarlanır
+        """
+        now = time.time()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or (item[1] is not None and item[1] <= now):
+                item = (b"0", now + ttl if ttl else None)
+            value = int(item[0]) + 1
+            self._data[key] = (str(value).encode(), item[1])
+            return value
+
+
+class FakeRedis:
+    """
+    Testler ve yerel geliştirme için redis-py istemcisinin kullandığımız
+    kısmını (get/set/delete) taklit eder
+    """
+
+    def __init__(self):
+        self._store = InMemoryBackend()
+
+    def get(self, key):
+        return self._store.get(key)
+
+    def set(self, key, value, ex=None):
+        if isinstance(value, str):
+            value = value.encode()
+        self._store.set(key, value, ex)
+        return True
+
+    def delete(self, *keys):
+        for key in keys:
+            self._store.delete(key)
+        return len(keys)
+
+    def incr(self, key):
+        return self._store.incr(key)
+
+    def expire(self, key, seconds):
+        with self._store._lock:
+            item = self._store._data.get(key)
+            if item is None:
+                return False
+            self._store._data[key] = (item[0], time.time() + seconds)
+            return True
+
+
+class RedisBackend:
+    """
+    Birden fazla worker arasında paylaşılan Redis backend'i
+    """
+
+    def __init__(self, client, prefix: str = "emath:"):
+        self._client = client
+        self._prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(self._prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None):
+        self._client.set(self._prefix + key, value, ex=ttl)
+
+    def delete(self, key: str):
+        self._client.delete(self._prefix + key)
+
+    def incr(self, key: str, ttl: Optional[int] = None) -> int:
+        value = self._client.incr(self._prefix + key)
+        if value == 1 and ttl:
+            self._client.expire(self._prefix + key, ttl)
+        return value
+
+
+def create_cache_backend(name: str = None):
+    name = name or settings.CACHE_BACKEND
+    if name == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis için 'redis' paketi kurulu olmalı")
+        return RedisBackend(redis.Redis.from_url(settings.REDIS_URL))
+    if name == "fakeredis":
+        return RedisBackend(FakeRedis())
+    return InMemoryBackend()
+
+
+class SingleFlight:
+    """
+    Aynı anahtar için eşzamanlı yüklemeleri tek bir çağrıda birleştirir.
+    İlk gelen yükler, diğerleri onun sonucunu bekler.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {"event": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+
+        if not leader:
+            call["event"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = fn()
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call["event"].set()
+
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._calls
+
+
+class StaleWhileRevalidateCache:
+    """
+    Bir loader fonksiyonunun sonucunu önbellekte tutar.
+
+    - fresh süresi içinde doğrudan önbellekten döner
+    - stale süresi içinde eski veriyi döner ve arka planda yeniler
+    - önbellek boşsa eşzamanlı istekler tek bir yüklemede birleşir
+
+    Loader `(value, expires_at)` döndürür; expires_at (epoch) verilirse
+    kayıt o andan sonra hiç sunulmaz (ör. sınav başlangıcı).
+    """
+
+    def __init__(self, backend, key: str, ttl: int, stale_ttl: int):
+        self.backend = backend
+        self.key = key
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._flight = SingleFlight()
+        self._generation = 0
+
+    def get(self, loader: Callable[[], Tuple[Any, Optional[float]]]) -> Tuple[Any, int]:
+        """
+        (value, max_age) döner. max_age Cache-Control için kalan taze süredir.
+        """
+        now = time.time()
+        entry = self._read()
+        if entry is not None:
+            if now < entry["fresh_until"]:
+                return entry["value"], int(entry["fresh_until"] - now)
+            if now < entry["stale_until"]:
+                self._revalidate_in_background(loader)
+                return entry["value"], 0
+
+        entry = self._flight.do(self.key, lambda: self._load(loader))
+        return entry["value"], max(int(entry["fresh_until"] - time.time()), 0)
+
+    def invalidate(self):
+        self._generation += 1
+        self.backend.delete(self.key)
+
+    def _read(self):
+        raw = self.backend.get(self.key)
+        if raw is None:
+            return None
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    def _load(self, loader):
+        generation = self._generation
+        value, expires_at = loader()
+        now = time.time()
+        fresh_until = now + self.ttl
+        stale_until = fresh_until + self.stale_ttl
+        if expires_at is not None:
+            fresh_until = min(fresh_until, expires_at)
+            stale_until = min(stale_until, expires_at)
+
+        entry = {"value": value, "fresh_until": fresh_until, "stale_until": stale_until}
+        # Yükleme sırasında invalidate edildiyse eski veriyi yazma
+        if generation == self._generation and stale_until > now:
+            self.backend.set(self.key, json.dumps(entry).encode(), max(int(stale_until - now), 1))
+        return entry
+
+    def _revalidate_in_background(self, loader):
+        if self._flight.in_flight(self.key):
+            return
+
+        def refresh():
+            try:
+                self._flight.do(self.key, lambda: self._load(loader))
+            except Exception as e:
+                logger.error(f"Cache revalidation failed for {self.key}: {str(e)}")
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def cache_control(self, max_age: int) -> str:
+        return f"public, max-age={max_age}, stale-while-revalidate={self.stale_ttl}"
+
+
+cache_backend = create_cache_backend()
+
+public_exams_cache = StaleWhileRevalidateCache(
+    cache_backend,
+    key="public_exams",
+    ttl=settings.PUBLIC_EXAMS_CACHE_TTL,
+    stale_ttl=settings.PUBLIC_EXAMS_STALE_TTL
+)
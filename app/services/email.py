@@ -1,83 +1,193 @@
 from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
 from pydantic import EmailStr
-from dotenv import load_dotenv
+import asyncio
 import os
-from pathlib import Path
 import logging
+import queue
+import threading
+from config import settings
+from app.services.metrics import EMAIL_QUEUE_DEPTH
+from app.services.registry import get_mail_config, load_env
 
-# Logging ayarları
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Debug için mevcut dizini yazdır
-current_dir = Path(__file__).parent.parent.parent
-logger.info(f"Current directory: {current_dir}")
-
-# .env dosyasının tam yolunu belirt
-env_path = current_dir / '.env'
-logger.info(f"Looking for .env at: {env_path}")
-logger.info(f"Env file exists: {env_path.exists()}")
-
-# .env dosyasını yükle
-load_dotenv(dotenv_path=env_path)
-
-# Environment değişkenlerini kontrol et
-mail_conf = {
-    'MAIL_USERNAME': os.environ.get('MAIL_USERNAME', 'akbasalifuat@gmail.com'),
-    'MAIL_PASSWORD': os.environ.get('MAIL_PASSWORD', 'dbbomqqmapxzriwa'),
-    'MAIL_FROM': os.environ.get('MAIL_FROM', 'akbasalifuat@gmail.com'),
-    'MAIL_PORT': int(os.environ.get('MAIL_PORT', '587')),
-    'MAIL_SERVER': os.environ.get('MAIL_SERVER', 'smtp.gmail.com'),
-    'MAIL_FROM_NAME': os.environ.get('MAIL_FROM_NAME', 'Eolimpiyat')
-}
-
-
-# ConnectionConfig'i oluştur
-try:
-    email_conf = ConnectionConfig(
-        MAIL_USERNAME=mail_conf['MAIL_USERNAME'],
-        MAIL_PASSWORD=mail_conf['MAIL_PASSWORD'],
-        MAIL_FROM=mail_conf['MAIL_FROM'],
-        MAIL_PORT=mail_conf['MAIL_PORT'],
-        MAIL_SERVER=mail_conf['MAIL_SERVER'],
-        MAIL_FROM_NAME=mail_conf['MAIL_FROM_NAME'],
-        MAIL_STARTTLS=True,
-        MAIL_SSL_TLS=False,
-        USE_CREDENTIALS=True,
-        VALIDATE_CERTS=True
-    )
-    logger.info("Email configuration created successfully")
-except Exception as e:
-    logger.error(f"Error creating email configuration: {str(e)}")
-    raise
 
-FRONTEND_URL = os.getenv('FRONTEND_URL', 'https://eolimpiyat.com')
-logger.info(f"Frontend URL: {FRONTEND_URL}")
+def create_mail_config() -> ConnectionConfig:
+    """
+    Mail ayarlarını environment'tan okur (registry üzerinden ilk gönderimde çağrılır)
+    """
+    mail_conf = {
+        'MAIL_USERNAME': os.environ.get('MAIL_USERNAME', 'akbasalifuat@gmail.com'),
+        'MAIL_PASSWORD': os.environ.get('MAIL_PASSWORD', 'dbbomqqmapxzriwa'),
+        'MAIL_FROM': os.environ.get('MAIL_FROM', 'akbasalifuat@gmail.com'),
+        'MAIL_PORT': int(os.environ.get('MAIL_PORT', '587')),
+        'MAIL_SERVER': os.environ.get('MAIL_SERVER', 'smtp.gmail.com'),
+        'MAIL_FROM_NAME': os.environ.get('MAIL_FROM_NAME', 'Eolimpiyat')
+    }
 
-async def send_reset_email(email: EmailStr, token: str):
     try:
-        reset_link = f"{FRONTEND_URL}/reset-password?token={token}"
-        logger.info(f"Sending reset email to: {email}")
-        logger.info(f"Reset link: {reset_link}")
-
-        message = MessageSchema(
-            subject="Şifre Sıfırlama",
-            recipients=[email],
-            body=f"""
-            <html>
-                <body>
-                    <h2>Şifre Sıfırlama İsteği</h2>
-                    <p>Şifrenizi sıfırlamak için aşağıdaki linke tıklayın:</p>
-                    <p><a href="{reset_link}">Şifremi Sıfırla</a></p>
-                    <p>Bu link 30 dakika süreyle geçerlidir.</p>
-                </body>
-            </html>
-            """,
-            subtype="html"
+        email_conf = ConnectionConfig(
+            MAIL_USERNAME=mail_conf['MAIL_USERNAME'],
+            MAIL_PASSWORD=mail_conf['MAIL_PASSWORD'],
+            MAIL_FROM=mail_conf['MAIL_FROM'],
+            MAIL_PORT=mail_conf['MAIL_PORT'],
+            MAIL_SERVER=mail_conf['MAIL_SERVER'],
+            MAIL_FROM_NAME=mail_conf['MAIL_FROM_NAME'],
+            MAIL_STARTTLS=True,
+            MAIL_SSL_TLS=False,
+            USE_CREDENTIALS=True,
+            VALIDATE_CERTS=True
         )
+        logger.info("Email configuration created successfully")
+        return email_conf
+    except Exception as e:
+        logger.error(f"Error creating email configuration: {str(e)}")
+        raise
+
+
+def frontend_url() -> str:
+    load_env()
+    return os.getenv('FRONTEND_URL', 'https://eolimpiyat.com')
 
-        fm = FastMail(email_conf)
+
+async def send_message(message: MessageSchema, conf: ConnectionConfig | None = None):
+    """
+    Email gönderir ve gönderimdeki email sayısını metriklere yansıtır
+    """
+    EMAIL_QUEUE_DEPTH.inc()
+    try:
+        fm = FastMail(conf or get_mail_config())
         await fm.send_message(message)
+    finally:
+        EMAIL_QUEUE_DEPTH.dec()
+
+
+class EmailQueue:
+    """
+    Arka planda email gönderen kuyruk; toplu işlemler (ör. öğrenci içe aktarma) SMTP'yi beklemez.
+
+    - Gönderim ayrı bir thread'deki event loop'ta, aynı anda en fazla `concurrency` email ile yapılır
+    - Hata alan email `retries` kez artan beklemeyle yeniden denenir
+    - Bekleyen + gönderimdeki email sayısı EMAIL_QUEUE_DEPTH metriğindedir
+    """
+
+    def __init__(self, concurrency: int, retries: int):
+        self.concurrency = concurrency
+        self.retries = retries
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, message: MessageSchema):
+        EMAIL_QUEUE_DEPTH.inc()
+        self._queue.put(message)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="email-queue", daemon=True)
+                self._thread.start()
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self):
+        asyncio.run(self._consume())
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+        while True:
+            message = await loop.run_in_executor(None, self._queue.get)
+            if message is None:
+                break
+            await semaphore.acquire()
+            task = asyncio.create_task(self._send(message, semaphore))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def _send(self, message: MessageSchema, semaphore: asyncio.Semaphore):
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    await FastMail(get_mail_config()).send_message(message)
+                    return
+                except Exception as e:
+                    if attempt == self.retries:
+                        logger.error(f"Queued email to {message.recipients} failed: {e}")
+                    else:
+                        await asyncio.sleep(2 ** attempt)
+        finally:
+            semaphore.release()
+            EMAIL_QUEUE_DEPTH.dec()
+
+    def stop(self, timeout: float = None):
+        """
+        Kuyruktakileri gönderip worker'ı durdurur (uygulama kapanırken)
+        """
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout)
+
+
+email_queue = EmailQueue(settings.EMAIL_QUEUE_CONCURRENCY, settings.EMAIL_QUEUE_RETRIES)
+
+
+def reset_message(email: str, token: str, valid_for: str = "30 dakika") -> MessageSchema:
+    reset_link = f"{frontend_url()}/reset-password?token={token}"
+    return MessageSchema(
+        subject="Şifre Sıfırlama",
+        recipients=[email],
+        body=f"""
+        <html>
+            <body>
+                <h2>Şifre Sıfırlama İsteği</h2>
+                <p>Şifrenizi sıfırlamak için aşağıdaki linke tıklayın:</p>
+                <p><a href="{reset_link}">Şifremi Sıfırla</a></p>
+                <p>Bu link {valid_for} süreyle geçerlidir.</p>
+            </body>
+        </html>
+        """,
+        subtype="html"
+    )
+
+
+def verification_message(email: str, token: str, valid_for: str = "30 dakika") -> MessageSchema:
+    verification_link = f"https://eolimpiyat.com/verify-email?token={token}"
+    return MessageSchema(
+        subject="E-Olimpiyat - Email Doğrulama",
+        recipients=[email],
+        body=f"""
+        <html>
+            <body>
+                <h2>Email Doğrulama</h2>
+                <p>Merhaba,</p>
+                <p>Email adresinizi doğrulamak için aşağıdaki linke tıklayın:</p>
+                <p>
+                    <a href="{verification_link}" 
+                       style="padding: 10px 20px; 
+                              background-color: #4CAF50; 
+                              color: white; 
+                              text-decoration: none; 
+                              border-radius: 5px;">
+                        Email Adresimi Doğrula
+                    </a>
+                </p>
+                <p>Bu link {valid_for} geçerlidir.</p>
+                <p>Eğer bu işlemi siz yapmadıysanız, bu emaili görmezden gelebilirsiniz.</p>
+            </body>
+        </html>
+        """,
+        subtype="html"
+    )
+
+
+async def send_reset_email(email: EmailStr, token: str):
+    try:
+        logger.info(f"Sending reset email to: {email}")
+        await send_message(reset_message(email, token))
         logger.info(f"Reset email sent successfully to {email}")
         return True
     except Exception as e:
@@ -87,42 +197,10 @@ async def send_reset_email(email: EmailStr, token: str):
 
 async def send_verification_email(email: str, token: str):
     try:
-        verification_link = f"https://eolimpiyat.com/verify-email?token={token}"
         logger.info(f"Sending verification email to: {email}")
-        logger.info(f"Verification link: {verification_link}")
-
-        message = MessageSchema(
-            subject="E-Olimpiyat - Email Doğrulama",
-            recipients=[email],
-            body=f"""
-            <html>
-                <body>
-                    <h2>Email Doğrulama</h2>
-                    <p>Merhaba,</p>
-                    <p>Email adresinizi doğrulamak için aşağıdaki linke tıklayın:</p>
-                    <p>
-                        <a href="{verification_link}" 
-                           style="padding: 10px 20px; 
-                                  background-color: #4CAF50; 
-                                  color: white; 
-                                  text-decoration: none; 
-                                  border-radius: 5px;">
-                            Email Adresimi Doğrula
-                        </a>
-                    </p>
-                    <p>Bu link 30 dakika geçerlidir.</p>
-                    <p>Eğer bu işlemi siz yapmadıysanız, bu emaili görmezden gelebilirsiniz.</p>
-                </body>
-            </html>
-            """,
-            subtype="html"
-        )
-
-        fm = FastMail(email_conf)
-        await fm.send_message(message)
+        await send_message(verification_message(email, token))
         logger.info(f"Verification email sent successfully to {email}")
         return True
     except Exception as e:
         logger.error(f"Error sending verification email to {email}: {str(e)}")
         raise  # Hatayı yukarı fırlat
-
@@ -0,0 +1,308 @@
+import logging
+import math
+import threading
+import time
+
+from sqlalchemy import and_, case, func, or_, select
+
+from config import settings
+from database import ReadSessionLocal
+from app.models.exam import Answer, ExamResult, Question
+from app.services.answer_storage import is_set, unpack_answers
+
+logger = logging.getLogger(__name__)
+
+# Ayırt edicilik için üst/alt grup oranı (klasik %27 kuralı)
+GROUP_RATIO = 0.27
+
+
+class ExamItemStats:
+    """
+    Bir sınavın soru bazında ham sayaçları; rapor bu sayaçlardan üretilir.
+    Şık dağılımı ve p değeri toplanabilir olduğu için yeni sonuçlarla artımlı güncellenir,
+    ayırt edicilik (üst/alt grup) ise gruplar kaydığı için en fazla
+    ITEM_ANALYSIS_DISCRIMINATION_SECONDS'ta bir yeniden hesaplanır.
+    """
+
+    def __init__(self, exam_id: int, questions: list):
+        self.exam_id = exam_id
+        self.loaded_at = time.monotonic()
+        self.participants = 0
+        # Sayılan sonuçlar: yükleme ile record() aynı sonucu iki kez saymasın
+        self.result_ids = set()
+        self.questions = {
+            question_id: {
+                "question_id": question_id,
+                "correct_option": correct_option,
+                "options": {},
+                "correct": 0,
+                "changed": 0,
+                "changes": 0,
+            }
+            for question_id, correct_option in questions
+        }
+        self.discrimination = {}
+        self.group_size = 0
+        # record() her sonuçta artırır; ayırt edicilik hesaplandığı andaki değeri saklar
+        self.version = 0
+        self.discrimination_version = -1
+        self.discrimination_at = 0.0
+
+    def add_result(self, result_id: int, answers) -> bool:
+        if result_id in self.result_ids:
+            return False
+        self.result_ids.add(result_id)
+        self.participants += 1
+        for answer in answers:
+            self.add_answer(answer.question_id, answer.selected_option, answer.is_correct, answer.change_count)
+        self.version += 1
+        return True
+
+    def add_answer(self, question_id: int, selected_option: int, is_correct: bool, change_count: int, count: int = 1,
+                   changed: int = None):
+        question = self.questions.get(question_id)
+        if question is None:
+            return
+        question["options"][selected_option] = question["options"].get(selected_option, 0) + count
+        if is_correct:
+            question["correct"] += count
+        change_count = change_count or 0
+        question["changes"] += change_count
+        question["changed"] += changed if changed is not None else int(change_count > 0)
+
+    def report(self) -> dict:
+        questions = []
+        for question in self.questions.values():
+            answered = sum(question["options"].values())
+            discrimination = self.discrimination.get(question["question_id"], {})
+            questions.append({
+                "question_id": question["question_id"],
+                "correct_option": question["correct_option"],
+                "answered": answered,
+                "omitted": max(self.participants - answered, 0),
+                "option_distribution": {
+                    str(option): {
+                        "count": count,
+                        "ratio": _ratio(count, self.participants)
+                    }
+                    for option, count in sorted(question["options"].items())
+                },
+                # Zorluk: doğru cevaplayanların oranı (boş bırakan yanlış sayılır)
+                "p_value": _ratio(question["correct"], self.participants),
+                "discrimination": discrimination.get("index"),
+                "upper_correct_ratio": discrimination.get("upper"),
+                "lower_correct_ratio": discrimination.get("lower"),
+                "changed_ratio": _ratio(question["changed"], answered),
+                "avg_changes": _ratio(question["changes"], answered),
+            })
+        return {
+            "exam_id": self.exam_id,
+            "participants": self.participants,
+            "group_size": self.group_size,
+            "questions": questions,
+        }
+
+
+def _ratio(part, whole):
+    return round(part / whole, 4) if whole else None
+
+
+def _completed(exam_id: int):
+    return ExamResult.exam_id == exam_id, ExamResult.completed == True
+
+
+def _score():
+    return func.coalesce(ExamResult.correct_answers, 0)
+
+
+class ItemAnalysisCache:
+    """
+    Sınav başına madde analizi; gruplanmış SQL ile hesaplanır ve bellekte tutulur.
+
+    DB okumaları kilit dışında yapılır, sonuç kilit altında yerine konur; böylece rapor hesaplanırken
+    submit_exam / auto_complete_exams'in record() çağrıları beklemez. Yükleme sürerken gelen
+    sonuçlar günlüğe yazılır ve yeni istatistiğe (daha önce sayılmadıysa) eklenir.
+    """
+
+    def __init__(self, refresh_seconds: int, discrimination_seconds: int):
+        self.refresh_seconds = refresh_seconds
+        self.discrimination_seconds = discrimination_seconds
+        self._exams = {}
+        # exam_id -> süren yüklemelerin günlükleri [(result_id, answers)]
+        self._journals = {}
+        self._lock = threading.Lock()
+
+    def _load(self, db, exam_id: int) -> ExamItemStats:
+        questions = db.execute(
+            select(Question.id, Question.correct_option_id).where(Question.exam_id == exam_id)
+        ).all()
+        stats = ExamItemStats(exam_id, questions)
+        stats.result_ids = set(db.execute(select(ExamResult.id).where(*_completed(exam_id))).scalars().all())
+        stats.participants = len(stats.result_ids)
+
+        # Soru x şık başına cevap sayısı ve cevap değiştirme istatistikleri
+        rows = db.execute(
+            select(
+                Answer.question_id,
+                Answer.selected_option,
+                Answer.is_correct,
+                func.count(Answer.id),
+                func.sum(case((Answer.change_count > 0, 1), else_=0)),
+                func.coalesce(func.sum(Answer.change_count), 0)
+            )
+            .join(ExamResult, Answer.exam_result_id == ExamResult.id)
+            .where(*_completed(exam_id), ExamResult.answer_data.is_(None))
+            .group_by(Answer.question_id, Answer.selected_option, Answer.is_correct)
+        ).all()
+        for question_id, selected_option, is_correct, count, changed, changes in rows:
+            stats.add_answer(question_id, selected_option, is_correct, int(changes or 0), count, int(changed or 0))
+
+        # Paketlenmiş sonuçlar: öğrenci başına tek satır
+        question_ids = sorted(stats.questions)
+        packed = db.execute(
+            select(ExamResult.answer_data, ExamResult.correct_bitmap)
+            .where(*_completed(exam_id), ExamResult.answer_data.isnot(None))
+        ).all()
+        for answer_data, correct_bitmap in packed:
+            for answer in unpack_answers(None, question_ids, answer_data, correct_bitmap):
+                stats.add_answer(answer.question_id, answer.selected_option, answer.is_correct, answer.change_count)
+        return stats
+
+    @staticmethod
+    def _cutoff(db, exam_id: int, group_size: int, upper: bool):
+        """
+        Grubun sınırdaki sonucu (puan, id); sıralama: puan azalan, eşitlikte id artan
+        """
+        order = (_score().desc(), ExamResult.id) if upper else (_score(), ExamResult.id.desc())
+        return db.execute(
+            select(_score(), ExamResult.id).where(*_completed(exam_id)).order_by(*order)
+            .offset(group_size - 1).limit(1)
+        ).one()
+
+    def _compute_discrimination(self, db, exam_id: int, question_ids: list) -> tuple:
+        """
+        Üst ve alt %27'lik grupların her sorudaki doğru oranı farkı: (grup boyutu, soru -> oranlar).
+        Gruplar id listesiyle değil, sınır sonucun (puan, id) eşiğiyle SQL'de ayrılır
+        """
+        participants = db.execute(select(func.count(ExamResult.id)).where(*_completed(exam_id))).scalar()
+        group_size = int(math.ceil(participants * GROUP_RATIO)) if participants >= 2 else 0
+        if group_size == 0:
+            return 0, {}
+
+        upper_score, upper_id = self._cutoff(db, exam_id, group_size, upper=True)
+        lower_score, lower_id = self._cutoff(db, exam_id, group_size, upper=False)
+        in_upper = or_(_score() > upper_score, and_(_score() == upper_score, ExamResult.id <= upper_id))
+        in_lower = or_(_score() < lower_score, and_(_score() == lower_score, ExamResult.id >= lower_id))
+        group = case((in_upper, "upper"), else_="lower")
+
+        correct = {}
+        rows = db.execute(
+            select(Answer.question_id, group, func.count(Answer.id))
+            .join(ExamResult, Answer.exam_result_id == ExamResult.id)
+            .where(*_completed(exam_id), ExamResult.correct_bitmap.is_(None), Answer.is_correct == True,
+                   or_(in_upper, in_lower))
+            .group_by(Answer.question_id, group)
+        ).all()
+        for question_id, group_name, count in rows:
+            counts = correct.setdefault(question_id, {})
+            counts[group_name] = counts.get(group_name, 0) + count
+
+        # Paketlenmiş sonuçlar: doğruluk bitmap'inden say (sadece iki grubun satırları okunur)
+        packed = db.execute(
+            select(group, ExamResult.correct_bitmap)
+            .where(*_completed(exam_id), ExamResult.correct_bitmap.isnot(None), or_(in_upper, in_lower))
+        ).all()
+        for group_name, correct_bitmap in packed:
+            for position, question_id in enumerate(question_ids):
+                if is_set(correct_bitmap, position):
+                    counts = correct.setdefault(question_id, {})
+                    counts[group_name] = counts.get(group_name, 0) + 1
+
+        discrimination = {}
+        for question_id in question_ids:
+            upper_ratio = correct.get(question_id, {}).get("upper", 0) / group_size
+            lower_ratio = correct.get(question_id, {}).get("lower", 0) / group_size
+            discrimination[question_id] = {
+                "upper": round(upper_ratio, 4),
+                "lower": round(lower_ratio, 4),
+                "index": round(upper_ratio - lower_ratio, 4),
+            }
+        return group_size, discrimination
+
+    def _reload(self, exam_id: int) -> ExamItemStats:
+        journal = []
+        with self._lock:
+            self._journals.setdefault(exam_id, []).append(journal)
+        try:
+            db = ReadSessionLocal()
+            try:
+                stats = self._load(db, exam_id)
+                version = stats.version
+                group_size, discrimination = self._compute_discrimination(db, exam_id, sorted(stats.questions))
+            finally:
+                db.close()
+            with self._lock:
+                for result_id, answers in journal:
+                    stats.add_result(result_id, answers)
+                stats.group_size, stats.discrimination = group_size, discrimination
+                stats.discrimination_version, stats.discrimination_at = version, time.monotonic()
+                current = self._exams.get(exam_id)
+                # Eşzamanlı iki yüklemeden daha yenisi kalır
+                if current is None or current.loaded_at < stats.loaded_at:
+                    self._exams[exam_id] = stats
+                return self._exams[exam_id]
+        finally:
+            with self._lock:
+                journals = self._journals[exam_id]
+                journals.remove(journal)
+                if not journals:
+                    del self._journals[exam_id]
+
+    def _refresh_discrimination(self, stats: ExamItemStats, version: int):
+        db = ReadSessionLocal()
+        try:
+            group_size, discrimination = self._compute_discrimination(db, stats.exam_id, sorted(stats.questions))
+        finally:
+            db.close()
+        with self._lock:
+            stats.group_size, stats.discrimination = group_size, discrimination
+            stats.discrimination_version, stats.discrimination_at = version, time.monotonic()
+
+    def get(self, exam_id: int) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            stats = self._exams.get(exam_id)
+            expired = stats is None or now - stats.loaded_at > self.refresh_seconds
+            version = stats.version if stats is not None else 0
+            # Yeni sonuç geldiyse ayırt edicilik en fazla discrimination_seconds'ta bir yeniden hesaplanır
+            discriminate = (
+                not expired and stats.discrimination_version != version
+                and now - stats.discrimination_at > self.discrimination_seconds
+            )
+        if expired:
+            stats = self._reload(exam_id)
+        elif discriminate:
+            self._refresh_discrimination(stats, version)
+        with self._lock:
+            return stats.report()
+
+    def record(self, exam_id: int, result_id: int, answers: list):
+        """
+        Kesinleşen bir sonucun cevaplarını (commit sonrası) yüklü analize ekler
+        """
+        with self._lock:
+            for journal in self._journals.get(exam_id, ()):
+                journal.append((result_id, answers))
+            stats = self._exams.get(exam_id)
+            if stats is not None:
+                stats.add_result(result_id, answers)
+
+    def invalidate(self, exam_id: int = None):
+        with self._lock:
+            if exam_id is None:
+                self._exams.clear()
+            else:
+                self._exams.pop(exam_id, None)
+
+
+item_analysis = ItemAnalysisCache(settings.ITEM_ANALYSIS_REFRESH_SECONDS, settings.ITEM_ANALYSIS_DISCRIMINATION_SECONDS)
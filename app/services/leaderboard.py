@@ -0,0 +1,225 @@
+import bisect
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import select
+
+from config import settings
+from database import ReadSessionLocal, SessionLocal
+from app.models.exam import ExamResult
+from app.models.user import UserDB
+
+logger = logging.getLogger(__name__)
+
+# exam: sınavın tamamı, branch: sınıf (UserDB.branch), school: okul
+SCOPES = ("exam", "branch", "school")
+
+
+def _sort_key(correct_answers: int, completed_at: Optional[datetime], user_id: int):
+    # Çok doğru önce; eşitlikte erken bitiren önce; yine eşitse user_id
+    if completed_at is None:
+        finished = float("inf")
+    else:
+        # DB'den naive (UTC) gelir
+        if completed_at.tzinfo is None:
+            completed_at = completed_at.replace(tzinfo=timezone.utc)
+        finished = completed_at.timestamp()
+    return (-(correct_answers or 0), finished, user_id)
+
+
+class SortedBoard:
+    """
+    Sıralı anahtar listesi; rank bisect ile O(log n) bulunur. Ekleme/silme (insort / del) listeyi
+    kaydırdığı için O(n)'dir; kaydırma tek memmove olduğundan on binlerce sonuçta da mikrosaniyeler sürer
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.key_by_user = {}
+
+    def upsert(self, key):
+        self.remove(key[2])
+        bisect.insort(self.keys, key)
+        self.key_by_user[key[2]] = key
+
+    def remove(self, user_id: int):
+        old = self.key_by_user.pop(user_id, None)
+        if old is not None:
+            del self.keys[bisect.bisect_left(self.keys, old)]
+
+    def rank(self, user_id: int) -> Optional[int]:
+        key = self.key_by_user.get(user_id)
+        if key is None:
+            return None
+        return bisect.bisect_left(self.keys, key) + 1
+
+    def top(self, limit: int):
+        return self.keys[:limit]
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class ExamLeaderboard:
+    """
+    Bir sınavın tamamlanmış sonuçları: sınav geneli, sınıf ve okul bazında sıralı listeler
+    """
+
+    def __init__(self, exam_id: int):
+        self.exam_id = exam_id
+        self.loaded_at = time.monotonic()
+        self.boards = {}
+        self.users = {}
+
+    def _board(self, scope: str, value=None) -> SortedBoard:
+        return self.boards.setdefault((scope, value), SortedBoard())
+
+    def add(self, user_id: int, correct_answers: int, incorrect_answers: int,
+            completed_at: Optional[datetime], full_name: str, branch: str, school_name: str):
+        key = _sort_key(correct_answers, completed_at, user_id)
+        previous = self.users.get(user_id)
+        if previous is not None:
+            # Sınıf/okul değiştiyse eski listeden çıkar
+            self.board_for("branch", previous["branch"]).remove(user_id)
+            self.board_for("school", previous["school"]).remove(user_id)
+
+        self.users[user_id] = {
+            "user_id": user_id,
+            "full_name": full_name,
+            "branch": branch,
+            "school": school_name,
+            "correct_answers": correct_answers,
+            "incorrect_answers": incorrect_answers,
+            "completed_at": completed_at,
+        }
+        self._board("exam").upsert(key)
+        self._board("branch", branch).upsert(key)
+        self._board("school", school_name).upsert(key)
+
+    def board_for(self, scope: str, value=None) -> SortedBoard:
+        return self.boards.get((scope, None if scope == "exam" else value)) or SortedBoard()
+
+
+class LeaderboardRegistry:
+    """
+    Sınav başına leaderboard'ları bellekte tutar.
+
+    - İlk sorguda sınavın tamamlanmış sonuçları tek sorguda yüklenir
+    - submit_exam / auto_complete_exams sonuç kesinleşince record() ile artımlı güncellenir
+    - Diğer worker'ların yazdıklarını da görmek için LEADERBOARD_REFRESH_SECONDS sonra yeniden yüklenir
+    - Yükleme kilit dışında yapılır (record() beklemez); yükleme sürerken gelen sonuçlar
+      günlüğe yazılır ve yeni leaderboard'a uygulanır
+    """
+
+    def __init__(self, refresh_seconds: int):
+        self.refresh_seconds = refresh_seconds
+        self._exams = {}
+        # exam_id -> süren yüklemelerin günlükleri
+        self._journals = {}
+        self._lock = threading.Lock()
+
+    def _load(self, exam_id: int, primary: bool = False) -> ExamLeaderboard:
+        leaderboard = ExamLeaderboard(exam_id)
+        db = SessionLocal() if primary else ReadSessionLocal()
+        try:
+            rows = db.execute(
+                select(
+                    ExamResult.user_id,
+                    ExamResult.correct_answers,
+                    ExamResult.incorrect_answers,
+                    ExamResult.completed_at,
+                    UserDB.full_name,
+                    UserDB.branch,
+                    UserDB.school_name
+                )
+                .join(UserDB, ExamResult.user_id == UserDB.id)
+                .where(ExamResult.exam_id == exam_id, ExamResult.completed == True)
+            ).all()
+        finally:
+            db.close()
+
+        for row in rows:
+            leaderboard.add(*row)
+        logger.debug(f"Leaderboard loaded for exam {exam_id} with {len(rows)} results", extra={"exam_id": exam_id})
+        return leaderboard
+
+    def reload(self, exam_id: int, primary: bool = False) -> ExamLeaderboard:
+        """
+        Sınavı DB'den yeniden yükler ve yerine koyar. primary: replika gecikmesi kabul edilemiyorsa
+        (ör. kesin sıralar yazılırken) primary'den okunur
+        """
+        journal = []
+        with self._lock:
+            self._journals.setdefault(exam_id, []).append(journal)
+        try:
+            leaderboard = self._load(exam_id, primary)
+            with self._lock:
+                for entry in journal:
+                    leaderboard.add(*entry)
+                self._exams[exam_id] = leaderboard
+                return leaderboard
+        finally:
+            with self._lock:
+                journals = self._journals[exam_id]
+                journals.remove(journal)
+                if not journals:
+                    del self._journals[exam_id]
+
+    def get(self, exam_id: int) -> ExamLeaderboard:
+        with self._lock:
+            leaderboard = self._exams.get(exam_id)
+            if leaderboard is not None and time.monotonic() - leaderboard.loaded_at <= self.refresh_seconds:
+                return leaderboard
+        return self.reload(exam_id)
+
+    def record(self, exam_id: int, user: UserDB, correct_answers: int, incorrect_answers: int,
+               completed_at: Optional[datetime]):
+        """
+        Kesinleşen bir sonucu (commit sonrası) yüklü leaderboard'a ekler.
+        Sınav henüz yüklenmemişse bir şey yapmaz; ilk sorguda DB'den gelir.
+        """
+        entry = (user.id, correct_answers, incorrect_answers, completed_at, user.full_name, user.branch,
+                 user.school_name)
+        with self._lock:
+            for journal in self._journals.get(exam_id, ()):
+                journal.append(entry)
+            leaderboard = self._exams.get(exam_id)
+            if leaderboard is not None:
+                leaderboard.add(*entry)
+
+    def invalidate(self, exam_id: int = None):
+        with self._lock:
+            if exam_id is None:
+                self._exams.clear()
+            else:
+                self._exams.pop(exam_id, None)
+
+    def top(self, exam_id: int, limit: int, scope: str = "exam", value=None) -> list:
+        leaderboard = self.get(exam_id)
+        with self._lock:
+            board = leaderboard.board_for(scope, value)
+            return [
+                {"rank": rank, **leaderboard.users[key[2]]}
+                for rank, key in enumerate(board.top(limit), start=1)
+            ]
+
+    def rank(self, exam_id: int, user_id: int) -> dict:
+        """
+        Kullanıcının sınav, sınıf ve okul bazındaki sırası: {scope: {"rank", "total"}}
+        """
+        leaderboard = self.get(exam_id)
+        with self._lock:
+            user = leaderboard.users.get(user_id)
+            if user is None:
+                return {}
+            ranks = {}
+            for scope in SCOPES:
+                board = leaderboard.board_for(scope, user.get(scope))
+                ranks[scope] = {"rank": board.rank(user_id), "total": len(board)}
+            return ranks
+
+
+leaderboards = LeaderboardRegistry(settings.LEADERBOARD_REFRESH_SECONDS)
@@ -0,0 +1,113 @@
+import re
+import threading
+import time
+
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily, REGISTRY
+
+from database import pool_stats
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP istek süresi",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "İstek başına çalışan SQL sayısı",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds",
+    "İstek başına toplam DB süresi",
+    ["route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+)
+
+SCHEDULER_JOB_DURATION = Histogram(
+    "scheduler_job_duration_seconds",
+    "Scheduler job çalışma süresi",
+    ["job"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60)
+)
+SCHEDULER_JOB_MISFIRES = Counter("scheduler_job_misfires_total", "Zamanında çalışamayan job sayısı", ["job"])
+SCHEDULER_JOB_ERRORS = Counter("scheduler_job_errors_total", "Hata ile biten job sayısı", ["job"])
+
+AUTO_COMPLETE_BACKLOG = Gauge("auto_complete_backlog", "Süresi dolmuş ama henüz tamamlanmamış sınav sonucu sayısı")
+EMAIL_QUEUE_DEPTH = Gauge("email_queue_depth", "Gönderilmeyi bekleyen email sayısı")
+ADMISSION_IN_FLIGHT = Gauge("admission_in_flight_requests", "Admission control'den geçmiş, işlenen istek sayısı", ["route_class"])
+ADMISSION_QUEUED = Gauge("admission_queued_requests", "Admission control kuyruğunda bekleyen istek sayısı", ["route_class"])
+ADMISSION_REJECTED = Counter("admission_rejected_total", "Admission control'ün reddettiği istek sayısı", ["route_class", "reason"])
+RATE_LIMITED = Counter("rate_limited_total", "Rate limit nedeniyle reddedilen istek sayısı", ["route", "scope"])
+STARTUP_DURATION = Gauge("app_startup_seconds", "Uygulama açılış süresi (faz bazında)", ["phase"])
+
+
+def route_label(scope: dict) -> str:
+    # Path parametreleri yerine route şablonu (kardinaliteyi sınırlı tutar)
+    route = scope.get("route")
+    return route.path if route is not None else "unmatched"
+
+
+def observe_request_db(stats):
+    route = route_label(stats.scope)
+    REQUEST_DB_QUERIES.labels(route=route).observe(stats.count)
+    REQUEST_DB_TIME.labels(route=route).observe(stats.total_time)
+
+
+class PoolCollector:
+    """
+    SQLAlchemy bağlantı havuzu durumunu scrape anında okur
+    """
+
+    def collect(self):
+        values = {
+            "db_pool_size": ("Havuz boyutu (pool_size)", "size"),
+            "db_pool_checked_out": ("Kullanımdaki bağlantı sayısı", "checked_out"),
+            "db_pool_checked_in": ("Havuzda boşta bekleyen bağlantı sayısı", "checked_in"),
+            "db_pool_overflow": ("max_overflow'dan açılmış ek bağlantı sayısı", "overflow"),
+        }
+        stats = pool_stats()
+        for name, (documentation, key) in values.items():
+            if key in stats:
+                yield GaugeMetricFamily(name, documentation, value=stats[key])
+
+
+REGISTRY.register(PoolCollector())
+
+
+def _job_label(job_id: str) -> str:
+    # exam_12_start -> exam_start (sınav başına ayrı seri oluşmasın)
+    return re.sub(r"_\d+_", "_", job_id)
+
+
+_job_started_at = {}
+_job_lock = threading.Lock()
+
+
+def scheduler_listener(event):
+    """
+    Scheduler job olaylarını metriklere çevirir (init_scheduler'da kaydedilir)
+    """
+    label = _job_label(event.job_id)
+    if event.code == EVENT_JOB_SUBMITTED:
+        with _job_lock:
+            for run_time in event.scheduled_run_times:
+                _job_started_at[(event.job_id, run_time)] = time.perf_counter()
+        return
+
+    if event.code == EVENT_JOB_MISSED:
+        SCHEDULER_JOB_MISFIRES.labels(job=label).inc()
+        return
+
+    with _job_lock:
+        started = _job_started_at.pop((event.job_id, event.scheduled_run_time), None)
+    if started is not None:
+        SCHEDULER_JOB_DURATION.labels(job=label).observe(time.perf_counter() - started)
+    if event.code == EVENT_JOB_ERROR:
+        SCHEDULER_JOB_ERRORS.labels(job=label).inc()
+
+
+SCHEDULER_EVENTS = EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED
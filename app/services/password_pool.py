@@ -0,0 +1,48 @@
+"""
+bcrypt hash'lerini process havuzunda paralel hesaplar (toplu içe aktarma için).
+
+Hash CPU'ya bağlı ve GIL'i bırakmadığı için thread yerine process kullanılır. Havuz ilk
+kullanımda "spawn" ile açılır (scheduler thread'leri çalışırken fork güvenli değil) ve
+uygulama kapanırken shutdown_hash_pool ile kapatılır.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from config import settings
+from app.services.auth_service import get_password_hash
+
+_pool = None
+_lock = threading.Lock()
+
+
+def hash_workers() -> int:
+    return settings.IMPORT_HASH_WORKERS or os.cpu_count() or 1
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=hash_workers(), mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def hash_passwords(passwords: list) -> list:
+    """
+    Şifreleri sırasını koruyarak hash'ler; tek worker'da veya az şifrede süreç içinde çalışır
+    """
+    workers = hash_workers()
+    if workers == 1 or len(passwords) < workers * 2:
+        return [get_password_hash(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(_get_pool().map(get_password_hash, passwords, chunksize=chunksize))
+
+
+def shutdown_hash_pool():
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
@@ -0,0 +1,64 @@
+"""
+Okuma amaçlı kolon projeksiyonları: ORM nesnesi / identity map oluşturmadan yalnızca
+gereken kolonları satır tuple'ları olarak getirir.
+"""
+import json
+
+from sqlalchemy import select
+
+from config import settings
+from app.models.exam import Exam, Question
+from app.services.cache import cache_backend
+from app.services.serialization import dumps, question_payload
+
+# Öğrenciye giden soru kolonları; cevap anahtarı (correct_option_id) bilerek yok
+STUDENT_QUESTION_COLUMNS = (Question.id, Question.text, Question.options, Question.image)
+
+EXAM_ACCESS_COLUMNS = (
+    Exam.id,
+    Exam.title,
+    Exam.status,
+    Exam.requires_registration,
+    Exam.duration_minutes,
+    Exam.is_published,
+    Exam.shuffle_questions,
+)
+
+
+def exam_access_row(db, exam_id: int):
+    """
+    Erişim kontrolü ve sınav başlığı için gereken kolonlar; yoksa None
+    """
+    return db.execute(select(*EXAM_ACCESS_COLUMNS).where(Exam.id == exam_id)).first()
+
+
+def student_questions(db, exam_id: int) -> list:
+    """
+    Sınavın soruları, Question.id sırasıyla, cevap anahtarı olmadan
+    """
+    rows = db.execute(
+        select(*STUDENT_QUESTION_COLUMNS).where(Question.exam_id == exam_id).order_by(Question.id)
+    ).all()
+    return [question_payload(row) for row in rows]
+
+
+def _questions_key(exam_id: int) -> str:
+    return f"exam_questions:{exam_id}"
+
+
+def cached_student_questions(db, exam_id: int) -> list:
+    """
+    student_questions'ın önbellekli hali; öğrenciye özel karıştırma bunun üzerine uygulanır
+    """
+    if settings.EXAM_QUESTIONS_CACHE_SECONDS <= 0:
+        return student_questions(db, exam_id)
+    cached = cache_backend.get(_questions_key(exam_id))
+    if cached is not None:
+        return json.loads(cached)
+    questions = student_questions(db, exam_id)
+    cache_backend.set(_questions_key(exam_id), dumps(questions), ttl=settings.EXAM_QUESTIONS_CACHE_SECONDS)
+    return questions
+
+
+def invalidate_student_questions(exam_id: int):
+    cache_backend.delete(_questions_key(exam_id))
@@ -0,0 +1,117 @@
+import math
+import re
+import threading
+import time
+from typing import Optional, Tuple
+
+from config import settings
+from app.services.cache import create_cache_backend
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """
+    "5/minute" -> (5, 60)
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(second|minute|hour|day)\s*", rate)
+    if match is None:
+        raise ValueError(f"Geçersiz rate limit tanımı: {rate!r} (ör. '5/minute')")
+    return int(match.group(1)), PERIODS[match.group(2)]
+
+
+class TokenBucketLimiter:
+    """
+    Süreç içi token bucket: kapasite `limit`, saniyede limit/window token dolar.
+    Tek worker için; birden fazla worker'da her biri kendi sayacını tutar.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._max_keys = max_keys
+
+    def hit(self, key: str, limit: int, window: int) -> Tuple[bool, int, int]:
+        """
+        (izin verildi mi, retry_after saniye, kalan hak) döner
+        """
+        rate = limit / window
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (limit, now))
+            tokens = min(limit, tokens + (now - updated_at) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                allowed, retry_after = True, 0
+            else:
+                self._buckets[key] = (tokens, now)
+                allowed, retry_after = False, math.ceil((1 - tokens) / rate)
+            if len(self._buckets) > self._max_keys:
+                self._evict(now)
+            return allowed, retry_after, int(self._buckets[key][0])
+
+    def _evict(self, now: float):
+        # Dolmuş (tam kapasiteye dönmüş sayılabilecek) eski kovaları at
+        cutoff = now - max(PERIODS.values())
+        for key in [key for key, (_, updated_at) in self._buckets.items() if updated_at < cutoff]:
+            del self._buckets[key]
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SlidingWindowLimiter:
+    """
+    Paylaşılan (Redis) store üzerinde sliding window counter: önceki pencerenin
+    sayacı, içinde bulunulan pencerede geçen süre oranında ağırlıklandırılır.
+    Store'un atomik `incr(key, ttl)` ve `get(key)` desteklemesi yeterlidir.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def hit(self, key: str, limit: int, window: int) -> Tuple[bool, int, int]:
+        now = time.time()
+        current_window = int(now // window)
+        elapsed = now - current_window * window
+
+        current = self.backend.incr(f"rl:{key}:{current_window}", window * 2)
+        previous = int(self.backend.get(f"rl:{key}:{current_window - 1}") or 0)
+        weight = 1 - elapsed / window
+        count = previous * weight + current
+
+        if count <= limit:
+            return True, 0, int(limit - count)
+
+        if current > limit or previous == 0:
+            retry_after = window - elapsed
+        else:
+            # Önceki pencerenin ağırlığı düşüp sayım limite inene kadar
+            retry_after = window * (1 - (limit - current) / previous) - elapsed
+        return False, max(math.ceil(retry_after), 1), 0
+
+
+def create_rate_limiter(name: Optional[str] = None):
+    name = name or settings.RATE_LIMIT_BACKEND
+    if name == "memory":
+        return TokenBucketLimiter()
+    return SlidingWindowLimiter(create_cache_backend(name))
+
+
+class RateLimitRule:
+    """
+    Bir path öneki için IP ve kullanıcı bazlı limitler
+    """
+
+    def __init__(self, prefix: str, limits: dict):
+        self.prefix = prefix.rstrip("/")
+        self.limits = {scope: parse_rate(rate) for scope, rate in limits.items()}
+
+    def matches(self, path: str) -> bool:
+        return path == self.prefix or path.startswith(self.prefix + "/")
+
+
+def load_rules(config: dict = None):
+    config = settings.RATE_LIMITS if config is None else config
+    return [RateLimitRule(prefix, limits) for prefix, limits in config.items()]
@@ -0,0 +1,74 @@
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+
+@lru_cache(maxsize=None)
+def load_env():
+    """
+    Proje kökündeki .env dosyasını bir kez yükler (import sırasında değil, ilk ihtiyaçta)
+    """
+    env_path = Path(__file__).parent.parent.parent / '.env'
+    load_dotenv(dotenv_path=env_path)
+    return env_path.exists()
+
+
+class ServiceRegistry:
+    """
+    Ağır servis istemcilerini (S3, mail ayarları) ilk kullanımda oluşturur ve saklar.
+    Testlerde override() ile sahte servis verilebilir.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory):
+        self._factories[name] = factory
+
+    def get(self, name: str):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            if name not in self._instances:
+                load_env()
+                self._instances[name] = self._factories[name]()
+            return self._instances[name]
+
+    def override(self, name: str, instance):
+        with self._lock:
+            self._instances[name] = instance
+
+    def reset(self, name: str = None):
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+            else:
+                self._instances.pop(name, None)
+
+
+def _create_s3_service():
+    from app.services.storage import S3Service
+    return S3Service()
+
+
+def _create_mail_config():
+    from app.services.email import create_mail_config
+    return create_mail_config()
+
+
+registry = ServiceRegistry()
+registry.register("s3", _create_s3_service)
+registry.register("mail", _create_mail_config)
+
+
+def get_s3_service():
+    return registry.get("s3")
+
+
+def get_mail_config():
+    return registry.get("mail")
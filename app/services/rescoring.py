@@ -0,0 +1,242 @@
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, delete, func, or_, select, update
+
+from config import settings
+from database import SessionLocal
+from app.models.exam import Answer, Exam, ExamResult, ExamResultSnapshot, Question, RescoreJob, UserExamSummary
+from app.services.answer_storage import count_correct, regrade
+from app.services.item_analysis import item_analysis
+from app.services.leaderboard import leaderboards
+from app.services.results import finalize_exam_ranks, rebuild_snapshots
+
+logger = logging.getLogger(__name__)
+
+# answers: Answer.is_correct, results: sonuç sayaçları (parça parça), derived: snapshot / sıralama / önbellekler
+PHASES = ("answers", "results", "derived")
+
+
+def create_rescore_job(db, exam_id: int, question_id: int = None, created_by: int = None) -> RescoreJob:
+    """
+    İşi kaydeder (commit çağırana ait); çalıştırma scheduler üzerinden yapılır
+    """
+    job = RescoreJob(
+        exam_id=exam_id,
+        question_id=question_id,
+        status="pending",
+        phase="answers",
+        created_by=created_by,
+        created_at=datetime.utcnow()
+    )
+    db.add(job)
+    return job
+
+
+def job_progress(job: RescoreJob) -> dict:
+    return {
+        "id": job.id,
+        "exam_id": job.exam_id,
+        "question_id": job.question_id,
+        "status": job.status,
+        "phase": job.phase,
+        "total_results": job.total_results,
+        "processed_results": job.processed_results,
+        "progress": round(job.processed_results / job.total_results, 4) if job.total_results else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def resumable_job_ids(db) -> list:
+    """
+    Bekleyen veya çalışırken yarıda kalmış (heartbeat'i eskimiş) işler
+    """
+    stale_before = datetime.utcnow() - timedelta(seconds=settings.RESCORE_STALE_SECONDS)
+    return db.execute(
+        select(RescoreJob.id)
+        .where(or_(
+            RescoreJob.status == "pending",
+            (RescoreJob.status == "running") & (RescoreJob.heartbeat_at < stale_before)
+        ))
+        .order_by(RescoreJob.id)
+    ).scalars().all()
+
+
+def _claim(db, job_id: int) -> bool:
+    # Koşullu UPDATE: aynı işi iki worker aynı anda çalıştırmaz
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=settings.RESCORE_STALE_SECONDS)
+    claimed = db.execute(
+        update(RescoreJob)
+        .where(
+            RescoreJob.id == job_id,
+            or_(
+                RescoreJob.status == "pending",
+                (RescoreJob.status == "running") & (RescoreJob.heartbeat_at < stale_before)
+            )
+        )
+        .values(status="running", heartbeat_at=now, started_at=func.coalesce(RescoreJob.started_at, now))
+    ).rowcount
+    db.commit()
+    return claimed == 1
+
+
+def _rescore_answers(db, job: RescoreJob):
+    """
+    Answer.is_correct'i doğru cevap anahtarına göre küme tabanlı UPDATE ... JOIN ile yeniden yazar.
+    Soru başına bir ifade; idempotent olduğu için yarıda kalırsa baştan çalıştırılabilir.
+    Paketlenmiş sonuçların bitmap'leri sonuç parçalarıyla birlikte yeniden üretilir.
+    """
+    question_ids = [job.question_id] if job.question_id else db.execute(
+        select(Question.id).where(Question.exam_id == job.exam_id)
+    ).scalars().all()
+
+    for question_id in question_ids:
+        db.execute(
+            update(Answer)
+            .where(Answer.question_id == Question.id, Question.id == question_id)
+            .values(is_correct=Answer.selected_option == Question.correct_option_id)
+            .execution_options(synchronize_session=False)
+        )
+        job.heartbeat_at = datetime.utcnow()
+        db.commit()
+
+    # Sonuç kağıtları eskidi; yeniden üretilene kadar anlık hesaplanır
+    db.execute(delete(ExamResultSnapshot).where(ExamResultSnapshot.exam_id == job.exam_id))
+    job.phase = "results"
+    job.total_results = db.execute(
+        select(func.count(ExamResult.id)).where(ExamResult.exam_id == job.exam_id, ExamResult.completed == True)
+    ).scalar()
+    job.heartbeat_at = datetime.utcnow()
+    db.commit()
+
+
+def _rescore_results(db, job: RescoreJob):
+    """
+    Sonuç başına doğru/yanlış sayılarını parça parça yeniden toplar; her parça kaldığı yerle birlikte commit edilir
+    """
+    answer_key = dict(db.execute(
+        select(Question.id, Question.correct_option_id).where(Question.exam_id == job.exam_id)
+    ).all())
+    question_ids = sorted(answer_key)
+    total_questions = len(question_ids)
+
+    while True:
+        results = db.execute(
+            select(ExamResult.id, ExamResult.user_id, ExamResult.answer_data)
+            .where(ExamResult.exam_id == job.exam_id, ExamResult.completed == True,
+                   ExamResult.id > job.last_result_id)
+            .order_by(ExamResult.id)
+            .limit(settings.RESCORE_CHUNK_SIZE)
+        ).all()
+        if not results:
+            break
+
+        result_ids = [result.id for result in results]
+        row_result_ids = [result.id for result in results if result.answer_data is None]
+        counts = {}
+        if row_result_ids:
+            counts = {
+                result_id: (int(correct or 0), int(answered or 0))
+                for result_id, correct, answered in db.execute(
+                    select(
+                        Answer.exam_result_id,
+                        func.sum(case((Answer.is_correct == True, 1), else_=0)),
+                        func.count(Answer.id)
+                    )
+                    .where(Answer.exam_result_id.in_(row_result_ids))
+                    .group_by(Answer.exam_result_id)
+                ).all()
+            }
+
+        result_rows = []
+        correct_by_user = {}
+        for result_id, user_id, answer_data in results:
+            row = {"id": result_id}
+            if answer_data is not None:
+                # Paketlenmiş cevaplar: bitmap anahtara göre yeniden üretilir
+                row["correct_bitmap"] = regrade(question_ids, answer_data, answer_key)
+                correct = count_correct(row["correct_bitmap"])
+                answered = sum(1 for option in answer_data[::2] if option)
+            else:
+                correct, answered = counts.get(result_id, (0, 0))
+            row.update(correct_answers=correct, incorrect_answers=answered - correct)
+            result_rows.append(row)
+            correct_by_user[user_id] = (correct, answered - correct)
+        db.execute(update(ExamResult), result_rows)
+
+        summaries = db.execute(
+            select(UserExamSummary.id, UserExamSummary.user_id)
+            .where(UserExamSummary.exam_id == job.exam_id, UserExamSummary.user_id.in_(list(correct_by_user)))
+        ).all()
+        if summaries:
+            db.execute(update(UserExamSummary), [
+                {
+                    "id": summary_id,
+                    "correct_answers": correct_by_user[user_id][0],
+                    "incorrect_answers": correct_by_user[user_id][1],
+                    "total_questions": total_questions,
+                    "score_percentage": round(correct_by_user[user_id][0] / total_questions * 100, 2)
+                    if total_questions else 0,
+                }
+                for summary_id, user_id in summaries
+            ])
+
+        job.last_result_id = result_ids[-1]
+        job.processed_results += len(results)
+        job.heartbeat_at = datetime.utcnow()
+        db.commit()
+
+    job.phase = "derived"
+    db.commit()
+
+
+def _refresh_derived(db, job: RescoreJob):
+    rebuild_snapshots(job.exam_id)
+    item_analysis.invalidate(job.exam_id)
+    status = db.execute(select(Exam.status).where(Exam.id == job.exam_id)).scalar()
+    if status == "completed":
+        # Sıralamayı da yeniden yazar (leaderboard'u geçersiz kılıp yeniden yükler)
+        finalize_exam_ranks(job.exam_id)
+    else:
+        leaderboards.invalidate(job.exam_id)
+
+
+def run_rescore_job(job_id: int):
+    """
+    Yeniden puanlama işini kaldığı fazdan devam ettirerek çalıştırır (scheduler job'ı)
+    """
+    db = SessionLocal()
+    try:
+        if not _claim(db, job_id):
+            logger.info(f"Rescore job {job_id} is not claimable", extra={"job_id": job_id})
+            return
+        job = db.get(RescoreJob, job_id)
+        logger.info(f"Rescore job {job_id} started at phase {job.phase}",
+                    extra={"job_id": job_id, "exam_id": job.exam_id, "question_id": job.question_id})
+
+        if job.phase == "answers":
+            _rescore_answers(db, job)
+        if job.phase == "results":
+            _rescore_results(db, job)
+        if job.phase == "derived":
+            _refresh_derived(db, job)
+
+        job.status = "completed"
+        job.finished_at = datetime.utcnow()
+        db.commit()
+        logger.info(f"Rescore job {job_id} completed",
+                    extra={"job_id": job_id, "exam_id": job.exam_id, "results": job.processed_results})
+    except Exception as e:
+        logger.exception(f"Rescore job {job_id} failed: {e}", extra={"job_id": job_id})
+        db.rollback()
+        db.execute(
+            update(RescoreJob).where(RescoreJob.id == job_id)
+            .values(status="failed", error=str(e), finished_at=datetime.utcnow())
+        )
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,180 @@
+import gzip
+import logging
+from datetime import datetime
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from app.models.exam import ExamResult, ExamResultSnapshot, Question, UserExamSummary
+from app.services.answer_storage import load_answers
+from app.services.item_analysis import item_analysis
+from app.services.leaderboard import leaderboards
+from app.services.serialization import dumps, question_options
+
+# Yeniden oluşturmada tek transaction'da işlenen sonuç sayısı
+SNAPSHOT_CHUNK_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+def save_result_summary(db: Session, result: ExamResult, exam_title: str, total_questions: int):
+    """
+    Kesinleşen sonucun özetini (user_exam_summaries) aynı transaction içinde yazar
+    """
+    summary = db.query(UserExamSummary).filter(
+        UserExamSummary.user_id == result.user_id,
+        UserExamSummary.exam_id == result.exam_id
+    ).first()
+    if summary is None:
+        summary = UserExamSummary(user_id=result.user_id, exam_id=result.exam_id)
+        db.add(summary)
+
+    summary.exam_title = exam_title
+    summary.correct_answers = result.correct_answers
+    summary.incorrect_answers = result.incorrect_answers
+    summary.total_questions = total_questions
+    summary.score_percentage = round(result.correct_answers / total_questions * 100, 2) if total_questions else 0
+    summary.completed_at = result.completed_at
+    return summary
+
+
+def result_sheet(result: ExamResult, questions: list, answers: list) -> dict:
+    """
+    ExamResultResponse şeklinde sonuç kağıdı; şıklar 0-based (0=1.şık, 1=2.şık, ...)
+    """
+    answers_by_question = {answer.question_id: answer for answer in answers}
+    questions_with_answers = []
+    for question in questions:
+        student_answer = answers_by_question.get(question.id)
+        questions_with_answers.append({
+            "question_text": question.text,
+            "question_image": question.image,
+            "options": question_options(question),
+            "correct_option": question.correct_option_id - 1,
+            "student_answer": student_answer.selected_option - 1 if student_answer else None,
+            "is_correct": student_answer.is_correct if student_answer else False
+        })
+
+    total_questions = result.correct_answers + result.incorrect_answers
+    score_percentage = (result.correct_answers / total_questions * 100) if total_questions > 0 else 0
+    return {
+        "correct_answers": result.correct_answers,
+        "incorrect_answers": result.incorrect_answers,
+        "total_questions": total_questions,
+        "score_percentage": round(score_percentage, 2),
+        "questions": questions_with_answers
+    }
+
+
+def encode_sheet(sheet: dict) -> bytes:
+    # mtime=0: aynı içerik her zaman aynı byte'ları üretir
+    return gzip.compress(dumps(sheet), mtime=0)
+
+
+def save_result_snapshot(db: Session, result: ExamResult, questions: list, answers: list,
+                         snapshot: ExamResultSnapshot = None):
+    """
+    Kesinleşen sonucun sıkıştırılmış sonuç kağıdını aynı transaction içinde yazar.
+    Mevcut snapshot önceden yüklendiyse verilebilir; verilmezse aranır.
+    """
+    if snapshot is None:
+        snapshot = db.query(ExamResultSnapshot).filter(ExamResultSnapshot.exam_result_id == result.id).first()
+    if snapshot is None:
+        snapshot = ExamResultSnapshot(exam_result_id=result.id, exam_id=result.exam_id, user_id=result.user_id)
+        db.add(snapshot)
+    snapshot.payload = encode_sheet(result_sheet(result, questions, answers))
+    snapshot.created_at = datetime.utcnow()
+    return snapshot
+
+
+def rebuild_snapshots(exam_id: int = None) -> int:
+    """
+    Tamamlanmış sonuçların sonuç kağıtlarını yeniden üretir (ör. soru düzeltildikten sonra).
+    exam_id verilmezse tüm sınavlar işlenir.
+    """
+    db = SessionLocal()
+    rebuilt = 0
+    try:
+        query = select(ExamResult.exam_id).where(ExamResult.completed == True).distinct()
+        if exam_id is not None:
+            query = query.where(ExamResult.exam_id == exam_id)
+        for current_exam_id in db.execute(query).scalars().all():
+            questions = db.query(Question).filter(Question.exam_id == current_exam_id).order_by(Question.id).all()
+            question_ids = [question.id for question in questions]
+            last_id = 0
+            while True:
+                # id üzerinden sayfalama; her parça ayrı transaction
+                results = (
+                    db.query(ExamResult)
+                    .filter(ExamResult.exam_id == current_exam_id, ExamResult.completed == True,
+                            ExamResult.id > last_id)
+                    .order_by(ExamResult.id)
+                    .limit(SNAPSHOT_CHUNK_SIZE)
+                    .all()
+                )
+                if not results:
+                    break
+                result_ids = [result.id for result in results]
+                answers_by_result = load_answers(db, results, question_ids)
+                snapshots = {
+                    snapshot.exam_result_id: snapshot
+                    for snapshot in db.query(ExamResultSnapshot).filter(
+                        ExamResultSnapshot.exam_result_id.in_(result_ids))
+                }
+                for result in results:
+                    snapshot = snapshots.get(result.id)
+                    if snapshot is None:
+                        snapshot = ExamResultSnapshot(exam_result_id=result.id, exam_id=result.exam_id,
+                                                      user_id=result.user_id)
+                        db.add(snapshot)
+                    save_result_snapshot(db, result, questions, answers_by_result.get(result.id, []), snapshot)
+                db.commit()
+                rebuilt += len(results)
+                last_id = results[-1].id
+            logger.info(f"Result snapshots rebuilt for exam {current_exam_id}", extra={"exam_id": current_exam_id})
+        return rebuilt
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def publish_finalized_result(result: ExamResult, user, answers: list):
+    """
+    Commit sonrası bellekteki türetilmiş yapıları (leaderboard, madde analizi) günceller
+    """
+    leaderboards.record(result.exam_id, user, result.correct_answers, result.incorrect_answers, result.completed_at)
+    item_analysis.record(result.exam_id, result.id, answers)
+
+
+def finalize_exam_ranks(exam_id: int) -> int:
+    """
+    Sınav tamamlandığında leaderboard sırasını özet tablosuna yazar; tamamlandıktan sonra geç
+    kesinleşen sonuçlarda tekrar çalışır (schedular.schedule_rank_refresh), sıralar ve katılımcı
+    sayısı herkes için yeniden yazılır
+    """
+    # Durum commit'inden hemen sonra çalışır; replika henüz yetişmemiş olabilir
+    board = leaderboards.reload(exam_id, primary=True).board_for("exam")
+    ranks = {key[2]: rank for rank, key in enumerate(board.keys, start=1)}
+
+    db = SessionLocal()
+    try:
+        summaries = db.execute(
+            select(UserExamSummary.id, UserExamSummary.user_id).where(UserExamSummary.exam_id == exam_id)
+        ).all()
+        if summaries:
+            db.execute(update(UserExamSummary), [
+                {"id": summary_id, "rank": ranks.get(user_id), "participants": len(ranks)}
+                for summary_id, user_id in summaries
+            ])
+            db.commit()
+        logger.info(f"Ranks written for exam {exam_id}", extra={"exam_id": exam_id, "participants": len(ranks)})
+        return len(summaries)
+    except Exception as e:
+        logger.error(f"Error writing ranks for exam {exam_id}: {e}", extra={"exam_id": exam_id})
+        db.rollback()
+        return 0
+    finally:
+        db.close()
@@ -0,0 +1,89 @@
+"""
+Sınav kayıt listesi (roster): kayıt anında kopyalanan kullanıcı bilgileri ve sayfalı / CSV okuma.
+
+- Kayıt satırı user_name / user_email / school_name / branch'i taşır; liste users'a join yapmaz
+- Kayıt sayaçları (Exam.registration_count / waitlist_count) app/services/seats.py'de tutulur
+- Liste (exam_id, id) indeksi üzerinden id ile sayfalanır (OFFSET yok)
+"""
+import csv
+import io
+
+from sqlalchemy import select
+
+from database import ReadSessionLocal
+from app.models.exam import ExamRegistration
+
+ROSTER_COLUMNS = (
+    ExamRegistration.id,
+    ExamRegistration.user_id,
+    ExamRegistration.status,
+    ExamRegistration.user_name,
+    ExamRegistration.user_email,
+    ExamRegistration.school_name,
+    ExamRegistration.branch,
+    ExamRegistration.registration_date,
+)
+CSV_HEADER = ("registration_id", "user_id", "status", "full_name", "email", "school_name", "branch", "registration_date")
+# CSV akışında tek sorguda okunan satır sayısı
+CSV_CHUNK_SIZE = 1000
+
+
+def registration_fields(user) -> dict:
+    """
+    Kayıt satırına kopyalanan kullanıcı alanları (UserDB veya aynı kolonları içeren satır)
+    """
+    return {
+        "user_name": user.full_name,
+        "user_email": user.email,
+        "school_name": user.school_name,
+        "branch": user.branch,
+    }
+
+
+def roster_page(db, exam_id: int, after_id: int = 0, limit: int = 100, status: str = None) -> list:
+    query = select(*ROSTER_COLUMNS).where(ExamRegistration.exam_id == exam_id, ExamRegistration.id > after_id)
+    if status is not None:
+        query = query.where(ExamRegistration.status == status)
+    return db.execute(query.order_by(ExamRegistration.id).limit(limit)).all()
+
+
+def roster_row(row) -> dict:
+    return {
+        "id": row.id,
+        "user_id": row.user_id,
+        "status": row.status,
+        "full_name": row.user_name,
+        "email": row.user_email,
+        "school_name": row.school_name,
+        "branch": row.branch,
+        "registration_date": row.registration_date.isoformat() if row.registration_date else None,
+    }
+
+
+def iter_roster_csv(exam_id: int):
+    """
+    Listeyi CSV olarak parça parça üretir (StreamingResponse için); her parça için kısa bir
+    okuma oturumu açılır, bağlantı akış boyunca tutulmaz. Excel için UTF-8 BOM ile başlar.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("﻿")
+    writer.writerow(CSV_HEADER)
+    after_id = 0
+    while True:
+        db = ReadSessionLocal()
+        try:
+            rows = roster_page(db, exam_id, after_id, CSV_CHUNK_SIZE)
+        finally:
+            db.close()
+        for row in rows:
+            writer.writerow((
+                row.id, row.user_id, row.status, row.user_name, row.user_email, row.school_name, row.branch,
+                row.registration_date.isoformat() if row.registration_date else ""
+            ))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        if len(rows) < CSV_CHUNK_SIZE:
+            break
+        after_id = rows[-1].id
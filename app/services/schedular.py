@@ -1,12 +1,22 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, DateTime, Boolean, ForeignKey, String
+from sqlalchemy import Column, Integer, DateTime, Boolean, ForeignKey, String, or_
 from apscheduler.schedulers.background import BackgroundScheduler
 from app.models.exam import Exam
-from database import Base, SessionLocal
-from datetime import datetime
+from database import Base, SessionLocal, pool_stats, warm_up_pool
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from app.models.exam import Exam, ExamResult, Answer
+from app.models.exam import Exam, ExamResult, Answer, Question
 from database import get_db
+import logging
+import time
+from config import settings
+from app.services.cache import public_exams_cache
+from app.services.results import save_result_summary, save_result_snapshot, publish_finalized_result, finalize_exam_ranks
+from app.services.rescoring import resumable_job_ids, run_rescore_job
+from app.services.answer_storage import load_answers
+from app.services.metrics import AUTO_COMPLETE_BACKLOG, SCHEDULER_EVENTS, STARTUP_DURATION, scheduler_listener
+
+logger = logging.getLogger(__name__)
 
 
 def auto_complete_exams():
@@ -24,14 +34,24 @@ def auto_complete_exams():
             ExamResult.end_time <= current_time
         ).all()
 
-        print(f"Found {len(active_results)} exams to auto-complete")
+        logger.debug(f"Found {len(active_results)} exams to auto-complete")
+        AUTO_COMPLETE_BACKLOG.set(len(active_results))
+
+        # Sınav başına (başlık, sorular); özet ve sonuç kağıdı için
+        exam_info = {}
+        finalized_exam_ids = set()
 
         for result in active_results:
             try:
+                if result.exam_id not in exam_info:
+                    exam_info[result.exam_id] = (
+                        result.exam.title,
+                        db.query(Question).filter(Question.exam_id == result.exam_id).order_by(Question.id).all()
+                    )
+                exam_title, questions = exam_info[result.exam_id]
+
                 # Mevcut cevapları al
-                answers = db.query(Answer).filter(
-                    Answer.exam_result_id == result.id
-                ).all()
+                answers = load_answers(db, [result], [question.id for question in questions])[result.id]
 
                 # Sonuçları hesapla
                 correct_count = sum(1 for a in answers if a.is_correct)
@@ -42,20 +62,35 @@ def auto_complete_exams():
                 result.correct_answers = correct_count
                 result.incorrect_answers = incorrect_count
                 result.auto_completed = True  # Otomatik tamamlandığını belirt
+                result.completed_at = result.end_time
+
+                save_result_summary(db, result, exam_title, len(questions))
+                save_result_snapshot(db, result, questions, answers)
 
                 db.commit()
-                print(f"Auto-completed exam result {result.id} for user {result.user_id}")
+                publish_finalized_result(result, result.user, answers)
+                finalized_exam_ids.add(result.exam_id)
+                AUTO_COMPLETE_BACKLOG.dec()
+                logger.info(
+                    f"Auto-completed exam result {result.id} for user {result.user_id}",
+                    extra={"exam_id": result.exam_id, "user_id": result.user_id}
+                )
 
             except Exception as e:
-                print(f"Error auto-completing exam result {result.id}: {str(e)}")
+                logger.error(f"Error auto-completing exam result {result.id}: {str(e)}")
                 db.rollback()
 
+        # Bu arada tamamlanan sınavların sıraları bu sonuçları kaçırmış olabilir
+        if finalized_exam_ids:
+            completed = db.query(Exam.id).filter(Exam.id.in_(finalized_exam_ids), Exam.status == 'completed').all()
+            for (exam_id,) in completed:
+                schedule_rank_refresh(exam_id)
+
     except Exception as e:
-        print(f"Error in auto_complete_exams: {str(e)}")
+        logger.error(f"Error in auto_complete_exams: {str(e)}")
     finally:
         db.close()
-
-
+        logger.info("Auto-complete cycle finished", extra={"pool": pool_stats()})
 
 
 # ExamSession Model
@@ -68,7 +103,7 @@ class ExamSession(Base):
     start_time = Column(DateTime, default=datetime.utcnow)
     end_time = Column(DateTime, nullable=True)
     is_completed = Column(Boolean, default=False)
-    status = Column(String, default="pending")  # pending, active, completed
+    status = Column(String(50), default="pending")  # pending, active, completed
 
     # Relationships will be handled in their respective models
     # exam = relationship("Exam", back_populates="sessions")
@@ -115,14 +150,72 @@ def update_exam_status(exam_id: int, status: str):
                     session.status = "completed"
 
             db.commit()
-            print(f"Sınav {exam_id} durumu {status} olarak güncellendi: {datetime.utcnow()}")
+            public_exams_cache.invalidate()
+            logger.info(f"Sınav {exam_id} durumu {status} olarak güncellendi", extra={"exam_id": exam_id})
+
+            # Sonuçlar kesinleşti; sıralamayı geçmiş özetlerine yaz
+            if status == 'completed':
+                finalize_exam_ranks(exam_id)
     except Exception as e:
-        print(f"Sınav durumu güncellenirken hata oluştu: {e}")
+        logger.error(f"Sınav durumu güncellenirken hata oluştu: {e}", extra={"exam_id": exam_id})
         db.rollback()
     finally:
         db.close()
 
 
+def schedule_pool_warmup(exam_id: int, exam_start: datetime, current_time: datetime = None):
+    """
+    Sınav başlamadan DB_WARMUP_LEAD_SECONDS önce bağlantı havuzunu doldurur
+    """
+    current_time = current_time or datetime.utcnow()
+    if not exam_start or exam_start <= current_time:
+        return
+    run_date = exam_start - timedelta(seconds=settings.DB_WARMUP_LEAD_SECONDS)
+    scheduler.add_job(
+        warm_up_pool,
+        'date',
+        run_date=max(run_date, current_time),
+        id=f'exam_{exam_id}_warmup',
+        replace_existing=True
+    )
+    logger.debug(f"Sınav {exam_id} için havuz ısıtma zamanlandı: {run_date}")
+
+
+def schedule_rescore_job(job_id: int):
+    """
+    Yeniden puanlama işini arka planda hemen çalıştırır
+    """
+    scheduler.add_job(
+        run_rescore_job,
+        'date',
+        run_date=datetime.utcnow(),
+        args=[job_id],
+        id=f'rescore_job_{job_id}',
+        replace_existing=True,
+        misfire_grace_time=None
+    )
+    logger.info(f"Rescore job {job_id} scheduled", extra={"job_id": job_id})
+
+
+def schedule_rank_refresh(exam_id: int):
+    """
+    Tamamlanmış sınava geç kesinleşen sonuç geldiğinde sıraları yeniden yazar. Art arda gelen sonuçlar
+    tek işte birleşir: iş zaten bekliyorsa yenisi eklenmez
+    """
+    job_id = f'exam_{exam_id}_ranks'
+    if scheduler.get_job(job_id) is not None:
+        return
+    scheduler.add_job(
+        finalize_exam_ranks,
+        'date',
+        run_date=datetime.utcnow() + timedelta(seconds=settings.RANK_REFRESH_DELAY_SECONDS),
+        args=[exam_id],
+        id=job_id,
+        misfire_grace_time=None
+    )
+    logger.debug(f"Sınav {exam_id} için sıra güncellemesi zamanlandı")
+
+
 def schedule_exam_events(exam_id: int,
                          registration_start: datetime,
                          registration_end: datetime,
@@ -133,10 +226,11 @@ def schedule_exam_events(exam_id: int,
     """
     try:
         current_time = datetime.utcnow()
+        schedule_pool_warmup(exam_id, exam_start, current_time)
         
         # Başvurusuz sınavlar için özel mantık
         if not registration_start and not registration_end:
-            print(f"Sınav {exam_id} başvurusuz sınav - özel zamanlama")
+            logger.debug(f"Sınav {exam_id} başvurusuz sınav - özel zamanlama")
             
             # Sadece gelecekteki olayları zamanla
             if exam_start and exam_start > current_time:
@@ -148,9 +242,9 @@ def schedule_exam_events(exam_id: int,
                     id=f'exam_{exam_id}_start',
                     replace_existing=True
                 )
-                print(f"Başvurusuz sınav {exam_id} başlangıcı zamanlandı: {exam_start}")
+                logger.debug(f"Başvurusuz sınav {exam_id} başlangıcı zamanlandı: {exam_start}")
             else:
-                print(f"Başvurusuz sınav {exam_id} başlangıç tarihi geçmişte: {exam_start}")
+                logger.debug(f"Başvurusuz sınav {exam_id} başlangıç tarihi geçmişte: {exam_start}")
             
             if exam_end and exam_end > current_time:
                 scheduler.add_job(
@@ -161,9 +255,9 @@ def schedule_exam_events(exam_id: int,
                     id=f'exam_{exam_id}_end',
                     replace_existing=True
                 )
-                print(f"Başvurusuz sınav {exam_id} bitişi zamanlandı: {exam_end}")
+                logger.debug(f"Başvurusuz sınav {exam_id} bitişi zamanlandı: {exam_end}")
             else:
-                print(f"Başvurusuz sınav {exam_id} bitiş tarihi geçmişte: {exam_end}")
+                logger.debug(f"Başvurusuz sınav {exam_id} bitiş tarihi geçmişte: {exam_end}")
                 
         else:
             # Başvurulu sınavlar için normal mantık
@@ -177,7 +271,7 @@ def schedule_exam_events(exam_id: int,
                     id=f'exam_{exam_id}_reg_start',
                     replace_existing=True
                 )
-                print(f"Sınav {exam_id} başvuru başlangıcı zamanlandı: {registration_start}")
+                logger.debug(f"Sınav {exam_id} başvuru başlangıcı zamanlandı: {registration_start}")
 
             # Başvuru bitişi için zamanlama (sadece None değilse)
             if registration_end:
@@ -189,7 +283,7 @@ def schedule_exam_events(exam_id: int,
                     id=f'exam_{exam_id}_reg_end',
                     replace_existing=True
                 )
-                print(f"Sınav {exam_id} başvuru bitişi zamanlandı: {registration_end}")
+                logger.debug(f"Sınav {exam_id} başvuru bitişi zamanlandı: {registration_end}")
 
             # Sınav başlangıcı için zamanlama
             if exam_start:
@@ -201,7 +295,7 @@ def schedule_exam_events(exam_id: int,
                     id=f'exam_{exam_id}_start',
                     replace_existing=True
                 )
-                print(f"Sınav {exam_id} başlangıcı zamanlandı: {exam_start}")
+                logger.debug(f"Sınav {exam_id} başlangıcı zamanlandı: {exam_start}")
 
             # Sınav bitişi için zamanlama
             if exam_end:
@@ -213,10 +307,10 @@ def schedule_exam_events(exam_id: int,
                     id=f'exam_{exam_id}_end',
                     replace_existing=True
                 )
-                print(f"Sınav {exam_id} bitişi zamanlandı: {exam_end}")
+                logger.debug(f"Sınav {exam_id} bitişi zamanlandı: {exam_end}")
 
     except Exception as e:
-        print(f"Sınav zamanlama işleminde hata: {e}")
+        logger.error(f"Sınav zamanlama işleminde hata: {e}", extra={"exam_id": exam_id})
 
 
 def get_exam_status(exam, current_time: datetime = None) -> str:
@@ -254,11 +348,11 @@ def init_scheduler():
     """
     Uygulama başlangıcında scheduler'ı başlatır ve mevcut sınavları kontrol eder
     """
-    print("=== INIT SCHEDULER BAŞLADI ===")
-    
+    started = time.perf_counter()
     if not scheduler.running:
+        scheduler.add_listener(scheduler_listener, SCHEDULER_EVENTS)
         scheduler.start()
-        print("Scheduler başlatıldı")
+        logger.info("Scheduler başlatıldı")
 
         # Auto-complete job'ını ekle
         scheduler.add_job(
@@ -268,35 +362,46 @@ def init_scheduler():
             id='auto_complete_exams',
             replace_existing=True
         )
-        print("Auto-complete job eklendi")
+        logger.debug("Auto-complete job eklendi")
 
         # Mevcut sınavları kontrol et ve zamanla
         db = SessionLocal()
         try:
+            # Yarıda kalan yeniden puanlama işleri kaldığı yerden devam eder
+            for job_id in resumable_job_ids(db):
+                schedule_rescore_job(job_id)
             current_time = datetime.utcnow()
-            print(f"Current time: {current_time}")
-            exams = db.query(Exam).all()
-            print(f"Total exams found: {len(exams)}")
+            # Sadece gelecekte olayı olan sınavlar (exam_start/end_date indeksli)
+            exams = db.query(Exam).filter(
+                or_(
+                    Exam.exam_end_date > current_time,
+                    Exam.exam_start_date > current_time
+                )
+            ).all()
+            logger.info(f"Scheduling {len(exams)} exams with future events")
 
             for exam in exams:
-                print(f"Processing exam {exam.id}: {exam.title}")
-                print(f"  Status: {exam.status}")
-                print(f"  Requires registration: {exam.requires_registration}")
-                print(f"  Exam start: {exam.exam_start_date}")
-                print(f"  Exam end: {exam.exam_end_date}")
-                print(f"  Current time: {current_time}")
-                print(f"  Exam end > current: {exam.exam_end_date > current_time if exam.exam_end_date else 'No end date'}")
+                logger.debug(
+                    f"Processing exam {exam.id}: {exam.title}",
+                    extra={
+                        "exam_id": exam.id,
+                        "status": exam.status,
+                        "requires_registration": exam.requires_registration,
+                        "exam_start": exam.exam_start_date,
+                        "exam_end": exam.exam_end_date
+                    }
+                )
                 
                 # Başvurusuz sınavlar için özel kontrol
                 if not exam.requires_registration:
-                    print(f"  Exam {exam.id} is no-registration exam")
+                    logger.debug(f"  Exam {exam.id} is no-registration exam")
                     
                     # Eğer sınav başlangıç tarihi geçmişte ve sınav hala registration_pending durumundaysa
                     # sınavı otomatik olarak exam_active yap
                     if (exam.exam_start_date and exam.exam_start_date <= current_time and 
                         exam.status == 'registration_pending' and 
                         exam.exam_end_date and exam.exam_end_date > current_time):
-                        print(f"  Exam {exam.id} başlangıç tarihi geçmiş, sınavı aktif yapıyor: {exam.exam_start_date}")
+                        logger.debug(f"  Exam {exam.id} başlangıç tarihi geçmiş, sınavı aktif yapıyor: {exam.exam_start_date}")
                         update_exam_status(exam.id, 'exam_active')
                     
                     # Başvurusuz sınavlar için sadece bitiş tarihi için job zamanla
@@ -310,12 +415,13 @@ def init_scheduler():
                             id=f'exam_{exam.id}_end',
                             replace_existing=True
                         )
-                        print(f"  Başvurusuz sınav {exam.id} bitişi zamanlandı: {exam.exam_end_date}")
+                        logger.debug(f"  Başvurusuz sınav {exam.id} bitişi zamanlandı: {exam.exam_end_date}")
                     else:
-                        print(f"  Exam {exam.id} end date is not in future: {exam.exam_end_date}")
+                        logger.debug(f"  Exam {exam.id} end date is not in future: {exam.exam_end_date}")
                         
                     # Eğer sınav başlangıç tarihi gelecekte ise, başlangıç job'ı da ekle
                     if exam.exam_start_date and exam.exam_start_date > current_time:
+                        schedule_pool_warmup(exam.id, exam.exam_start_date, current_time)
                         scheduler.add_job(
                             update_exam_status,
                             'date',
@@ -324,13 +430,13 @@ def init_scheduler():
                             id=f'exam_{exam.id}_start',
                             replace_existing=True
                         )
-                        print(f"  Başvurusuz sınav {exam.id} başlangıcı zamanlandı: {exam.exam_start_date}")
+                        logger.debug(f"  Başvurusuz sınav {exam.id} başlangıcı zamanlandı: {exam.exam_start_date}")
                     else:
-                        print(f"  Exam {exam.id} start date is not in future: {exam.exam_start_date}")
+                        logger.debug(f"  Exam {exam.id} start date is not in future: {exam.exam_start_date}")
                         
                 # Başvurulu sınavlar için normal kontrol
                 elif exam.exam_end_date and exam.exam_end_date > current_time:
-                    print(f"  Exam {exam.id} is registration exam")
+                    logger.debug(f"  Exam {exam.id} is registration exam")
                     # Normal başvurulu sınavlar için tüm zamanlamaları yap
                     schedule_exam_events(
                         exam_id=exam.id,
@@ -340,22 +446,19 @@ def init_scheduler():
                         exam_end=exam.exam_end_date
                     )
                 else:
-                    print(f"  Exam {exam.id} has no future events - end date: {exam.exam_end_date}, current: {current_time}")
+                    logger.debug(f"  Exam {exam.id} has no future events - end date: {exam.exam_end_date}, current: {current_time}")
         except Exception as e:
-            print(f"Mevcut sınavları kontrol ederken hata: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"Mevcut sınavları kontrol ederken hata: {e}")
         finally:
             db.close()
         
         # Debug bilgilerini yazdır
-        print("=== SCHEDULER DEBUG ===")
-        debug_scheduler()
-        print("=== END DEBUG ===")
+        if logger.isEnabledFor(logging.DEBUG):
+            debug_scheduler()
     else:
-        print("Scheduler zaten çalışıyor")
-    
-    print("=== INIT SCHEDULER TAMAMLANDI ===")
+        logger.info("Scheduler zaten çalışıyor")
+
+    STARTUP_DURATION.labels(phase="scheduler").set(time.perf_counter() - started)
     return scheduler
 
 
@@ -365,7 +468,7 @@ def shutdown_scheduler():
     """
     if scheduler.running:
         scheduler.shutdown()
-        print("Scheduler durduruldu")
+        logger.info("Scheduler durduruldu")
 
 
 # Sınav durumları için sabitler
@@ -389,15 +492,13 @@ def debug_scheduler():
     """
     Scheduler durumunu debug etmek için
     """
-    print(f"Scheduler running: {scheduler.running}")
-    print(f"Total jobs: {len(scheduler.get_jobs())}")
-    
+    logger.info(f"Scheduler running: {scheduler.running}, total jobs: {len(scheduler.get_jobs())}")
+
     for job in scheduler.get_jobs():
-        print(f"Job ID: {job.id}")
-        print(f"  Function: {job.func.__name__}")
-        print(f"  Next run: {job.next_run_time}")
-        print(f"  Args: {job.args}")
-        print("---")
+        logger.info(
+            f"Job {job.id}",
+            extra={"function": job.func.__name__, "next_run": job.next_run_time, "job_args": job.args}
+        )
     
     # Mevcut sınavları kontrol et
     db = SessionLocal()
@@ -405,19 +506,21 @@ def debug_scheduler():
         current_time = datetime.utcnow()
         exams = db.query(Exam).all()
         
-        print(f"Current time: {current_time}")
-        print(f"Total exams: {len(exams)}")
-        
+        logger.info(f"Current time: {current_time}, total exams: {len(exams)}")
+
         for exam in exams:
-            print(f"Exam {exam.id}: {exam.title}")
-            print(f"  Status: {exam.status}")
-            print(f"  Requires registration: {exam.requires_registration}")
-            print(f"  Exam start: {exam.exam_start_date}")
-            print(f"  Exam end: {exam.exam_end_date}")
-            print(f"  Registration start: {exam.registration_start_date}")
-            print(f"  Registration end: {exam.registration_end_date}")
-            print("---")
+            logger.info(
+                f"Exam {exam.id}: {exam.title}",
+                extra={
+                    "status": exam.status,
+                    "requires_registration": exam.requires_registration,
+                    "exam_start": exam.exam_start_date,
+                    "exam_end": exam.exam_end_date,
+                    "registration_start": exam.registration_start_date,
+                    "registration_end": exam.registration_end_date
+                }
+            )
     except Exception as e:
-        print(f"Error in debug_scheduler: {e}")
+        logger.error(f"Error in debug_scheduler: {e}")
     finally:
         db.close()
\ No newline at end of file
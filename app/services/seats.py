@@ -0,0 +1,97 @@
+"""
+Kontenjanlı sınav kaydı: koltuk sayaçları ve yedek liste.
+
+- Tekil kayıt koltuğu koşullu UPDATE ile alır:
+  registration_count = registration_count + 1 WHERE capacity IS NULL OR registration_count < capacity.
+  Sayaç okunmaz; etkilenen satır yoksa kontenjan doludur ve kayıt yedek listeye (waitlisted) yazılır.
+- Toplu işlemler (içe aktarma, yedek listeden alma) sınav satırını kilitleyip kaç koltuk
+  verilebileceğini hesaplar.
+- Sayaç ve kayıt satırı aynı transaction'da yazılır; commit çağırana aittir. (user_id, exam_id)
+  tekil indeksi eşzamanlı çift kaydı engeller, hata halinde rollback sayacı da geri alır.
+"""
+import logging
+
+from sqlalchemy import or_, select, update
+
+from app.models.exam import Exam, ExamRegistration
+
+logger = logging.getLogger(__name__)
+
+REGISTERED = "registered"
+WAITLISTED = "waitlisted"
+
+
+def _add_counts(db, exam_id: int, registered: int = 0, waitlisted: int = 0):
+    values = {}
+    if registered:
+        values["registration_count"] = Exam.registration_count + registered
+    if waitlisted:
+        values["waitlist_count"] = Exam.waitlist_count + waitlisted
+    if values:
+        db.execute(
+            update(Exam).where(Exam.id == exam_id).values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def claim_seat(db, exam_id: int) -> str:
+    """
+    Tek kayıt için koltuk alır; kontenjan doluysa yedek liste sayacını artırır. Kaydın durumunu döner.
+    """
+    claimed = db.execute(
+        update(Exam)
+        .where(Exam.id == exam_id, or_(Exam.capacity.is_(None), Exam.registration_count < Exam.capacity))
+        .values(registration_count=Exam.registration_count + 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if claimed:
+        return REGISTERED
+    _add_counts(db, exam_id, waitlisted=1)
+    return WAITLISTED
+
+
+def _locked_free_seats(db, exam_id: int):
+    capacity, taken = db.execute(
+        select(Exam.capacity, Exam.registration_count).where(Exam.id == exam_id).with_for_update()
+    ).one()
+    return None if capacity is None else max(capacity - taken, 0)
+
+
+def claim_seats(db, exam_id: int, count: int) -> int:
+    """
+    Toplu kayıt: boş koltuk kadarını verir ve sayacı artırır; kalanlar çağıran tarafından yedek listeye yazılır
+    """
+    free = _locked_free_seats(db, exam_id)
+    granted = count if free is None else min(count, free)
+    _add_counts(db, exam_id, registered=granted, waitlisted=count - granted)
+    return granted
+
+
+def promote_waitlist(db, exam_id: int) -> int:
+    """
+    Boşalan / artan kontenjanı yedek listeden kayıt sırasıyla doldurur; kaç kayıt alındığını döner
+    """
+    free = _locked_free_seats(db, exam_id)
+    if free == 0:
+        return 0
+    query = (
+        select(ExamRegistration.id)
+        .where(ExamRegistration.exam_id == exam_id, ExamRegistration.status == WAITLISTED)
+        .order_by(ExamRegistration.id)
+    )
+    if free is not None:
+        query = query.limit(free)
+    registration_ids = db.execute(query).scalars().all()
+    if not registration_ids:
+        return 0
+
+    db.execute(
+        update(ExamRegistration)
+        .where(ExamRegistration.id.in_(registration_ids))
+        .values(status=REGISTERED)
+        .execution_options(synchronize_session=False)
+    )
+    _add_counts(db, exam_id, registered=len(registration_ids), waitlisted=-len(registration_ids))
+    logger.info(f"Promoted {len(registration_ids)} waitlisted registrations for exam {exam_id}",
+                extra={"exam_id": exam_id})
+    return len(registration_ids)
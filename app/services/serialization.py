@@ -0,0 +1,101 @@
+import json
+
+from fastapi.responses import JSONResponse
+
+from config import settings
+
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse
+except ImportError:  # orjson opsiyonel
+    orjson = None
+    ORJSONResponse = None
+
+
+def fast_json_enabled() -> bool:
+    return settings.FAST_JSON_RESPONSES and orjson is not None
+
+
+def default_response_class():
+    """
+    FAST_JSON_RESPONSES açıksa orjson tabanlı response sınıfını döner
+    """
+    return ORJSONResponse if fast_json_enabled() else JSONResponse
+
+
+def fast_response(content, status_code: int = 200):
+    """
+    Hazır dict/list içeriği response_model doğrulamasına sokmadan döner.
+    Hızlı yol kapalıysa içeriği olduğu gibi döndürür, FastAPI normal
+    şekilde doğrular.
+    """
+    if fast_json_enabled():
+        return ORJSONResponse(content=content, status_code=status_code)
+    return content
+
+
+def dumps(content) -> bytes:
+    """
+    İçeriği JSON byte'larına çevirir; orjson varsa onu kullanır
+    """
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def question_options(question) -> list:
+    """
+    Sorunun sıralı şık listesi (Question.options JSON dizisi)
+    """
+    return question.options or []
+
+
+def question_payload(question) -> dict:
+    """
+    Öğrenciye giden soru; doğru cevap içermez
+    """
+    return {
+        "id": question.id,
+        "text": question.text,
+        "options": question_options(question),
+        "image": question.image
+    }
+
+
+def legacy_option_fields(question) -> dict:
+    """
+    Eski option_1..option_5 alan şekli (admin cevap detayı); eksik şıklar None
+    """
+    options = question_options(question)
+    fields = {f"option_{i}": None for i in range(1, 6)}
+    fields.update({f"option_{i}": option for i, option in enumerate(options, start=1)})
+    return fields
+
+
+def exam_result_row(row) -> dict:
+    """
+    ExamResult + UserDB + Exam kolonlarından oluşan satırı
+    ExamResultWithUser şeklinde sade bir dict'e çevirir
+    """
+    return {
+        "id": row.id,
+        "user_id": row.user_id,
+        "exam_id": row.exam_id,
+        "correct_answers": row.correct_answers,
+        "incorrect_answers": row.incorrect_answers,
+        "completed": row.completed,
+        "start_time": row.start_time.isoformat(),
+        "end_time": row.end_time.isoformat(),
+        "user": {
+            "id": row.user_id,
+            "full_name": row.full_name,
+            "email": row.email,
+            "school_name": row.school_name,
+            "branch": row.branch,
+            "role": row.role
+        },
+        "exam": {
+            "id": row.exam_id,
+            "title": row.exam_title
+        }
+    }
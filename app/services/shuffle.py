@@ -0,0 +1,61 @@
+"""
+Öğrenci başına deterministik soru ve şık sırası.
+
+Sıra (exam_id, user_id) ve SHUFFLE_SEED'den türetilir; saklanmaz, her istekte yeniden
+hesaplanır. Anahtar SECRET_KEY'den ayrıdır, böylece SECRET_KEY döndürülünce süren sınavların
+sırası değişmez. SHUFFLE_SEED aktif sınav varken değiştirilmemelidir: get_exam'de gösterilen
+sıra ile submit_exam'deki çeviri uyuşmaz. Şık sırası soru bazında ayrıca türetildiği için
+cevaplar, soru listesine bakmadan (yalnızca question_id ve şık sayısıyla) orijinal şıkka çevrilebilir.
+Admin'ler sınavı orijinal sırayla görür; gösterim ve puanlama aynı kuralı (is_shuffled_for) kullanır.
+"""
+import hashlib
+import random
+
+from config import settings
+
+
+def _random(*parts) -> random.Random:
+    digest = hashlib.blake2b(
+        ":".join(str(part) for part in parts).encode(),
+        key=settings.SHUFFLE_SEED.encode()[:64],
+        digest_size=8
+    ).digest()
+    return random.Random(int.from_bytes(digest, "big"))
+
+
+def is_shuffled_for(shuffle_questions_enabled: bool, user) -> bool:
+    """
+    Bu kullanıcıya karıştırılmış sıra gösterilir mi; get_exam ve submit_exam aynı kararı verir
+    """
+    return bool(shuffle_questions_enabled) and user.role != "admin"
+
+
+def option_permutation(exam_id: int, user_id: int, question_id: int, option_count: int) -> list:
+    """
+    Gösterilen sıra -> orijinal şık indeksi (0-based)
+    """
+    permutation = list(range(option_count))
+    _random(exam_id, user_id, question_id).shuffle(permutation)
+    return permutation
+
+
+def shuffle_questions(questions: list, exam_id: int, user_id: int) -> list:
+    """
+    Soru listesini (question_payload şeklinde) öğrenciye özel sıraya sokar; girdi değiştirilmez
+    """
+    shuffled = []
+    for question in questions:
+        options = question["options"]
+        permutation = option_permutation(exam_id, user_id, question["id"], len(options))
+        shuffled.append({**question, "options": [options[index] for index in permutation]})
+    _random(exam_id, user_id).shuffle(shuffled)
+    return shuffled
+
+
+def original_option(exam_id: int, user_id: int, question_id: int, option_count: int, displayed_option: int) -> int:
+    """
+    Öğrencinin gördüğü sıradaki şıkkı (1-based) orijinal şık numarasına (1-based) çevirir
+    """
+    if not 1 <= displayed_option <= option_count:
+        return displayed_option
+    return option_permutation(exam_id, user_id, question_id, option_count)[displayed_option - 1] + 1
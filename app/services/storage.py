@@ -1,43 +1,42 @@
-import boto3
 from fastapi import UploadFile
 from uuid import uuid4
 import os
-from dotenv import load_dotenv
+import logging
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
 
 class S3Service:
     def __init__(self):
-        try:
-            # Environment variables'ları kontrol et
-            access_key = os.getenv('AWS_ACCESS_KEY')
-            secret_key = os.getenv('AWS_SECRET_KEY')
-            bucket_name = os.getenv('AWS_BUCKET_NAME')
-            region = os.getenv('AWS_REGION')
-
-            print("AWS Credentials Check:", {
-                "access_key": "✓" if access_key else "✗",
-                "secret_key": "✓" if secret_key else "✗",
-                "bucket_name": "✓" if bucket_name else "✗",
-                "region": "✓" if region else "✗"
-            })
-
-            if not all([access_key, secret_key, bucket_name, region]):
+        # Environment variables'ları kontrol et
+        self.access_key = os.getenv('AWS_ACCESS_KEY')
+        self.secret_key = os.getenv('AWS_SECRET_KEY')
+        self.bucket_name = os.getenv('AWS_BUCKET_NAME')
+        self.region = os.getenv('AWS_REGION')
+        self._client = None
+
+        logger.info("AWS Credentials Check", extra={"aws_credentials": {
+            "access_key": "✓" if self.access_key else "✗",
+            "secret_key": "✓" if self.secret_key else "✗",
+            "bucket_name": "✓" if self.bucket_name else "✗",
+            "region": "✓" if self.region else "✗"
+        }})
+
+    @property
+    def s3_client(self):
+        # boto3 ağır bir import; istemci ilk yüklemede oluşturulur
+        if self._client is None:
+            if not all([self.access_key, self.secret_key, self.bucket_name, self.region]):
                 raise Exception("Missing AWS credentials")
 
-            self.s3_client = boto3.client(
+            import boto3
+            self._client = boto3.client(
                 's3',
-                aws_access_key_id=access_key,
-                aws_secret_access_key=secret_key,
-                region_name=region
+                aws_access_key_id=self.access_key,
+                aws_secret_access_key=self.secret_key,
+                region_name=self.region
             )
-            self.bucket_name = bucket_name
-            self.region = region
-
-        except Exception as e:
-            print(f"S3 Error: {str(e)}")
-            raise e
+        return self._client
 
     async def upload_file(self, file: UploadFile) -> str:
         try:
@@ -56,11 +55,9 @@ class S3Service:
 
             # URL formatını güncelledik
             url = f"https://{self.bucket_name}.s3.{self.region}.amazonaws.com/{key}"
-            print(f"File uploaded successfully. URL: {url}")
+            logger.info(f"File uploaded successfully. URL: {url}")
             return url
 
         except Exception as e:
-            print(f"Upload Error: {str(e)}")
+            logger.error(f"Upload Error: {str(e)}")
             return None
-
-
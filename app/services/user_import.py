@@ -0,0 +1,187 @@
+"""
+Okul bazında toplu öğrenci ve sınav kaydı içe aktarma (CSV).
+
+Kolonlar: email, full_name (zorunlu); password, school_name, branch, parent_name, phone.
+Ayırıcı virgül veya noktalı virgül olabilir (Excel TR çıktısı). Şifresi verilmeyen
+öğrencilere şifre belirleme linki, şifresi verilenlere doğrulama linki gönderilir.
+"""
+import csv
+import io
+import logging
+from datetime import datetime, timedelta
+
+from pydantic import EmailStr, TypeAdapter, ValidationError
+from sqlalchemy import insert, select
+
+from config import settings
+from app.models.exam import ExamRegistration
+from app.models.user import UserDB
+from app.services.auth_service import RESET_TOKEN, VERIFY_TOKEN, create_purpose_token
+from app.services.email import email_queue, reset_message, verification_message
+from app.services.password_pool import hash_passwords
+from app.services.roster import registration_fields
+from app.services.seats import REGISTERED, WAITLISTED, claim_seats
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = ("email", "full_name")
+# Kolon -> UserDB'deki uzunluk sınırı
+COLUMN_LIMITS = {
+    "email": 100,
+    "full_name": 100,
+    "school_name": 100,
+    "branch": 50,
+    "parent_name": 100,
+    "phone": 20,
+}
+
+_email_adapter = TypeAdapter(EmailStr)
+
+
+def parse_csv(content: bytes) -> tuple:
+    """
+    CSV'yi doğrular; (geçerli satırlar, hatalar) döner. Hata satırları içe aktarılmaz.
+    Dosya okunamazsa veya zorunlu kolon eksikse ValueError.
+    """
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ValueError("Dosya UTF-8 olmalı")
+
+    first_line = text.split("\n", 1)[0]
+    delimiter = ";" if first_line.count(";") > first_line.count(",") else ","
+    reader = csv.DictReader(io.StringIO(text), delimiter=delimiter)
+    columns = [column.strip().lower() for column in reader.fieldnames or []]
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise ValueError(f"Eksik kolon: {', '.join(missing)}")
+    reader.fieldnames = columns
+
+    rows, errors, seen = [], [], set()
+    for line, raw in enumerate(reader, start=2):
+        row = {key: (value or "").strip() for key, value in raw.items() if key}
+        email = row.get("email", "")
+        try:
+            email = _email_adapter.validate_python(email)
+        except ValidationError:
+            errors.append({"line": line, "email": email, "detail": "Geçersiz email"})
+            continue
+        if email in seen:
+            errors.append({"line": line, "email": email, "detail": "Dosyada tekrar eden email"})
+            continue
+        if not row.get("full_name"):
+            errors.append({"line": line, "email": email, "detail": "Ad soyad boş"})
+            continue
+        too_long = [column for column, limit in COLUMN_LIMITS.items() if len(row.get(column, "")) > limit]
+        if too_long:
+            errors.append({"line": line, "email": email, "detail": f"Çok uzun alan: {', '.join(too_long)}"})
+            continue
+        seen.add(email)
+        row["email"] = email
+        rows.append(row)
+    return rows, errors
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _import_token(email: str, purpose: str) -> str:
+    # Email'ler kuyrukta bekleyebildiği için normal token süresinden uzun; typ claim'i sayesinde
+    # oturum token'ı olarak kullanılamaz
+    return create_purpose_token(email, purpose, timedelta(hours=settings.IMPORT_TOKEN_HOURS))
+
+
+def import_users(db, rows: list, exam_ids: list) -> dict:
+    """
+    Yeni kullanıcıları ve sınav kayıtlarını parça parça toplu insert ile ekler, tek commit yapar;
+    email'ler commit sonrası kuyruğa alınır. Var olan kullanıcılar güncellenmez, sadece kaydedilir.
+    """
+    batch_size = settings.IMPORT_BATCH_SIZE
+    emails = [row["email"] for row in rows]
+
+    existing = set()
+    for chunk in _chunks(emails, batch_size):
+        existing.update(db.execute(select(UserDB.email).where(UserDB.email.in_(chunk))).scalars().all())
+    new_rows = [row for row in rows if row["email"] not in existing]
+
+    # bcrypt: tüm şifreler process havuzunda tek seferde
+    with_password = [row for row in new_rows if row.get("password")]
+    for row, hashed_password in zip(with_password, hash_passwords([row["password"] for row in with_password])):
+        row["hashed_password"] = hashed_password
+
+    valid_for = f"{settings.IMPORT_TOKEN_HOURS} saat"
+    messages = []
+    users = []
+    for row in new_rows:
+        verification_token = None
+        if row.get("hashed_password"):
+            verification_token = _import_token(row["email"], VERIFY_TOKEN)
+            messages.append(verification_message(row["email"], verification_token, valid_for))
+        else:
+            # Şifre belirleme linki email sahipliğini de doğrular
+            messages.append(reset_message(row["email"], _import_token(row["email"], RESET_TOKEN), valid_for))
+        users.append({
+            "email": row["email"],
+            "full_name": row["full_name"],
+            "hashed_password": row.get("hashed_password"),
+            "role": "student",
+            "school_name": row.get("school_name") or None,
+            "branch": row.get("branch") or None,
+            "parent_name": row.get("parent_name") or None,
+            "phone": row.get("phone") or None,
+            "is_verified": False,
+            "verification_token": verification_token,
+        })
+    for chunk in _chunks(users, batch_size):
+        db.execute(insert(UserDB), chunk)
+
+    registrations = waitlisted = 0
+    if exam_ids:
+        # Kayıtlar kullanıcıların DB'deki güncel bilgileriyle yazılır (var olanlar dosyadakiyle değil)
+        user_ids, fields = {}, {}
+        for chunk in _chunks(emails, batch_size):
+            for user in db.execute(
+                select(UserDB.id, UserDB.email, UserDB.full_name, UserDB.school_name, UserDB.branch)
+                .where(UserDB.email.in_(chunk))
+            ):
+                user_ids[user.email] = user.id
+                fields[user.email] = registration_fields(user)
+        now = datetime.utcnow()
+        for exam_id in exam_ids:
+            for chunk in _chunks(emails, batch_size):
+                ids = [user_ids[email] for email in chunk]
+                registered = set(db.execute(
+                    select(ExamRegistration.user_id)
+                    .where(ExamRegistration.exam_id == exam_id, ExamRegistration.user_id.in_(ids))
+                ).scalars().all())
+                values = [
+                    {"user_id": user_ids[email], "exam_id": exam_id, "registration_date": now, **fields[email]}
+                    for email in chunk if user_ids[email] not in registered
+                ]
+                if values:
+                    # Kontenjan dolarsa kalanlar dosyadaki sırayla yedek listeye
+                    granted = claim_seats(db, exam_id, len(values))
+                    for position, value in enumerate(values):
+                        value["status"] = REGISTERED if position < granted else WAITLISTED
+                    db.execute(insert(ExamRegistration), values)
+                    registrations += granted
+                    waitlisted += len(values) - granted
+
+    db.commit()
+
+    for message in messages:
+        email_queue.enqueue(message)
+
+    logger.info(
+        f"Imported {len(new_rows)} users",
+        extra={"created": len(new_rows), "existing": len(existing), "registrations": registrations}
+    )
+    return {
+        "created": len(new_rows),
+        "existing": len(existing),
+        "registrations": registrations,
+        "waitlisted": waitlisted,
+        "emails_queued": len(messages),
+    }
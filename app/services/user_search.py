@@ -0,0 +1,470 @@
+"""
+Admin sonuç araması için bellekte kullanıcı arama indeksi (ad soyad, email, okul).
+
+- Metin Türkçe kurallarıyla küçültülür (I -> ı, İ -> i), sonra ASCII'ye indirgenir (ı -> i, ş -> s, ...);
+  "isik", "IŞIK" ve "Işık" aynı terime düşer. Terimler harf ve rakam dizileridir; email . @ _ ile,
+  harf/rakam geçişinde de bölünür ("ayse.yilmaz2010" -> ayse, yilmaz, 2010)
+- Alan başına sıralı terim listesi (bisect ile önek araması) ve terim -> sıralı user_id dizisi;
+  ad ve okul alanlarında terimlerin üçlüleri (trigram) ile kelime içi arama da yapılır
+- Sorgudaki her kelime en az bir alanda eşleşmeli (AND); puan = eşleşme türü (tam > önek > içinde)
+  x alan ağırlığı (ad > email > okul), eşitlikte user_id
+- ORM ile yapılan değişiklikler UserDB mapper event'leri ile commit sonrası işlenir; Core ile toplu
+  eklenenler (içe aktarma) her aramada id > son id sorgusuyla alınır; diğer worker'ların
+  güncellemeleri için indeks SEARCH_INDEX_REFRESH_SECONDS'ta bir arka planda yeniden kurulur
+"""
+import bisect
+import heapq
+import logging
+import re
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from collections import deque
+from itertools import compress
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from config import settings
+from database import ReadSessionLocal
+from app.models.user import UserDB
+
+logger = logging.getLogger(__name__)
+
+# (kolon, ağırlık, kelime içi arama)
+FIELDS = (
+    ("full_name", 3, True),
+    ("email", 2, False),
+    ("school_name", 1, True),
+)
+# Eşleşme türü puanı
+EXACT, PREFIX, INFIX = 3, 2, 1
+# Aday başına ikili arama, terim listesini baştan sona gezmekten ancak liste bu kat uzunsa ucuz
+BISECT_RATIO = 16
+# İlk kurulum / yeniden kurulumda tek sorguda okunan kullanıcı sayısı
+LOAD_CHUNK_SIZE = 20000
+
+_TURKISH_UPPER = str.maketrans({"I": "ı", "İ": "i"})
+_ASCII = str.maketrans({"ı": "i", "ğ": "g", "ü": "u", "ş": "s", "ö": "o", "ç": "c", "â": "a", "î": "i", "û": "u"})
+_TOKEN = re.compile(r"[a-z]+|[0-9]+")
+
+
+def fold(text: str) -> str:
+    """
+    Türkçe büyük/küçük harf dönüşümü + ASCII'ye indirgeme; indeks ve sorgu aynı fonksiyondan geçer
+    """
+    text = text.translate(_TURKISH_UPPER).lower().translate(_ASCII)
+    if text.isascii():
+        return text
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+
+
+def tokenize(text) -> tuple:
+    # intern: aynı terim milyonlarca kullanıcıda tek string nesnesi olarak tutulur
+    if not text:
+        return ()
+    return tuple(dict.fromkeys(map(sys.intern, _TOKEN.findall(fold(text)))))
+
+
+def _trigrams(term: str) -> set:
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+
+class FieldIndex:
+    """
+    Tek alanın terim sözlüğü: sıralı terimler, terim -> sıralı user_id dizisi, isteğe bağlı trigram'lar
+    """
+
+    def __init__(self, infix: bool):
+        self.infix = infix
+        self.terms = []
+        self.postings = {}
+        self.trigrams = {}
+
+    def _new_term(self, term: str):
+        self.postings[term] = array("i")
+        if self.infix:
+            for trigram in _trigrams(term):
+                self.trigrams.setdefault(trigram, set()).add(term)
+
+    def add(self, term: str, user_id: int):
+        postings = self.postings.get(term)
+        if postings is None:
+            self._new_term(term)
+            bisect.insort(self.terms, term)
+            postings = self.postings[term]
+        if not postings or postings[-1] < user_id:
+            postings.append(user_id)
+        else:
+            position = bisect.bisect_left(postings, user_id)
+            if position == len(postings) or postings[position] != user_id:
+                postings.insert(position, user_id)
+
+    def add_many(self, pairs):
+        """
+        Toplu ekleme: yeni terimler sona eklenip liste bir kez sıralanır (tek tek insort yerine)
+        """
+        new_terms = []
+        for term, user_id in pairs:
+            if term not in self.postings:
+                self._new_term(term)
+                new_terms.append(term)
+            postings = self.postings[term]
+            if not postings or postings[-1] < user_id:
+                postings.append(user_id)
+            else:
+                position = bisect.bisect_left(postings, user_id)
+                if position == len(postings) or postings[position] != user_id:
+                    postings.insert(position, user_id)
+        if new_terms:
+            self.terms.extend(new_terms)
+            self.terms.sort()
+
+    def remove(self, term: str, user_id: int):
+        postings = self.postings.get(term)
+        if postings is None:
+            return
+        position = bisect.bisect_left(postings, user_id)
+        if position < len(postings) and postings[position] == user_id:
+            del postings[position]
+        if not postings:
+            del self.postings[term]
+            del self.terms[bisect.bisect_left(self.terms, term)]
+            if self.infix:
+                for trigram in _trigrams(term):
+                    terms = self.trigrams.get(trigram)
+                    if terms is not None:
+                        terms.discard(term)
+                        if not terms:
+                            del self.trigrams[trigram]
+
+    def prefix_count(self, token: str) -> int:
+        # Önekle başlayan terim sayısı; terimler dolaşılmadan maliyet tahmini için
+        return bisect.bisect_left(self.terms, token + "\x7f") - bisect.bisect_left(self.terms, token)
+
+    def matches(self, token: str) -> list:
+        """
+        Kelimeyle eşleşen terimler: [(terim, eşleşme türü)]
+        """
+        found = []
+        position = bisect.bisect_left(self.terms, token)
+        while position < len(self.terms) and self.terms[position].startswith(token):
+            term = self.terms[position]
+            found.append((term, EXACT if term == token else PREFIX))
+            position += 1
+        if self.infix and len(token) >= 3:
+            candidates = None
+            for trigram in sorted(_trigrams(token), key=lambda t: len(self.trigrams.get(t, ()))):
+                terms = self.trigrams.get(trigram)
+                if not terms:
+                    return found
+                candidates = set(terms) if candidates is None else candidates & terms
+                if not candidates:
+                    return found
+            found.extend((term, INFIX) for term in candidates if token in term and not term.startswith(token))
+        return found
+
+
+class UserSearchIndex:
+    def __init__(self):
+        self.fields = [(name, weight, FieldIndex(infix)) for name, weight, infix in FIELDS]
+        # user_id -> alan başına terimler (güncelleme / silmede eski terimleri çıkarmak için)
+        self.docs = {}
+        self.max_id = 0
+        self.built_at = time.monotonic()
+
+    def _remove_doc(self, user_id: int):
+        previous = self.docs.pop(user_id, None)
+        if previous is not None:
+            for (_, _, field), terms in zip(self.fields, previous):
+                for term in terms:
+                    field.remove(term, user_id)
+
+    def upsert(self, user_id: int, full_name, email, school_name):
+        values = (full_name, email, school_name)
+        terms = tuple(tokenize(value) for value in values)
+        if self.docs.get(user_id) == terms:
+            return
+        self._remove_doc(user_id)
+        for (_, _, field), field_terms in zip(self.fields, terms):
+            for term in field_terms:
+                field.add(term, user_id)
+        self.docs[user_id] = terms
+
+    def add_many(self, rows):
+        """
+        DB'den okunan kullanıcıları (id, full_name, email, school_name) toplu ekler. İndekste zaten
+        olanlar atlanır: onlar mapper event'leriyle gelmiştir ve okunan satırdan yeni olabilir
+        """
+        fresh = []
+        for row in rows:
+            self.max_id = max(self.max_id, row[0])
+            if row[0] not in self.docs:
+                fresh.append((row[0], tuple(tokenize(value) for value in row[1:])))
+        for index, (_, _, field) in enumerate(self.fields):
+            field.add_many((term, user_id) for user_id, terms in fresh for term in terms[index])
+        for user_id, terms in fresh:
+            self.docs[user_id] = terms
+
+    def remove(self, user_id: int):
+        self._remove_doc(user_id)
+
+    def _prefix_count(self, token: str) -> int:
+        return sum(field.prefix_count(token) for _, _, field in self.fields)
+
+    def _token_scores(self, token: str, candidates: dict = None) -> dict:
+        """
+        Kelimeyle eşleşen kullanıcılar ve en iyi eşleşme puanı; candidates verilirse onlarla sınırlı
+        """
+        matched = []
+        # Kelimenin çok terime açıldığı alanlarda (ör. email'de "yilm") adayların kendi terimlerine bakılır
+        scanned = []
+        for position, (_, weight, field) in enumerate(self.fields):
+            if candidates is not None and len(candidates) < field.prefix_count(token):
+                scanned.append((position, weight, field.infix and len(token) >= 3))
+            else:
+                matched.extend((quality * weight, position, term) for term, quality in field.matches(token))
+        matched.sort(reverse=True)
+
+        scores = {}
+        # Yüksek puanlı eşleşmeler önce işlenir; kullanıcının ilk aldığı puan en iyisidir
+        for score, position, term in matched:
+            postings = self.fields[position][2].postings[term]
+            if candidates is not None and len(candidates) * BISECT_RATIO < len(postings):
+                # Aday az, terim listesi uzun (ör. "gmail"): adaylar dizide ikili aramayla bulunur
+                for user_id in candidates:
+                    if user_id not in scores:
+                        found = bisect.bisect_left(postings, user_id)
+                        if found < len(postings) and postings[found] == user_id:
+                            scores[user_id] = score
+            elif candidates is not None:
+                for user_id in postings:
+                    if user_id in candidates and user_id not in scores:
+                        scores[user_id] = score
+            elif len(postings) > len(scores):
+                layer = dict.fromkeys(postings, score)
+                layer.update(scores)
+                scores = layer
+            else:
+                for user_id in postings:
+                    scores.setdefault(user_id, score)
+
+        for position, weight, infix in scanned:
+            for user_id in candidates:
+                best = 0
+                for term in self.docs[user_id][position]:
+                    if term.startswith(token):
+                        quality = EXACT if len(term) == len(token) else PREFIX
+                    elif infix and token in term:
+                        quality = INFIX
+                    else:
+                        continue
+                    if quality > best:
+                        best = quality
+                if best and scores.get(user_id, 0) < best * weight:
+                    scores[user_id] = best * weight
+        return scores
+
+    def search(self, query: str, limit: int = None) -> tuple:
+        """
+        Sorguyla eşleşen kullanıcı sayısı ve puana göre sıralı ilk `limit` user_id (limit yoksa hepsi)
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return 0, []
+        scores = None
+        # Az terime açılan (seçici) kelime önce; aday kümesi ondan başlar
+        for token in sorted(tokens, key=lambda token: (self._prefix_count(token), -len(token))):
+            token_scores = self._token_scores(token, scores)
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {user_id: scores[user_id] + score for user_id, score in token_scores.items()}
+            if not scores:
+                return 0, []
+
+        if limit is None or limit >= len(scores):
+            return len(scores), sorted(scores, key=lambda user_id: (-scores[user_id], user_id))
+        # Puanlar az sayıda farklı değer alır: en yüksek puandan başlayıp her puan grubundaki en küçük
+        # id'ler alınır (grup süzmesi C seviyesinde, yüz binlerce eşleşmede anahtar fonksiyonu çağrılmaz)
+        ranked = []
+        for score in sorted(set(scores.values()), reverse=True):
+            group = compress(scores.keys(), map(score.__eq__, scores.values()))
+            ranked.extend(heapq.nsmallest(limit - len(ranked), group))
+            if len(ranked) >= limit:
+                break
+        return len(scores), ranked
+
+    def __len__(self):
+        return len(self.docs)
+
+
+def _load_rows(after_id: int = 0):
+    db = ReadSessionLocal()
+    try:
+        while True:
+            rows = db.execute(
+                select(UserDB.id, UserDB.full_name, UserDB.email, UserDB.school_name)
+                .where(UserDB.id > after_id)
+                .order_by(UserDB.id)
+                .limit(LOAD_CHUNK_SIZE)
+            ).all()
+            if not rows:
+                return
+            yield rows
+            after_id = rows[-1][0]
+    finally:
+        db.close()
+
+
+class UserSearch:
+    """
+    İndeksin yaşam döngüsü: arka plan thread'inde kurulur (açılışta veya ilk aramada), commit edilen
+    ORM değişiklikleri ile artımlı güncellenir, süresi dolunca arka planda yeniden kurulup yerine konur.
+
+    Kilit sadece bellekteki indeksi okuyan/değiştiren kısa bölümlerde tutulur; DB okuması ve kurulum
+    kilit dışındadır. apply() commit hook'undan çağrıldığı için hiç beklemez: değişiklikler kuyruğa
+    yazılır, bir sonraki aramada (veya kurulum bitince) indekse işlenir.
+    """
+
+    def __init__(self, refresh_seconds: int):
+        self.refresh_seconds = refresh_seconds
+        self._index = None
+        self._lock = threading.Lock()
+        self._building = False
+        # Her kurulum denemesi bitince (başarılı veya değil) set edilir; indeks yokken arama bunu bekler
+        self._built = threading.Event()
+        # Commit edilmiş, henüz indekse işlenmemiş değişiklikler
+        self._pending = deque()
+        # Kurulum sürerken işlenen değişiklikler; yeni indekse de uygulanır
+        self._journal = []
+
+    def _build(self) -> UserSearchIndex:
+        started = time.perf_counter()
+        index = UserSearchIndex()
+        for rows in _load_rows():
+            index.add_many(rows)
+        logger.info(f"User search index built with {len(index)} users in {time.perf_counter() - started:.2f}s")
+        return index
+
+    def _expired(self) -> bool:
+        return bool(self.refresh_seconds) and time.monotonic() - self._index.built_at > self.refresh_seconds
+
+    def start(self):
+        """
+        İndeks yoksa veya süresi dolduysa arka planda kurulumu başlatır; kurulum sürüyorsa bir şey yapmaz
+        """
+        with self._lock:
+            if self._building or (self._index is not None and not self._expired()):
+                return
+            self._building = True
+            self._built.clear()
+        threading.Thread(target=self._build_in_background, name="user-search-build", daemon=True).start()
+
+    def _build_in_background(self):
+        try:
+            index = self._build()
+            with self._lock:
+                self._drain()
+                for change in self._journal:
+                    self._apply(index, change)
+                self._index = index
+        except Exception as e:
+            logger.exception(f"User search index build failed: {e}")
+        finally:
+            with self._lock:
+                self._journal = []
+                self._building = False
+            self._built.set()
+
+    @staticmethod
+    def _apply(index: UserSearchIndex, change):
+        user_id, values = change
+        if values is None:
+            index.remove(user_id)
+        else:
+            index.upsert(user_id, *values)
+
+    def _drain(self):
+        # Kilit altında çağrılır
+        while self._pending:
+            change = self._pending.popleft()
+            if self._index is not None:
+                self._apply(self._index, change)
+            if self._building:
+                self._journal.append(change)
+
+    def _catch_up(self, index: UserSearchIndex):
+        # Core insert ile eklenenler (ör. toplu içe aktarma) mapper event'lerini tetiklemez.
+        # Okuma kilit dışında; eşzamanlı iki arama aynı satırları okursa add_many tekrarı atlar
+        for rows in _load_rows(index.max_id):
+            with self._lock:
+                index.add_many(rows)
+
+    def index(self) -> UserSearchIndex:
+        self.start()
+        index = self._index
+        if index is None:
+            self._built.wait()
+            index = self._index
+            if index is None:
+                raise RuntimeError("Kullanıcı arama indeksi kurulamadı")
+        self._catch_up(index)
+        return index
+
+    def search(self, query: str, limit: int = None) -> tuple:
+        self.index()
+        with self._lock:
+            self._drain()
+            return self._index.search(query, limit)
+
+    def apply(self, changes: list):
+        """
+        Commit edilmiş değişiklikler: [(user_id, (full_name, email, school_name) | None)].
+        İndeks yok ve kurulmuyorsa atılır (kurulum güncel halini DB'den okur)
+        """
+        if self._index is None and not self._building:
+            return
+        self._pending.extend(changes)
+
+
+user_search = UserSearch(settings.SEARCH_INDEX_REFRESH_SECONDS)
+
+_PENDING_KEY = "user_search_changes"
+
+
+def _record(target: UserDB, deleted: bool = False):
+    session = object_session(target)
+    if session is None:
+        return
+    values = None if deleted else (target.full_name, target.email, target.school_name)
+    session.info.setdefault(_PENDING_KEY, []).append((target.id, values))
+
+
+@event.listens_for(UserDB, "after_insert")
+def _after_insert(mapper, connection, target):
+    _record(target)
+
+
+@event.listens_for(UserDB, "after_update")
+def _after_update(mapper, connection, target):
+    _record(target)
+
+
+@event.listens_for(UserDB, "after_delete")
+def _after_delete(mapper, connection, target):
+    _record(target, deleted=True)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    changes = session.info.pop(_PENDING_KEY, None)
+    if changes:
+        user_search.apply(changes)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_rollback(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
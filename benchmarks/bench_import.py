@@ -0,0 +1,72 @@
+"""
+Uygulamanın import süresini `python -X importtime` ile ölçer.
+
+Kullanım:
+    python -m benchmarks.bench_import [--module main] [--repeat 5] [--top 15]
+
+Her tekrar temiz bir alt süreçte çalışır; AWS/mail environment değişkenleri
+temizlenir (uygulama bunlar olmadan da import edilebilmeli). Toplam süre ile
+en pahalı modüller (kümülatif) raporlanır ve boto3'ün import edilmediği kontrol edilir.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+UNSET_ENV = ("AWS_ACCESS_KEY", "AWS_SECRET_KEY", "AWS_BUCKET_NAME", "AWS_REGION", "MAIL_USERNAME", "MAIL_PASSWORD")
+HEAVY_MODULES = ("boto3", "botocore")
+
+
+def run_once(module: str):
+    env = {key: value for key, value in os.environ.items() if key not in UNSET_ENV}
+    env.setdefault("DATABASE_URL", "sqlite:///bench_import.db")
+    env["LOG_FILE"] = ""
+    code = (
+        f"import sys; import {module}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"{module} import edilemedi:\n{result.stderr[-2000:]}")
+
+    # Satır formatı: "import time: self [us] | cumulative | imported package"
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.replace("import time:", "|", 1).split("|")]
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+
+    heavy = [name for name in result.stdout.strip().splitlines()[-1].split(",") if name] if result.stdout.strip() else []
+    return modules, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    totals = []
+    modules, heavy = {}, []
+    for _ in range(args.repeat):
+        modules, heavy = run_once(args.module)
+        totals.append(modules[args.module][1] / 1000)
+
+    print(f"import {args.module}: median {statistics.median(totals):.1f} ms "
+          f"(min {min(totals):.1f}, max {max(totals):.1f}, n={args.repeat})")
+    print(f"ağır modüller yüklendi mi: {', '.join(heavy) if heavy else 'hayır'}\n")
+
+    print(f"{'modül':<50}{'self ms':>10}{'kümülatif ms':>14}")
+    top = sorted(modules.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (self_us, cumulative_us) in top[:args.top]:
+        print(f"{name:<50}{self_us / 1000:>10.1f}{cumulative_us / 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Öğrenciye giden soru listesinin okunma hızını ölçer (satır/sn).
+
+Kullanım:
+    python -m benchmarks.bench_question_projection [--database-url sqlite:///bench_projection.db]
+                                                   [--questions 40] [--exams 50] [--repeat 5]
+
+"relationship": Exam yüklenir, exam.questions lazy ilişkisiyle tüm Question kolonları
+(cevap anahtarı dahil) ORM nesnesi olarak gelir (eski get_exam yolu)
+"projection": yalnızca id/text/options/image kolonları satır tuple'ı olarak (student_questions)
+
+Her tekrar tüm sınavları yeni bir session ile okur; veri ilk çalıştırmada üretilir.
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from app.models.exam import Exam, Question
+import app.models.user  # noqa: F401
+from app.services.projections import student_questions
+from app.services.serialization import question_payload
+
+
+def seed(session_factory, exams: int, questions: int) -> list:
+    db = session_factory()
+    try:
+        exam_ids = db.execute(select(Exam.id).where(Exam.title == "bench-projection")).scalars().all()
+        if len(exam_ids) >= exams:
+            return exam_ids[:exams]
+        for _ in range(exams - len(exam_ids)):
+            exam = Exam(title="bench-projection", is_published=True, requires_registration=False,
+                        status="exam_active", question_counter=questions)
+            db.add(exam)
+            db.flush()
+            db.execute(insert(Question), [
+                {
+                    "exam_id": exam.id,
+                    "text": f"Soru {i + 1}: Bir sayının üç katının yarısı {i + 10} ise sayı kaçtır?",
+                    "options": ["A", "B", "C", "D", "E"],
+                    "image": None,
+                    "correct_option_id": i % 5 + 1
+                }
+                for i in range(questions)
+            ])
+            exam_ids.append(exam.id)
+        db.commit()
+        return exam_ids
+    finally:
+        db.close()
+
+
+def read_relationship(session_factory, exam_ids):
+    db = session_factory()
+    try:
+        rows = 0
+        for exam_id in exam_ids:
+            exam = db.query(Exam).filter(Exam.id == exam_id).first()
+            rows += len([question_payload(question) for question in exam.questions])
+        return rows
+    finally:
+        db.close()
+
+
+def read_projection(session_factory, exam_ids):
+    db = session_factory()
+    try:
+        return sum(len(student_questions(db, exam_id)) for exam_id in exam_ids)
+    finally:
+        db.close()
+
+
+def measure(fn, repeat):
+    timings, rows = [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default="sqlite:///bench_projection.db")
+    parser.add_argument("--questions", type=int, default=40)
+    parser.add_argument("--exams", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    exam_ids = seed(session_factory, args.exams, args.questions)
+
+    with engine.connect() as conn:
+        total = conn.execute(select(func.count(Question.id)).where(Question.exam_id.in_(exam_ids))).scalar()
+    print(f"exams={len(exam_ids)} questions={total} repeat={args.repeat}")
+
+    for name, fn in (
+            ("relationship", lambda: read_relationship(session_factory, exam_ids)),
+            ("projection  ", lambda: read_projection(session_factory, exam_ids)),
+    ):
+        elapsed, rows = measure(fn, args.repeat)
+        print(f"{name}: {elapsed * 1000:8.1f} ms   {rows / elapsed:10.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    main()
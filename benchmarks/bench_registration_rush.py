@@ -0,0 +1,140 @@
+"""
+Kontenjanlı sınava aynı anda kayıt yığılması: fazla koltuk verilmediğini ve gecikmenin
+sınav doldukça artmadığını ölçer.
+
+Öğrenciler dalgalar halinde (--waves), her dalga tamamen eşzamanlı kayıt olur; --duplicates
+oranındaki öğrenciler aynı isteği iki kez aynı anda gönderir. Dalga başına p50/p95/p99 raporlanır,
+sonunda kayıt tablosu ile sayaçlar karşılaştırılır (uyuşmazlıkta çıkış kodu 1).
+
+Kullanım:
+    python -m benchmarks.bench_registration_rush --database-url sqlite:///bench.db --students 2000 --capacity 1500
+
+Token'lar login yerine doğrudan üretilir (bcrypt ölçümü bozmasın); --base-url ile çalışan
+sunucuya karşı çalıştırırken sunucu aynı SECRET_KEY ile ayağa kalkmalıdır.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from benchmarks.exam_day import EndpointStats, auth, run_phase
+
+
+def verify(exam_id: int, students: int, capacity: int) -> bool:
+    from sqlalchemy import func, select
+
+    from database import SessionLocal
+    from app.models.exam import Exam, ExamRegistration
+
+    db = SessionLocal()
+    try:
+        exam = db.get(Exam, exam_id)
+        counts = dict(db.execute(
+            select(ExamRegistration.status, func.count(ExamRegistration.id))
+            .where(ExamRegistration.exam_id == exam_id)
+            .group_by(ExamRegistration.status)
+        ).all())
+        duplicates = db.execute(
+            select(func.count()).select_from(
+                select(ExamRegistration.user_id)
+                .where(ExamRegistration.exam_id == exam_id)
+                .group_by(ExamRegistration.user_id)
+                .having(func.count(ExamRegistration.id) > 1)
+                .subquery()
+            )
+        ).scalar()
+    finally:
+        db.close()
+
+    registered, waitlisted = counts.get("registered", 0), counts.get("waitlisted", 0)
+    checks = [
+        ("kontenjan aşılmadı", registered <= capacity),
+        ("kontenjan dolduruldu", registered == min(capacity, students)),
+        ("herkes kayıtlı veya yedekte", registered + waitlisted == students),
+        ("registration_count = kayıt satırları", exam.registration_count == registered),
+        ("waitlist_count = yedek satırları", exam.waitlist_count == waitlisted),
+        ("çift kayıt yok", duplicates == 0),
+    ]
+    print(f"\ncapacity={capacity} registered={registered} waitlisted={waitlisted} "
+          f"registration_count={exam.registration_count} waitlist_count={exam.waitlist_count}")
+    for name, ok in checks:
+        print(f"  {'OK  ' if ok else 'FAIL'} {name}")
+    return all(ok for _, ok in checks)
+
+
+async def main_async(args) -> bool:
+    import httpx
+    from sqlalchemy import update
+
+    from benchmarks.seed import seed
+    from database import SessionLocal
+    from app.models.exam import Exam
+    from app.services.auth_service import create_access_token
+
+    seeded = seed(args.students, 1, requires_registration=True)
+    exam_id = seeded["exam_id"]
+    db = SessionLocal()
+    try:
+        db.execute(update(Exam).where(Exam.id == exam_id).values(capacity=args.capacity))
+        db.commit()
+    finally:
+        db.close()
+
+    tokens = [create_access_token(data={"sub": email}) for email in seeded["emails"]]
+    rng = random.Random(7)
+    rng.shuffle(tokens)
+
+    stats = EndpointStats()
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout)
+    else:
+        from sqlalchemy import event
+
+        import main
+        from database import engine
+
+        event.listen(engine, "before_cursor_execute", lambda *a: stats.count_query())
+        transport = httpx.ASGITransport(app=main.app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout)
+
+    wave_size = -(-len(tokens) // args.waves)
+    started = time.perf_counter()
+    async with client:
+        for wave in range(args.waves):
+            wave_tokens = tokens[wave * wave_size:(wave + 1) * wave_size]
+            requests = [("POST", f"/exams/{exam_id}/register", auth(token)) for token in wave_tokens]
+            # Aynı öğrencinin çift tıklaması: ikinci istek 400 almalı
+            requests += [
+                ("POST", f"/exams/{exam_id}/register", auth(token))
+                for token in wave_tokens if rng.random() < args.duplicates
+            ]
+            rng.shuffle(requests)
+            await run_phase(client, stats, f"register #{wave + 1}", requests, len(requests))
+
+    print(f"\nexam_id={exam_id} students={args.students} capacity={args.capacity} "
+          f"total={time.perf_counter() - started:.1f}s (err: çift istekler 400 döner)\n")
+    stats.report()
+    return verify(exam_id, args.students, args.capacity)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default="sqlite:///bench.db")
+    parser.add_argument("--base-url", default=None, help="Verilirse uygulama yerine bu sunucuya istek atılır")
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--capacity", type=int, default=1500)
+    parser.add_argument("--waves", type=int, default=5)
+    parser.add_argument("--duplicates", type=float, default=0.05, help="Aynı anda iki kez kayıt olan öğrenci oranı")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    # config modülü import edilmeden önce ayarlanmalı
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    if not asyncio.run(main_async(args)):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
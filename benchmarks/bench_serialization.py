@@ -0,0 +1,161 @@
+"""
+Büyük response'ların serileştirme maliyetini ölçer (10k satır başına).
+
+Kullanım:
+    python -m benchmarks.bench_serialization [--rows 10000] [--repeat 5]
+
+"before": Pydantic model kurulumu + FastAPI response_model doğrulaması + json
+"after": sade dict serializer + orjson (FAST_JSON_RESPONSES yolu)
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List
+
+import orjson
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.routers.admin_endpoints import ExamResultWithUser
+from app.schemas.exam_schemas import ExamResultResponse, QuestionResultDetail
+from app.services.serialization import exam_result_row
+
+
+def make_rows(count):
+    start = datetime(2025, 5, 1, 10, 0)
+    return [
+        SimpleNamespace(
+            id=i,
+            user_id=i,
+            exam_id=1,
+            correct_answers=i % 40,
+            incorrect_answers=40 - i % 40,
+            completed=True,
+            start_time=start,
+            end_time=start + timedelta(minutes=60),
+            full_name=f"Öğrenci {i}",
+            email=f"ogrenci{i}@example.com",
+            school_name="Atatürk İlkokulu",
+            branch=str(3 + i % 5),
+            role="student",
+            exam_title="Matematik Olimpiyatı"
+        )
+        for i in range(count)
+    ]
+
+
+def admin_before(rows, field):
+    results = [
+        ExamResultWithUser(
+            id=row.id,
+            user_id=row.user_id,
+            exam_id=row.exam_id,
+            correct_answers=row.correct_answers,
+            incorrect_answers=row.incorrect_answers,
+            completed=row.completed,
+            start_time=row.start_time.isoformat(),
+            end_time=row.end_time.isoformat(),
+            user={
+                "id": row.user_id,
+                "full_name": row.full_name,
+                "email": row.email,
+                "school_name": row.school_name,
+                "branch": row.branch,
+                "role": row.role
+            },
+            exam={"id": row.exam_id, "title": row.exam_title}
+        )
+        for row in rows
+    ]
+    content = asyncio.run(serialize_response(field=field, response_content=results))
+    return JSONResponse(content).body
+
+
+def admin_after(rows):
+    return orjson.dumps([exam_result_row(row) for row in rows])
+
+
+def sheet_before(rows, field):
+    questions = [
+        QuestionResultDetail(
+            question_text=f"Soru {i}",
+            question_image=None,
+            options=["A", "B", "C", "D", "E"],
+            correct_option=i % 5 + 1,
+            student_answer=(i + 1) % 5 + 1,
+            is_correct=False
+        )
+        for i in range(len(rows))
+    ]
+    response = ExamResultResponse(
+        correct_answers=0,
+        incorrect_answers=len(rows),
+        total_questions=len(rows),
+        score_percentage=0.0,
+        questions=questions
+    )
+    content = asyncio.run(serialize_response(field=field, response_content=response))
+    return JSONResponse(content).body
+
+
+def sheet_after(rows):
+    questions = [
+        {
+            "question_text": f"Soru {i}",
+            "question_image": None,
+            "options": ["A", "B", "C", "D", "E"],
+            "correct_option": i % 5 + 1,
+            "student_answer": (i + 1) % 5 + 1,
+            "is_correct": False
+        }
+        for i in range(len(rows))
+    ]
+    return orjson.dumps({
+        "correct_answers": 0,
+        "incorrect_answers": len(rows),
+        "total_questions": len(rows),
+        "score_percentage": 0.0,
+        "questions": questions
+    })
+
+
+def measure(fn, repeat):
+    wall, cpu = [], []
+    for _ in range(repeat):
+        w0, c0 = time.perf_counter(), time.process_time()
+        fn()
+        wall.append(time.perf_counter() - w0)
+        cpu.append(time.process_time() - c0)
+    return statistics.median(wall), statistics.median(cpu)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    admin_field = create_model_field(name="Response", type_=List[ExamResultWithUser])
+    sheet_field = create_model_field(name="Response", type_=ExamResultResponse)
+
+    cases = [
+        ("admin results  before", lambda: admin_before(rows, admin_field)),
+        ("admin results  after ", lambda: admin_after(rows)),
+        ("result sheet   before", lambda: sheet_before(rows, sheet_field)),
+        ("result sheet   after ", lambda: sheet_after(rows)),
+    ]
+
+    scale = 10000 / args.rows
+    print(f"rows={args.rows} repeat={args.repeat} (değerler 10k satır başına)")
+    for name, fn in cases:
+        wall, cpu = measure(fn, args.repeat)
+        print(f"{name}: latency {wall * scale * 1000:8.1f} ms   cpu {cpu * scale * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
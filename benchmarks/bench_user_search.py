@@ -0,0 +1,89 @@
+"""
+Admin kullanıcı arama indeksinin kurulum süresi, bellek kullanımı ve sorgu gecikmesi.
+
+Kullanım:
+    python -m benchmarks.bench_user_search [--users 1000000] [--queries 500]
+
+Veri bellekte üretilir (DB yok): Türkçe ad/soyad, okul adı ve email karışımı. Sorgular gerçek
+kullanım gibi ad, ad + soyad, soyad öneki, okul + ad, email öneki ve Türkçe karaktersiz yazımdan oluşur.
+"""
+import argparse
+import random
+import resource
+import statistics
+import time
+
+from app.services.user_search import UserSearchIndex
+
+FIRST_NAMES = ["Ayşe", "Fatma", "Emine", "Zeynep", "Elif", "Işıl", "Şule", "Gül", "Çiğdem", "Özge",
+               "Mehmet", "Mustafa", "Ahmet", "Ali", "Hüseyin", "İbrahim", "Işık", "Çağrı", "Oğuz", "Şükrü",
+               "Yusuf", "Ömer", "Emre", "Burak", "Can", "Deniz", "Ece", "İrem", "Ilgın", "Tuğba"]
+LAST_NAMES = ["Yılmaz", "Kaya", "Demir", "Şahin", "Çelik", "Yıldız", "Yıldırım", "Öztürk", "Aydın", "Özdemir",
+              "Arslan", "Doğan", "Kılıç", "Aslan", "Çetin", "Kara", "Koç", "Kurt", "Özkan", "Şimşek",
+              "Işıkoğlu", "Güneş", "Bulut", "Ateş", "Erdoğan", "Akın", "Uçar", "Polat", "Tekin", "Korkmaz"]
+CITIES = ["İstanbul", "Ankara", "İzmir", "Bursa", "Şişli", "Kadıköy", "Üsküdar", "Çankaya", "Iğdır", "Muğla"]
+SCHOOL_TYPES = ["Anadolu Lisesi", "Fen Lisesi", "Ortaokulu", "İlkokulu", "Koleji"]
+DOMAINS = ["gmail.com", "hotmail.com", "okul.k12.tr", "outlook.com"]
+
+
+def users(count: int, rng: random.Random):
+    for user_id in range(1, count + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        school = f"{rng.choice(CITIES)} {rng.randint(1, 400)}. {rng.choice(SCHOOL_TYPES)}"
+        email = f"{first.lower()}.{last.lower()}{user_id}@{rng.choice(DOMAINS)}"
+        yield user_id, f"{first} {last}", email, school
+
+
+def queries(count: int, rng: random.Random) -> list:
+    makers = [
+        lambda: rng.choice(FIRST_NAMES),
+        lambda: f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        lambda: rng.choice(LAST_NAMES)[:4],
+        lambda: f"{rng.choice(CITIES)} {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        lambda: f"{rng.choice(FIRST_NAMES).lower()}.{rng.choice(LAST_NAMES).lower()}{rng.randint(1, 9)}",
+        lambda: "isik yilmaz",
+    ]
+    return [rng.choice(makers)() for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--chunk", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=21, help="Sıralanan ilk sonuç sayısı (sayfa boyutu + 1)")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    index = UserSearchIndex()
+    started = time.perf_counter()
+    chunk = []
+    for row in users(args.users, rng):
+        chunk.append(row)
+        if len(chunk) == args.chunk:
+            index.add_many(chunk)
+            chunk = []
+    index.add_many(chunk)
+    build = time.perf_counter() - started
+    rss_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024
+    print(f"users={len(index)} build={build:.1f}s rss+={rss_mb:.0f}MB")
+
+    timings, matched = [], []
+    for query in queries(args.queries, rng):
+        started = time.perf_counter()
+        matched.append(index.search(query, args.limit)[0])
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    print(f"queries={len(timings)} median matches={statistics.median(matched):.0f}")
+    for p in (50, 95, 99):
+        print(f"p{p}: {timings[min(int(p / 100 * len(timings)), len(timings) - 1)] * 1000:8.1f} ms")
+
+    started = time.perf_counter()
+    for user_id in range(1, 1001):
+        index.upsert(user_id, "Güncel Öğrenci", f"guncel{user_id}@gmail.com", "Iğdır Fen Lisesi")
+    print(f"upsert: {(time.perf_counter() - started) * 1000 / 1000:.3f} ms/user")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark için kullanıcı, sınav ve soru verisi üretir.
+
+Kullanım:
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.seed --students 2000 --questions 40
+
+Not: DATABASE_URL, config modülü import edilmeden önce ayarlanmalıdır.
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+BENCH_PASSWORD = "bench-password"
+STUDENT_EMAIL = "student{}@bench.local"
+BATCH_SIZE = 1000
+
+
+def seed(students: int, questions: int, requires_registration: bool = True, seed_value: int = 42) -> dict:
+    """
+    Tabloları oluşturur, öğrencileri, tek bir sınavı ve sorularını ekler.
+    Oluşturulan sınavın id'sini ve öğrenci email'lerini döner.
+    """
+    from database import SessionLocal
+    from migrate import run as migrate
+    from app.models.exam import Exam, Question
+    from app.models.user import UserDB
+    from app.services.auth_service import get_password_hash
+
+    migrate()
+    rng = random.Random(seed_value)
+
+    db = SessionLocal()
+    try:
+        # bcrypt pahalı: tüm öğrenciler aynı hash'i paylaşır, login yine gerçek doğrulama yapar
+        hashed_password = get_password_hash(BENCH_PASSWORD)
+
+        start = db.execute(select(UserDB.id).order_by(UserDB.id.desc()).limit(1)).scalar() or 0
+        emails = [STUDENT_EMAIL.format(start + i + 1) for i in range(students)]
+        for offset in range(0, students, BATCH_SIZE):
+            db.execute(insert(UserDB), [
+                {
+                    "email": email,
+                    "full_name": f"Bench Öğrenci {start + offset + i + 1}",
+                    "hashed_password": hashed_password,
+                    "role": "student",
+                    "school_name": f"Okul {rng.randint(1, 50)}",
+                    "branch": str(rng.randint(3, 7)),
+                    "is_verified": True,
+                    "parent_name": "Veli",
+                    "phone": "05000000000"
+                }
+                for i, email in enumerate(emails[offset:offset + BATCH_SIZE])
+            ])
+
+        now = datetime.utcnow()
+        exam = Exam(
+            title=f"Benchmark Sınavı {now:%Y-%m-%d %H:%M}",
+            is_published=True,
+            requires_registration=requires_registration,
+            registration_start_date=now - timedelta(days=1) if requires_registration else None,
+            registration_end_date=now + timedelta(days=1) if requires_registration else None,
+            exam_start_date=now + timedelta(days=1),
+            exam_end_date=now + timedelta(days=1, hours=2),
+            duration_minutes=90,
+            status="registration_open" if requires_registration else "registration_pending",
+            question_counter=questions
+        )
+        db.add(exam)
+        db.flush()
+
+        db.execute(insert(Question), [
+            {
+                "exam_id": exam.id,
+                "text": f"Soru {i + 1}: {rng.randint(10, 99)} + {rng.randint(10, 99)} = ?",
+                "options": ["A", "B", "C", "D", "E"],
+                "correct_option_id": rng.randint(1, 5)
+            }
+            for i in range(questions)
+        ])
+        db.commit()
+
+        return {"exam_id": exam.id, "emails": emails}
+    finally:
+        db.close()
+
+
+def set_exam_status(exam_id: int, status: str):
+    """
+    Sınavı bir sonraki faza geçirir (scheduler'ın yaptığı güncellemeyi taklit eder)
+    """
+    from app.services.schedular import update_exam_status
+
+    update_exam_status(exam_id, status)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--questions", type=int, default=40)
+    parser.add_argument("--no-registration", action="store_true")
+    args = parser.parse_args()
+
+    result = seed(args.students, args.questions, requires_registration=not args.no_registration)
+    print(f"exam_id={result['exam_id']} students={len(result['emails'])}")
+
+
+if __name__ == "__main__":
+    main()
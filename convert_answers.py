@@ -0,0 +1,28 @@
+"""
+Sonuç cevaplarını saklama biçimleri arasında taşır (bkz. ANSWER_STORAGE_MODE):
+
+    python convert_answers.py --to packed              # Answer satırlarını paketle ve sil
+    python convert_answers.py --to packed --keep-rows  # both modu için satırları koru
+    python convert_answers.py --to rows --exam-id 12   # paketlenmiş cevapları satırlara aç
+"""
+import argparse
+import logging
+
+from app.services.answer_storage import convert_results
+from app.services.log import setup_logging
+import app.models.user  # noqa: F401
+
+logger = logging.getLogger("convert_answers")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--to", choices=("packed", "rows"), required=True)
+    parser.add_argument("--exam-id", type=int, default=None)
+    parser.add_argument("--keep-rows", action="store_true")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    setup_logging()
+    converted = convert_results(args.to, args.exam_id, args.keep_rows, args.chunk_size)
+    logger.info(f"Converted answers of {converted} results to {args.to}")
@@ -1,47 +1,94 @@
+import time
+_import_started = time.perf_counter()
+
+# Loglama router'lar import edilmeden önce kurulmalı
+from app.services.log import setup_logging, stop_logging
+setup_logging()
+
 from fastapi import FastAPI, HTTPException
-from app.routers import auth, exams, admin_exams, admin_endpoints
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from app.routers import auth, exams, admin_exams, admin_endpoints, admin_users, leaderboard, metrics
 from database import engine, Base, SessionLocal
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.services.schedular import init_scheduler, shutdown_scheduler, auto_complete_exams
+from app.services.email import email_queue
+from app.services.password_pool import shutdown_hash_pool
+from app.services.user_search import user_search
+from app.services.serialization import default_response_class
+from app.middleware.admission import AdmissionControlMiddleware, pool_timeout_handler
+from app.middleware.query_stats import QueryStatsMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.request_context import RequestContextMiddleware
+from app.services.metrics import STARTUP_DURATION
+from config import settings
+import logging
 import os
 
-try:
-    Base.metadata.create_all(bind=engine)  # MySQL'e bağlanarak tabloları oluşturur
-except Exception as e:
-    print(f"Database error: {e}")
+logger = logging.getLogger(__name__)
+
+# Şema oluşturma deploy öncesi migrate.py ile yapılır; yerel geliştirme için açılabilir
+if settings.AUTO_CREATE_TABLES:
+    try:
+        Base.metadata.create_all(bind=engine)  # MySQL'e bağlanarak tabloları oluşturur
+    except Exception as e:
+        logger.error(f"Database error: {e}")
 
 port = int(os.getenv("PORT", 8080))
 
-app = FastAPI()
+app = FastAPI(default_response_class=default_response_class())
+app.add_exception_handler(PoolTimeoutError, pool_timeout_handler)
 
 # Uygulama başlatıldığında scheduler'ı başlat
 @app.on_event("startup")
 async def startup_event():
+    started = time.perf_counter()
     try:
-        print("=== STARTUP EVENT BAŞLADI ===")
         scheduler = init_scheduler()  # Scheduler'ı başlat
-        print(f"Scheduler running: {scheduler.running}")
-        print(f"Total jobs: {len(scheduler.get_jobs())}")
-        print("=== STARTUP EVENT TAMAMLANDI ===")
+        if settings.SEARCH_INDEX_WARM_ON_STARTUP:
+            # Arka plan thread'inde; açılışı bekletmez
+            user_search.start()
+        logger.info(
+            f"Startup completed: scheduler running={scheduler.running}, jobs={len(scheduler.get_jobs())}",
+            extra={
+                "import_seconds": round(import_seconds, 3),
+                "startup_seconds": round(time.perf_counter() - started, 3)
+            }
+        )
     except Exception as e:
-        print(f"Scheduler başlatılırken hata oluştu: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Scheduler başlatılırken hata oluştu: {e}")
 
 # Uygulama kapatıldığında scheduler'ı durdur
 @app.on_event("shutdown")
 async def shutdown_event():
     try:
         shutdown_scheduler()
-        print("Scheduler başarıyla durduruldu")
+        logger.info("Scheduler başarıyla durduruldu")
+    except Exception as e:
+        logger.error(f"Scheduler durdurulurken hata oluştu: {e}")
+    try:
+        # Kuyruktaki email'ler gönderilmeden kapanmasın
+        email_queue.stop()
+        shutdown_hash_pool()
     except Exception as e:
-        print(f"Scheduler durdurulurken hata oluştu: {e}")
+        logger.error(f"Email kuyruğu / hash havuzu durdurulurken hata oluştu: {e}")
+    finally:
+        stop_logging()
 
 app.include_router(auth.router)
 app.include_router(exams.router)
 app.include_router(admin_exams.router)
 app.include_router(admin_endpoints.router)
+app.include_router(admin_users.router)
+app.include_router(leaderboard.router)
+app.include_router(metrics.router)
+
+# Route bazında eşzamanlılık sınırı; 429/503 cevapları da CORS header'ı alsın diye CORS'un içinde
+app.add_middleware(AdmissionControlMiddleware)
+
+# IP / kullanıcı bazlı rate limit (limit aşan istekler kuyruğa hiç girmez)
+app.add_middleware(RateLimitMiddleware)
 
 # CORS ayarları
 app.add_middleware(
@@ -56,10 +103,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["*"],
+    expose_headers=["*", "Retry-After"],  # credentials ile "*" tarayıcıda geçerli değil
     max_age=600
 )
 
+# İstek başına SQL sayısı / DB süresi
+app.add_middleware(QueryStatsMiddleware)
+
+# Prometheus istek süresi histogramları
+app.add_middleware(MetricsMiddleware)
+
+# Request id (loglar ve X-Request-ID header'ı için) - en dışta olmalı
+app.add_middleware(RequestContextMiddleware)
+
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+import_seconds = time.perf_counter() - _import_started
+STARTUP_DURATION.labels(phase="import").set(import_seconds)
+
 
@@ -0,0 +1,175 @@
+"""
+Veritabanı şemasını günceller. Deploy öncesi çalıştırılır (railway.json preDeployCommand):
+
+    python migrate.py
+
+- Eksik tabloları oluşturur
+- Mevcut tablolara modelde olup veritabanında olmayan kolonları ekler
+- Çift sınav kayıtlarını temizler, eksik indeksleri oluşturur
+- Veri taşıma adımlarını (DATA_MIGRATIONS) sırayla çalıştırır; adımlar idempotent olmalı
+"""
+import json
+import logging
+import time
+
+from sqlalchemy import inspect, text
+
+from app.services.log import setup_logging
+from database import Base, engine
+
+# Modeller Base.metadata'ya kaydolsun
+import app.models.exam  # noqa: F401
+import app.models.user  # noqa: F401
+import app.services.schedular  # noqa: F401  (ExamSession)
+
+logger = logging.getLogger("migrate")
+
+
+def add_missing_columns():
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+            if column.server_default is not None:
+                default = column.server_default.arg
+                if isinstance(default, str) and not default.isdigit():
+                    default = "'" + default.replace("'", "''") + "'"
+                ddl += f" DEFAULT {default}"
+            with engine.begin() as conn:
+                conn.execute(text(ddl))
+            logger.info(f"Added column {table.name}.{column.name}")
+
+
+def remove_duplicate_registrations():
+    # Tekil (user_id, exam_id) indeksinden önce: çift kayıtların ilki tutulur
+    if "exam_registrations" not in inspect(engine).get_table_names():
+        return
+    with engine.begin() as conn:
+        removed = conn.execute(text(
+            "DELETE FROM exam_registrations WHERE id NOT IN ("
+            "  SELECT id FROM (SELECT MIN(id) AS id FROM exam_registrations GROUP BY user_id, exam_id) keep)"
+        )).rowcount
+    if removed:
+        logger.info(f"Removed {removed} duplicate exam registrations")
+
+
+def create_missing_indexes():
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def backfill_completed_at():
+    # Eski sonuçlar için tamamlanma zamanı bilinmiyor; süre bitişi kullanılır
+    with engine.begin() as conn:
+        conn.execute(text(
+            "UPDATE exam_results SET completed_at = end_time "
+            "WHERE completed = :completed AND completed_at IS NULL"
+        ), {"completed": True})
+
+
+def backfill_user_exam_summaries():
+    # Tamamlanmış ve henüz özeti olmayan sonuçlar için özet satırı
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO user_exam_summaries "
+            "(user_id, exam_id, exam_title, correct_answers, incorrect_answers, total_questions, "
+            "score_percentage, completed_at) "
+            "SELECT r.user_id, r.exam_id, e.title, r.correct_answers, r.incorrect_answers, qc.total, "
+            "CASE WHEN qc.total > 0 THEN ROUND(r.correct_answers * 100.0 / qc.total, 2) ELSE 0 END, "
+            "COALESCE(r.completed_at, r.end_time) "
+            "FROM exam_results r "
+            "JOIN exams e ON e.id = r.exam_id "
+            "JOIN (SELECT e2.id AS exam_id, COUNT(q.id) AS total FROM exams e2 "
+            "      LEFT JOIN questions q ON q.exam_id = e2.id GROUP BY e2.id) qc ON qc.exam_id = r.exam_id "
+            "WHERE r.completed = :completed AND NOT EXISTS ("
+            "  SELECT 1 FROM user_exam_summaries s WHERE s.user_id = r.user_id AND s.exam_id = r.exam_id)"
+        ), {"completed": True})
+
+    # Tamamlanmış sınavlarda sırası yazılmamış özetler
+    from app.services.results import finalize_exam_ranks
+    with engine.connect() as conn:
+        exam_ids = conn.execute(text(
+            "SELECT DISTINCT s.exam_id FROM user_exam_summaries s "
+            "JOIN exams e ON e.id = s.exam_id "
+            "WHERE e.status = 'completed' AND s.rank IS NULL"
+        )).scalars().all()
+    for exam_id in exam_ids:
+        finalize_exam_ranks(exam_id)
+
+
+def copy_question_options():
+    # Eski option_1..option_5 kolonlarını JSON dizi kolonuna taşır (None şıklar atlanır)
+    legacy = [f"option_{i}" for i in range(1, 6)]
+    columns = {column["name"] for column in inspect(engine).get_columns("questions")}
+    if not set(legacy) <= columns:
+        return
+
+    with engine.begin() as conn:
+        rows = conn.execute(text(
+            f"SELECT id, {', '.join(legacy)} FROM questions WHERE options IS NULL"
+        )).all()
+        if rows:
+            conn.execute(
+                text("UPDATE questions SET options = :options WHERE id = :id"),
+                [
+                    {"id": row[0], "options": json.dumps([option for option in row[1:] if option is not None],
+                                                         ensure_ascii=False)}
+                    for row in rows
+                ]
+            )
+            logger.info(f"Copied options of {len(rows)} questions")
+
+
+def backfill_registration_fields():
+    # Eski kayıtlara kullanıcı bilgilerini kopyalar; sayaçları mevcut kayıtlardan yeniden hesaplar
+    with engine.begin() as conn:
+        conn.execute(text(
+            "UPDATE exam_registrations SET "
+            "user_name = (SELECT u.full_name FROM users u WHERE u.id = exam_registrations.user_id), "
+            "user_email = (SELECT u.email FROM users u WHERE u.id = exam_registrations.user_id), "
+            "school_name = (SELECT u.school_name FROM users u WHERE u.id = exam_registrations.user_id), "
+            "branch = (SELECT u.branch FROM users u WHERE u.id = exam_registrations.user_id) "
+            "WHERE user_email IS NULL"
+        ))
+        conn.execute(text(
+            "UPDATE exams SET "
+            "registration_count = (SELECT COUNT(*) FROM exam_registrations r "
+            "  WHERE r.exam_id = exams.id AND r.status = 'registered'), "
+            "waitlist_count = (SELECT COUNT(*) FROM exam_registrations r "
+            "  WHERE r.exam_id = exams.id AND r.status = 'waitlisted')"
+        ))
+
+
+# (isim, fonksiyon) - sırayla çalışır
+DATA_MIGRATIONS = [
+    ("backfill_exam_result_completed_at", backfill_completed_at),
+    ("backfill_user_exam_summaries", backfill_user_exam_summaries),
+    ("copy_question_options", copy_question_options),
+    ("backfill_registration_fields", backfill_registration_fields),
+]
+
+
+def run():
+    started = time.perf_counter()
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    remove_duplicate_registrations()
+    create_missing_indexes()
+    for name, migration in DATA_MIGRATIONS:
+        step_started = time.perf_counter()
+        migration()
+        logger.info(f"Data migration {name} done in {time.perf_counter() - step_started:.2f}s")
+    logger.info(f"Migration completed in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    setup_logging()
+    run()
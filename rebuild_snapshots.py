@@ -0,0 +1,25 @@
+"""
+Tamamlanmış sonuçların hazır sonuç kağıtlarını (exam_result_snapshots) yeniden üretir.
+Soru veya doğru cevap düzeltildikten sonra çalıştırılır:
+
+    python rebuild_snapshots.py               # tüm sınavlar
+    python rebuild_snapshots.py --exam-id 12  # tek sınav
+"""
+import argparse
+import logging
+
+from app.services.log import setup_logging
+from app.services.results import rebuild_snapshots
+import app.models.user  # noqa: F401
+
+logger = logging.getLogger("rebuild_snapshots")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--exam-id", type=int, default=None)
+    args = parser.parse_args()
+
+    setup_logging()
+    rebuilt = rebuild_snapshots(args.exam_id)
+    logger.info(f"Rebuilt {rebuilt} result snapshots")